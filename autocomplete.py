@@ -0,0 +1,263 @@
+"""
+Sharded prefix autocomplete index with popularity-ranked top-k completions.
+
+Every model is indexed under its lowercased full id ("meta-llama/llama-3-8b")
+and its lowercased name ("llama-3-8b"), so typing either finds it. Models are
+ranked by downloads, then likes.
+
+    components/autocomplete/root.json.gz
+    {
+      "top_k": 10, "max_prefix": 8, "total_models": 1834567,
+      "models": [["meta-llama/Llama-3-8B", 91234567, 40213], ...],
+      "tops": {"": [0, 5, ...], "m": [...], "me": [...]},   # prefixes answered here
+      "shards": {"ll": "shard_0012_5d41402abc.json.gz", "mea": "shard_0031_7d793037a0.json.gz", ...}
+    }
+
+    components/autocomplete/shard_0012_5d41402abc.json.gz   # keys starting with "ll"
+    {
+      "prefix": "ll",
+      "models": [["meta-llama/Llama-3-8B", 91234567, 40213], ...],
+      "keys": ["llama-2-7b", "llama-3-8b", ...],     # sorted
+      "key_models": [3, 0, ...],                      # model of each key
+      "tops": {"ll": [0, 3, ...], "lla": [...], ...}  # precomputed top-k
+    }
+
+A query touches the root (cached) and at most one shard. The root answers
+the empty prefix, single characters and the prefixes of shards that were
+split because they held more than SHARD_MAX_KEYS keys. In a shard, prefixes
+of up to max_prefix characters matched by at least top_k models have
+precomputed tops. Any other prefix matches few keys or is long, so it is
+answered by a range scan of the shard's sorted keys.
+
+Shard names end in a hash of their content, so a rebuild writes new shards
+next to the ones an older root (cached by a worker) still names;
+upload_chunks_to_r2.py uploads the shards before the root.
+
+    python autocomplete.py llama --base components
+"""
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+import compression
+
+AUTOCOMPLETE_DIR = 'autocomplete'
+ROOT_FILE = 'root.json'
+
+TOP_K = 10
+# Top-k lists are precomputed for prefixes up to this many characters
+MAX_PREFIX = 8
+# A shard with more keys than this is split by the next character
+SHARD_MAX_KEYS = 20000
+# Shards are not split beyond prefixes of this length
+MAX_SHARD_PREFIX = 6
+
+def normalize(text):
+    return text.lower()
+
+def index_keys(model_id):
+    """Keys a model is found under: its full id and its name after the org"""
+    key = normalize(model_id)
+    keys = [key] if key else []
+    name = key.split('/', 1)[1] if '/' in key else ''
+    if name:
+        keys.append(name)
+    return keys
+
+def _top(entries, top_k):
+    """First top_k distinct models of (key, model) entries given in rank order"""
+    top = []
+    seen = set()
+    for _, model in entries:
+        if model not in seen:
+            seen.add(model)
+            top.append(model)
+            if len(top) == top_k:
+                break
+    return top
+
+class _Models:
+    """Per-file model table: global model number -> position in the file's models list"""
+
+    def __init__(self, model_ids, downloads, likes):
+        self.source = (model_ids, downloads, likes)
+        self.positions = {}
+        self.rows = []
+
+    def __call__(self, model):
+        position = self.positions.get(model)
+        if position is None:
+            model_ids, downloads, likes = self.source
+            position = self.positions[model] = len(self.rows)
+            self.rows.append([model_ids[model], downloads[model], likes[model]])
+        return position
+
+def _shard_tops(prefix, entries, top_k, max_prefix):
+    """Precomputed tops for prefixes of entries (in rank order) from prefix up to max_prefix chars"""
+    tops = defaultdict(list)
+    seen = defaultdict(set)
+    for key, model in entries:
+        for length in range(len(prefix), min(len(key), max_prefix) + 1):
+            candidate = key[:length]
+            top = tops[candidate]
+            if len(top) < top_k and model not in seen[candidate]:
+                seen[candidate].add(model)
+                top.append(model)
+    # Prefixes with fewer than top_k models are cheap to answer by range scan
+    return {candidate: top for candidate, top in tops.items() if len(top) == top_k or candidate == prefix}
+
+def write_autocomplete_index(model_ids, downloads, likes, output_dir, codec='gzip', top_k=TOP_K,
+                             max_prefix=MAX_PREFIX, shard_max_keys=SHARD_MAX_KEYS):
+    """
+    Write the autocomplete root and shards for a list of models.
+
+    downloads and likes are aligned with model_ids. Returns the root file path.
+    """
+    autocomplete_dir = os.path.join(output_dir, AUTOCOMPLETE_DIR)
+    os.makedirs(autocomplete_dir, exist_ok=True)
+
+    # All (key, model) entries in rank order: downloads, then likes, then id
+    order = sorted(range(len(model_ids)), key=lambda m: (-downloads[m], -likes[m], model_ids[m]))
+    entries = [(key, m) for m in order for key in index_keys(model_ids[m])]
+
+    # The root answers the empty prefix and single characters; longer keys
+    # are grouped into shards by their first two characters
+    root_models = _Models(model_ids, downloads, likes)
+    root_tops = {'': _top(entries, top_k)}
+    groups = defaultdict(list)
+    for key, model in entries:
+        top = root_tops.setdefault(key[0], [])
+        if len(top) < top_k and model not in top:
+            top.append(model)
+        if len(key) >= 2:
+            groups[key[:2]].append((key, model))
+
+    shards = {}
+    written = set()
+    pending = sorted(groups.items())
+    while pending:
+        prefix, group = pending.pop()
+        if len(group) > shard_max_keys and len(prefix) < MAX_SHARD_PREFIX:
+            # Too big for one shard: answer this prefix from the root, split the rest
+            root_tops[prefix] = _top(group, top_k)
+            subgroups = defaultdict(list)
+            for key, model in group:
+                if len(key) > len(prefix):
+                    subgroups[key[:len(prefix) + 1]].append((key, model))
+            pending.extend(subgroups.items())
+            continue
+
+        shard_models = _Models(model_ids, downloads, likes)
+        by_key = sorted(group)
+        payload = json.dumps({
+            'prefix': prefix,
+            'keys': [key for key, _ in by_key],
+            'key_models': [shard_models(model) for _, model in by_key],
+            'tops': {candidate: [shard_models(model) for model in top]
+                     for candidate, top in _shard_tops(prefix, group, top_k, max_prefix).items()},
+            'models': shard_models.rows
+        })
+        # Content-hashed names: a rebuild never overwrites a shard an older root names
+        shard_file = f'shard_{len(shards):04d}_' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:10] + '.json'
+        path = compression.write_json(os.path.join(autocomplete_dir, shard_file), payload, codec)
+        shards[prefix] = os.path.basename(path)
+        written.add(shards[prefix])
+
+    root = {
+        'top_k': top_k,
+        'max_prefix': max_prefix,
+        'total_models': len(model_ids),
+        'tops': {prefix: [root_models(model) for model in top] for prefix, top in root_tops.items()},
+        'models': root_models.rows,
+        'shards': dict(sorted(shards.items()))
+    }
+    root_file = compression.write_json(os.path.join(autocomplete_dir, ROOT_FILE), root, codec)
+    written.add(os.path.basename(root_file))
+
+    # Shards from a previous build
+    for name in os.listdir(autocomplete_dir):
+        if name not in written:
+            os.remove(os.path.join(autocomplete_dir, name))
+    return root_file
+
+class Autocomplete:
+    """
+    Query the autocomplete index; the root and recently used shards are cached.
+
+        completions = Autocomplete('components').complete('llama', 10)
+    """
+
+    def __init__(self, base='components', cache_shards=64):
+        self.dir = os.path.join(base, AUTOCOMPLETE_DIR)
+        root_file = None
+        for codec in compression.CODECS:
+            root_file = compression.compressed_path(os.path.join(self.dir, ROOT_FILE), codec)
+            if os.path.exists(root_file):
+                break
+        self.root = compression.read_json(root_file)
+        self.cache_shards = cache_shards
+        self._shards = OrderedDict()
+        # complete() may run in several threads (serve_components.py)
+        self._lock = threading.Lock()
+
+    def _shard(self, prefix):
+        with self._lock:
+            shard = self._shards.get(prefix)
+            if shard is not None:
+                self._shards.move_to_end(prefix)
+                return shard
+        shard = compression.read_json(os.path.join(self.dir, self.root['shards'][prefix]))
+        with self._lock:
+            self._shards[prefix] = shard
+            if len(self._shards) > self.cache_shards:
+                self._shards.popitem(last=False)
+        return shard
+
+    def _shard_prefix(self, query):
+        # Longest shard prefix of the query (shards are split one character at a time)
+        for length in range(min(len(query), MAX_SHARD_PREFIX), 1, -1):
+            if query[:length] in self.root['shards']:
+                return query[:length]
+        return None
+
+    def complete(self, prefix, k=TOP_K):
+        """Top k models matching prefix: [{'id', 'downloads', 'likes'}, ...] by downloads, then likes"""
+        query = normalize(prefix)
+        k = min(k, self.root['top_k'])
+
+        if query in self.root['tops']:
+            models, positions = self.root['models'], self.root['tops'][query]
+        else:
+            shard_prefix = self._shard_prefix(query)
+            if shard_prefix is None:
+                return []
+            shard = self._shard(shard_prefix)
+            models = shard['models']
+            if query in shard['tops']:
+                positions = shard['tops'][query]
+            else:
+                # Few matches (or a long prefix): scan the sorted key range
+                keys = shard['keys']
+                matches = set()
+                for i in range(bisect.bisect_left(keys, query), len(keys)):
+                    if not keys[i].startswith(query):
+                        break
+                    matches.add(shard['key_models'][i])
+                positions = heapq.nsmallest(k, matches, key=lambda m: (-models[m][1], -models[m][2], models[m][0]))
+
+        return [{'id': models[m][0], 'downloads': models[m][1], 'likes': models[m][2]} for m in positions[:k]]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the autocomplete index')
+    parser.add_argument('prefix', help='Prefix to complete')
+    parser.add_argument('--base', default='components', help='Components directory')
+    parser.add_argument('-k', type=int, default=TOP_K, help='Number of completions')
+    args = parser.parse_args()
+
+    for completion in Autocomplete(args.base).complete(args.prefix, args.k):
+        print(f"{completion['id']:<60} {completion['downloads']:>12,} downloads {completion['likes']:>8,} likes")
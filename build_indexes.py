@@ -0,0 +1,470 @@
+"""
+Build all lookup / search index files from the component index in one pass.
+
+create_chunked_index.py, create_compact_index.py, create_search_index.py and
+create_lookup_index.py used to load and sort components/component_index.json.gz
+once each. This script parses it once, sorts the model ids once and writes
+every requested output from the same sorted columns:
+
+    chunked   components/chunks/range_NNNN_<hash>.json.gz + chunks_index.json.gz
+    compact   components/compact_index.json.gz
+    search    components/search_index.json.gz
+    lookup    components/lookup_<org>.json.gz + lookup_index.json.gz
+    binary    components/model_index.bin (memory-mappable, see model_index.py)
+    autocomplete  components/autocomplete/ (popularity-ranked prefix completions,
+              see autocomplete.py; reads downloads/likes from the component files)
+    filter    components/model_filter.bin (Bloom filter of all model ids for
+              answering lookup misses without a chunk, see model_filter.py)
+    trigram   components/trigrams/ (substring / fuzzy search, see trigram_index.py;
+              also reads downloads/likes)
+    catalog   components/component_catalog.npz (per-component counts and
+              distributions, see component_catalog.py; the export writes it
+              too, this rebuilds it for older exports from the component files)
+
+    python build_indexes.py                                   # all outputs
+    python build_indexes.py --outputs chunked search --compression zstd
+
+The four create_*_index.py scripts are kept as wrappers around the writers
+below for existing workflows.
+
+Lookup chunks cover contiguous ranges of the sorted model ids, cut so each
+holds about CHUNK_TARGET_BYTES of JSON. chunks_index.json.gz lists the ranges
+by their first model id; find_chunk() picks the chunk for a model id:
+
+    {
+      "chunking": "range",
+      "version": "3f9c2a1b7e40",
+      "ranges": [{"first": "00-org/model", "file": "chunks/range_0000_5d41402abc.json.gz",
+                  "count": 6123, "size_mb": 0.05}, ...],
+      "target_bytes": 262144, "total_chunks": 287, "total_models": 1834567,
+      "compression": {"codec": "gzip", "dictionary": null}
+    }
+
+Range chunk names end in a hash of their contents and "version" is a hash
+of the whole directory. A rebuild that moves the range boundaries therefore
+writes new file names instead of overwriting range_0000..., so a worker
+still holding the old directory reads the old, consistent files (or misses
+and reloads the directory) instead of searching new files with old
+boundaries.
+
+chunking='prefix' still writes the old chunks/lookup_XX.json.gz files (first
+two characters of the id) with a "chunks" prefix map instead of "ranges".
+"""
+import argparse
+import bisect
+import gzip
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+import autocomplete
+import component_catalog
+import component_shards
+import compression
+import model_filter
+import model_index
+import trigram_index
+from run_report import RunReport
+
+INDEX_FILE = 'component_index.json.gz'
+CHUNKS_DIR = 'chunks'
+CHUNKS_INDEX_FILE = 'chunks_index.json.gz'
+CHUNK_DICTIONARY_FILE = 'chunk_dictionary.zdict'
+
+CHUNKINGS = ('range', 'prefix')
+# Uncompressed JSON bytes per range chunk
+CHUNK_TARGET_BYTES = 256 * 1024
+
+def load_index(base='components'):
+    """
+    Load the component index once and sort it by model id.
+
+    Returns {'model_ids': [...], 'component_ids': [...], 'total_models': n}
+    with both columns in sorted model id order, plus the index's
+    'component_stats' and 'compression' for outputs that read components.
+    """
+    print("Loading component index...")
+    with gzip.open(os.path.join(base, INDEX_FILE), 'rt', encoding='utf-8') as f:
+        index_data = json.load(f)
+    component_index = index_data['component_index']
+
+    model_ids = sorted(component_index)
+    component_ids = [component_index[model_id] for model_id in model_ids]
+    print(f"Total models: {len(model_ids):,}")
+    return {
+        'model_ids': model_ids,
+        'component_ids': component_ids,
+        'total_models': len(model_ids),
+        'component_stats': index_data.get('component_stats', []),
+        'compression': index_data.get('compression')
+    }
+
+def load_popularity(index, base='components'):
+    """
+    Add 'downloads' and 'likes' columns (aligned with model_ids) to the index.
+
+    They are not in component_index.json.gz, so every component is read once
+    (shards included); later outputs reuse the columns.
+    """
+    if 'downloads' in index:
+        return index
+    print("Reading downloads/likes from component files...")
+    settings = index.get('compression') or {}
+    codec = settings.get('codec', 'gzip')
+    dictionary = None
+    if settings.get('dictionary'):
+        dictionary = compression.load_dictionary(os.path.join(base, settings['dictionary']))
+    directory = component_shards.load_shard_directory(base)
+
+    position = {model_id: i for i, model_id in enumerate(index['model_ids'])}
+    downloads = [0] * len(position)
+    likes = [0] * len(position)
+    for stat in index['component_stats']:
+        component = component_shards.read_component(stat['component_id'], base, directory, codec, dictionary)
+        for node in component['nodes']:
+            i = position.get(node['id'])
+            if i is not None:
+                downloads[i] = component_catalog.as_count(node.get('downloads'))
+                likes[i] = component_catalog.as_count(node.get('likes'))
+    index['downloads'] = downloads
+    index['likes'] = likes
+    return index
+
+def chunk_prefix(model_id):
+    """Chunk of a model id: its first 2 characters (lowercase), '00' for special characters"""
+    # Handle edge cases (single char, empty, special chars)
+    prefix = model_id[:2].lower() if len(model_id) >= 2 else model_id[0].lower() if len(model_id) == 1 else '00'
+
+    # Normalize: only alphanumeric, fallback to '00' for special chars
+    if not prefix[0].isalnum():
+        prefix = '00'
+    elif len(prefix) == 1:
+        prefix = prefix + '0'
+    return prefix
+
+def split_ranges(model_ids, component_ids, target_bytes=CHUNK_TARGET_BYTES):
+    """
+    Cut the sorted index into contiguous ranges of about target_bytes of JSON each.
+
+    Returns a list of (start, end) entry positions.
+    """
+    ranges = []
+    start = 0
+    size = 0
+    for i, (model_id, component_id) in enumerate(zip(model_ids, component_ids)):
+        # "model_id": component_id, (ids are rarely escaped, so this is close to json.dumps)
+        size += len(model_id.encode('utf-8')) + len(str(component_id)) + 6
+        if size >= target_bytes:
+            ranges.append((start, i + 1))
+            start = i + 1
+            size = 0
+    if start < len(model_ids):
+        # Fold a small remainder into the last full range
+        if ranges and size < target_bytes // 2:
+            ranges[-1] = (ranges[-1][0], len(model_ids))
+        else:
+            ranges.append((start, len(model_ids)))
+    return ranges
+
+def find_chunk(chunks_index, model_id):
+    """
+    File (relative to the components directory) of the lookup chunk that
+    would hold model_id, or None if it sorts before the first chunk.
+    """
+    if chunks_index.get('chunking') == 'range':
+        ranges = chunks_index['ranges']
+        position = bisect.bisect_right([entry['first'] for entry in ranges], model_id) - 1
+        return ranges[position]['file'] if position >= 0 else None
+    codec = (chunks_index.get('compression') or {}).get('codec', 'gzip')
+    return compression.compressed_path(f'{CHUNKS_DIR}/lookup_{chunk_prefix(model_id)}.json', codec)
+
+def write_chunked_index(index, base='components', codec='gzip', use_dictionary=True, chunking='range',
+                        target_bytes=CHUNK_TARGET_BYTES):
+    """
+    Split the index into lookup chunks.
+
+    chunking='range' cuts the sorted ids into ranges of about target_bytes
+    (range_NNNN files); 'prefix' groups them by the first 2 characters of the
+    model id (lookup_XX files).
+    """
+    if chunking not in CHUNKINGS:
+        raise ValueError(f"Unknown chunking '{chunking}', expected one of {CHUNKINGS}")
+    compression.check_codec(codec)
+    chunks = {}
+    if chunking == 'range':
+        model_ids = index['model_ids']
+        component_ids = index['component_ids']
+        for number, (start, end) in enumerate(split_ranges(model_ids, component_ids, target_bytes)):
+            chunks[f'{number:04d}'] = dict(zip(model_ids[start:end], component_ids[start:end]))
+    else:
+        for model_id, component_id in zip(index['model_ids'], index['component_ids']):
+            chunks.setdefault(chunk_prefix(model_id), {})[model_id] = component_id
+    file_prefix = 'range_' if chunking == 'range' else 'lookup_'
+
+    chunks_dir = os.path.join(base, CHUNKS_DIR)
+    os.makedirs(chunks_dir, exist_ok=True)
+
+    # Serialize chunks up front so a zstd dictionary can be trained on them
+    payloads = {}
+    for prefix, chunk_data in chunks.items():
+        if chunking == 'range':
+            model_ids = list(chunk_data)
+            chunk_info = {'first': model_ids[0], 'last': model_ids[-1], 'index': chunk_data, 'count': len(chunk_data)}
+        else:
+            chunk_info = {'prefix': prefix, 'index': chunk_data, 'count': len(chunk_data)}
+        payloads[prefix] = json.dumps(chunk_info)
+
+    dictionary = None
+    dictionary_file = os.path.join(chunks_dir, CHUNK_DICTIONARY_FILE)
+    if codec == 'zstd' and use_dictionary:
+        dictionary = compression.train_dictionary([payload.encode('utf-8') for payload in payloads.values()])
+    if dictionary is not None:
+        compression.save_dictionary(dictionary, dictionary_file)
+        print(f"Trained zstd dictionary: {dictionary_file} ({len(dictionary) / 1024:.0f} KB)")
+    elif os.path.exists(dictionary_file):
+        os.remove(dictionary_file)
+
+    chunk_files = []
+    for prefix, chunk_data in sorted(chunks.items()):
+        name = f'{file_prefix}{prefix}'
+        if chunking == 'range':
+            name += '_' + hashlib.sha256(payloads[prefix].encode('utf-8')).hexdigest()[:10]
+        chunk_file = compression.write_json(os.path.join(chunks_dir, f'{name}.json'), payloads[prefix], codec,
+                                            dictionary)
+        file_size_mb = os.path.getsize(chunk_file) / (1024 * 1024)
+        chunk_files.append({'prefix': prefix, 'file': chunk_file, 'count': len(chunk_data), 'size_mb': file_size_mb,
+                            'first': next(iter(chunk_data))})
+        print(f"  {prefix}: {len(chunk_data):,} models, {file_size_mb:.2f} MB")
+
+    # Chunks from a previous build (other chunking, ranges, prefixes or codec)
+    written = {os.path.basename(c['file']) for c in chunk_files}
+    for name in os.listdir(chunks_dir):
+        if name.startswith(('lookup_', 'range_')) and name not in written:
+            os.remove(os.path.join(chunks_dir, name))
+
+    chunks_index = {'chunking': chunking}
+    if chunking == 'range':
+        chunks_index['ranges'] = [
+            {'first': c['first'], 'file': os.path.relpath(c['file'], base).replace(os.sep, '/'),
+             'count': c['count'], 'size_mb': c['size_mb']}
+            for c in chunk_files
+        ]
+        chunks_index['target_bytes'] = target_bytes
+        chunks_index['version'] = hashlib.sha256(json.dumps(chunks_index['ranges']).encode('utf-8')).hexdigest()[:12]
+    else:
+        chunks_index['chunks'] = {c['prefix']: {'file': c['file'], 'count': c['count'], 'size_mb': c['size_mb']}
+                                  for c in chunk_files}
+    chunks_index.update({
+        'total_chunks': len(chunks),
+        'total_models': index['total_models'],
+        'compression': {
+            'codec': codec,
+            'dictionary': os.path.join(chunks_dir, CHUNK_DICTIONARY_FILE) if dictionary is not None else None
+        }
+    })
+    chunks_index_file = os.path.join(base, CHUNKS_INDEX_FILE)
+    with gzip.open(chunks_index_file, 'wt', encoding='utf-8') as f:
+        json.dump(chunks_index, f)
+
+    print(f"\n✓ Created {len(chunks)} chunk files")
+    print(f"✓ Chunks index: {chunks_index_file}")
+    sizes = [c['size_mb'] for c in chunk_files]
+    if sizes:
+        print(f"\nChunk size stats:")
+        print(f"  Min: {min(sizes):.2f} MB")
+        print(f"  Max: {max(sizes):.2f} MB")
+        print(f"  Avg: {sum(sizes)/len(sizes):.2f} MB")
+        counts = [c['count'] for c in chunk_files]
+        print(f"  Models per chunk: {min(counts):,} - {max(counts):,}")
+    return chunk_files
+
+def write_compact_index(index, base='components', codec='gzip'):
+    """Compact index: sorted [modelId, componentId] pairs for binary search"""
+    compact_index = {
+        'index': [[model_id, component_id] for model_id, component_id in zip(index['model_ids'], index['component_ids'])],
+        'total_models': index['total_models']
+    }
+    compact_file = compression.write_json(os.path.join(base, 'compact_index.json'), compact_index, codec)
+
+    file_size_mb = os.path.getsize(compact_file) / (1024 * 1024)
+    print(f"✓ Compact index created: {compact_file}")
+    print(f"  Models: {index['total_models']:,}")
+    print(f"  File size: {file_size_mb:.2f} MB")
+    return compact_file
+
+def write_search_index(index, base='components', codec='gzip'):
+    """Lightweight search index: just the sorted model ids"""
+    search_index = {
+        'model_ids': index['model_ids'],
+        'total_models': index['total_models']
+    }
+    search_index_file = compression.write_json(os.path.join(base, 'search_index.json'), search_index, codec)
+
+    file_size_mb = os.path.getsize(search_index_file) / (1024 * 1024)
+    print(f"✓ Search index created: {search_index_file}")
+    print(f"  Models: {index['total_models']:,}")
+    print(f"  File size: {file_size_mb:.2f} MB")
+    return search_index_file
+
+def write_lookup_index(index, base='components', codec='gzip'):
+    """Lookup index split by model prefix (the org before the first /)"""
+    lookup_chunks = defaultdict(dict)
+    for model_id, component_id in zip(index['model_ids'], index['component_ids']):
+        prefix = model_id.split('/')[0] if '/' in model_id else '_other'
+        lookup_chunks[prefix][model_id] = component_id
+
+    total_size = 0
+    for prefix, chunk in lookup_chunks.items():
+        chunk_file = compression.write_json(os.path.join(base, f'lookup_{prefix}.json'), chunk, codec)
+        total_size += os.path.getsize(chunk_file) / (1024 * 1024)
+
+    prefix_index = {
+        'prefixes': list(lookup_chunks.keys()),
+        'total_models': index['total_models'],
+        'compression': codec
+    }
+    prefix_index_file = os.path.join(base, 'lookup_index.json.gz')
+    with gzip.open(prefix_index_file, 'wt', encoding='utf-8') as f:
+        json.dump(prefix_index, f)
+
+    print(f"✓ Lookup index created:")
+    print(f"  Prefixes: {len(lookup_chunks)}")
+    print(f"  Total size: {total_size:.2f} MB")
+    print(f"  Prefix index: {prefix_index_file}")
+    return prefix_index_file
+
+def write_binary_index(index, base='components', codec='gzip'):
+    """Memory-mappable model_index.bin (model_index.py); never compressed, so codec is ignored"""
+    index_file = model_index.write_model_index(index['model_ids'], index['component_ids'],
+                                               os.path.join(base, model_index.MODEL_INDEX_FILE))
+    file_size_mb = os.path.getsize(index_file) / (1024 * 1024)
+    print(f"✓ Binary model index created: {index_file}")
+    print(f"  Models: {index['total_models']:,}")
+    print(f"  File size: {file_size_mb:.2f} MB (uncompressed, memory-mappable)")
+    return index_file
+
+def write_filter_index(index, base='components', codec='gzip'):
+    """Bloom filter of all model ids (model_filter.py); never compressed, so codec is ignored"""
+    filter_file = model_filter.write_model_filter(index['model_ids'],
+                                                  os.path.join(base, model_filter.MODEL_FILTER_FILE))
+    written = model_filter.ModelFilter(filter_file)
+    measured = model_filter.measure_false_positive_rate(written, index['model_ids'])
+    print(f"✓ Model filter created: {filter_file}")
+    print(f"  Models: {written.num_items:,} ({written.num_bits:,} bits, {written.num_hashes} hashes)")
+    print(f"  File size: {os.path.getsize(filter_file) / (1024 * 1024):.2f} MB")
+    print(f"  False-positive rate: {measured:.4%} measured on one-character typos of real ids, "
+          f"{written.expected_false_positive_rate():.4%} expected from the bits set "
+          f"(target {model_filter.FALSE_POSITIVE_RATE:.2%})")
+    return filter_file
+
+def write_autocomplete_index(index, base='components', codec='gzip'):
+    """Sharded prefix autocomplete index with popularity-ranked top-k completions (autocomplete.py)"""
+    load_popularity(index, base)
+    root_file = autocomplete.write_autocomplete_index(index['model_ids'], index['downloads'], index['likes'],
+                                                      base, codec)
+    autocomplete_dir = os.path.dirname(root_file)
+    files = os.listdir(autocomplete_dir)
+    total_size = sum(os.path.getsize(os.path.join(autocomplete_dir, name)) for name in files)
+    print(f"✓ Autocomplete index created: {autocomplete_dir}/")
+    print(f"  Shards: {len(files) - 1}")
+    print(f"  Total size: {total_size / (1024 * 1024):.2f} MB")
+    return root_file
+
+def write_trigram_index(index, base='components', codec='gzip'):
+    """Trigram inverted index for substring and fuzzy search (trigram_index.py)"""
+    load_popularity(index, base)
+    models_file = trigram_index.write_trigram_index(index['model_ids'], index['downloads'], index['likes'],
+                                                    base, codec)
+    trigrams_dir = os.path.dirname(models_file)
+    total_size = sum(os.path.getsize(os.path.join(trigrams_dir, name)) for name in os.listdir(trigrams_dir))
+    print(f"✓ Trigram index created: {trigrams_dir}/")
+    print(f"  Shards: {trigram_index.NUM_SHARDS}")
+    print(f"  Total size: {total_size / (1024 * 1024):.2f} MB")
+    return models_file
+
+def write_catalog_index(index, base='components', codec='gzip'):
+    """Component catalog (component_catalog.py) from every component file; never compressed, so codec is ignored"""
+    settings = index.get('compression') or {}
+    dictionary = None
+    if settings.get('dictionary'):
+        dictionary = compression.load_dictionary(os.path.join(base, settings['dictionary']))
+    directory = component_shards.load_shard_directory(base)
+    rows = [component_catalog.catalog_row(component_shards.read_component(stat['component_id'], base, directory,
+                                                                          settings.get('codec', 'gzip'), dictionary))
+            for stat in index['component_stats']]
+    catalog_file = component_catalog.write_catalog(rows, base)
+    print(f"✓ Component catalog created: {catalog_file}")
+    print(f"  Components: {len(rows):,}")
+    print(f"  File size: {os.path.getsize(catalog_file) / (1024 * 1024):.2f} MB")
+    return catalog_file
+
+# Output name -> writer(index, base, codec)
+OUTPUTS = {
+    'chunked': write_chunked_index,
+    'compact': write_compact_index,
+    'search': write_search_index,
+    'lookup': write_lookup_index,
+    'binary': write_binary_index,
+    'filter': write_filter_index,
+    'autocomplete': write_autocomplete_index,
+    'trigram': write_trigram_index,
+    'catalog': write_catalog_index
+}
+
+def build_indexes(base='components', outputs=tuple(OUTPUTS), codec='gzip', report=None, chunking='range',
+                  chunk_target_bytes=CHUNK_TARGET_BYTES):
+    """
+    Load the component index once and write the requested index outputs.
+
+    Parameters:
+    - base: components directory (input and output)
+    - outputs: names from OUTPUTS to build
+    - codec: compression of the output files (see compression.py)
+    - report: run_report.RunReport for per-output timings (a new one by default)
+    - chunking, chunk_target_bytes: lookup chunking of the 'chunked' output
+    """
+    unknown = set(outputs) - set(OUTPUTS)
+    if unknown:
+        raise ValueError(f"Unknown index outputs {sorted(unknown)}, expected some of {list(OUTPUTS)}")
+    compression.check_codec(codec)
+    if report is None:
+        report = RunReport()
+
+    with report.stage('load', bytes_in=os.path.getsize(os.path.join(base, INDEX_FILE))) as counters:
+        index = load_index(base)
+        counters['items'] = index['total_models']
+
+    results = {}
+    for name in outputs:
+        print(f"\nBuilding {name} index...")
+        with report.stage(name, items=index['total_models']):
+            if name == 'chunked':
+                results[name] = write_chunked_index(index, base, codec, chunking=chunking,
+                                                    target_bytes=chunk_target_bytes)
+            else:
+                results[name] = OUTPUTS[name](index, base, codec)
+
+    report.print_summary()
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build index files from the component index in one pass')
+    parser.add_argument('--components-dir', default='components', help='Directory with component_index.json.gz')
+    parser.add_argument('--outputs', nargs='+', choices=list(OUTPUTS), default=list(OUTPUTS),
+                        help='Index outputs to build (default: all)')
+    parser.add_argument('--compression', choices=compression.CODECS, default='gzip',
+                        help='Compression of the output files (zstd/brotli: local use only)')
+    parser.add_argument('--chunking', choices=CHUNKINGS, default='range',
+                        help="Lookup chunks: size-balanced id 'range's or 2-character 'prefix'es")
+    parser.add_argument('--chunk-target-kb', type=int, default=CHUNK_TARGET_BYTES // 1024,
+                        help='Uncompressed JSON size of each range chunk in KB')
+    parser.add_argument('--report', default=None, help='Write a JSON run report to this file')
+    args = parser.parse_args()
+
+    report = RunReport()
+    build_indexes(args.components_dir, args.outputs, args.compression, report, args.chunking,
+                  args.chunk_target_kb * 1024)
+    if args.report:
+        report.save(args.report)
+        print(f"✓ Run report saved: {args.report}")
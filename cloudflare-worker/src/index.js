@@ -1,3 +1,222 @@
+// Directory objects (chunks_index.json.gz, ...) are kept per isolate for this
+// long, so a warm isolate picks up a rebuild
+const DIRECTORY_TTL_MS = 5 * 60 * 1000;
+
+// Cache load(env) for DIRECTORY_TTL_MS; get(env, true) reloads at once.
+// A failed load is not cached.
+function cachedLoader(load) {
+  let entry;
+  return function get(env, refresh = false) {
+    if (refresh || !entry || Date.now() - entry.loadedAt > DIRECTORY_TTL_MS) {
+      const promise = load(env).catch((error) => {
+        if (entry && entry.promise === promise) {
+          entry = undefined;
+        }
+        throw error;
+      });
+      entry = { promise, loadedAt: Date.now() };
+    }
+    return entry.promise;
+  };
+}
+
+async function readGzipJson(object) {
+  const stream = new DecompressionStream('gzip');
+  const decompressedStream = new Response(await object.arrayBuffer()).body.pipeThrough(stream);
+  return JSON.parse(await new Response(decompressedStream).text());
+}
+
+// Range directory of the lookup chunks. null means the chunks use the old
+// 2-character prefixes.
+async function loadChunkRanges(env) {
+  // Note: chunk files (and their index) were uploaded without 'components/' prefix
+  const indexObject = await env.AI_ECOSYSTEM_GRAPH.get('chunks_index.json.gz');
+  if (!indexObject) {
+    return null;
+  }
+  const chunksIndex = await readGzipJson(indexObject);
+  return chunksIndex.chunking === 'range' ? chunksIndex.ranges : null;
+}
+
+const getChunkRanges = cachedLoader(loadChunkRanges);
+
+// Bucket key of the chunk that would hold modelId, or null if it sorts before every range
+async function findChunkKey(env, modelId, refresh = false) {
+  const ranges = await getChunkRanges(env, refresh);
+  if (ranges) {
+    // Size-balanced chunks: find the id range that holds this model
+    return findRangeChunk(ranges, modelId);
+  }
+  // Get prefix (first 2 characters) for chunk lookup
+  const prefix = modelId.length >= 2 
+    ? modelId.substring(0, 2).toLowerCase() 
+    : (modelId.length === 1 ? modelId[0].toLowerCase() + '0' : '00');
+  
+  // Normalize prefix (only alphanumeric)
+  const normalizedPrefix = /^[a-z0-9]/.test(prefix[0]) ? prefix : '00';
+  return `chunks/lookup_${normalizedPrefix}.json.gz`;
+}
+
+// Bloom filter of all model ids (model_filter.bin, see model_filter.py).
+// null means no filter was uploaded; lookups then always read a chunk.
+// Re-read every DIRECTORY_TTL_MS, so models added by a rebuild stop getting 404s.
+
+async function loadModelFilter(env) {
+  const object = await env.AI_ECOSYSTEM_GRAPH.get('model_filter.bin');
+  if (!object) {
+    return null;
+  }
+  const buffer = await object.arrayBuffer();
+  const header = new DataView(buffer, 0, 32);
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 8));
+  if (magic !== 'AIEBLOOM' || header.getUint32(8, true) !== 1) {
+    console.error('model_filter.bin has an unknown format, ignoring it');
+    return null;
+  }
+  return {
+    numHashes: header.getUint32(12, true),
+    numBits: Number(header.getBigUint64(16, true)),
+    bits: new Uint8Array(buffer, 32)
+  };
+}
+
+const getModelFilter = cachedLoader(loadModelFilter);
+
+// false if modelId is definitely not in the index
+async function mightContain(filter, modelId) {
+  const digest = new DataView(await crypto.subtle.digest('SHA-256', new TextEncoder().encode(modelId)));
+  const h1 = digest.getUint32(0, true);
+  const h2 = digest.getUint32(4, true);
+  for (let i = 0; i < filter.numHashes; i++) {
+    // Below 2^53, so exact in a double
+    const bit = (h1 + i * h2) % filter.numBits;
+    if (!(filter.bits[Math.floor(bit / 8)] & (1 << (bit % 8)))) {
+      return false;
+    }
+  }
+  return true;
+}
+
+// Compare by code point, the order the index builder sorts model ids in
+// (plain < compares UTF-16 code units, which differs for astral characters)
+function compareCodePoints(a, b) {
+  const aPoints = Array.from(a);
+  const bPoints = Array.from(b);
+  const length = Math.min(aPoints.length, bPoints.length);
+  for (let i = 0; i < length; i++) {
+    const diff = aPoints[i].codePointAt(0) - bPoints[i].codePointAt(0);
+    if (diff !== 0) {
+      return diff;
+    }
+  }
+  return aPoints.length - bPoints.length;
+}
+
+// Chunk file of the last range whose first model id is <= modelId, or null
+function findRangeChunk(ranges, modelId) {
+  let low = 0;
+  let high = ranges.length - 1;
+  let found = -1;
+  while (low <= high) {
+    const mid = (low + high) >> 1;
+    if (compareCodePoints(ranges[mid].first, modelId) <= 0) {
+      found = mid;
+      low = mid + 1;
+    } else {
+      high = mid - 1;
+    }
+  }
+  return found >= 0 ? ranges[found].file : null;
+}
+
+// Autocomplete index (autocomplete/root.json.gz) and recently used shards.
+// Shard names carry a content hash, so cached shards never go stale.
+const autocompleteShards = new Map();
+const AUTOCOMPLETE_CACHE_SHARDS = 64;
+const AUTOCOMPLETE_MAX_SHARD_PREFIX = 6;
+const MAX_SEARCH_LIMIT = 100;
+
+async function loadAutocompleteRoot(env) {
+  const object = await env.AI_ECOSYSTEM_GRAPH.get('autocomplete/root.json.gz');
+  if (!object) {
+    throw new Error('Autocomplete index not found');
+  }
+  return readGzipJson(object);
+}
+
+const getAutocompleteRoot = cachedLoader(loadAutocompleteRoot);
+
+async function getAutocompleteShard(env, file) {
+  let shard = autocompleteShards.get(file);
+  if (shard) {
+    // Move to the back of the eviction order
+    autocompleteShards.delete(file);
+  } else {
+    const object = await env.AI_ECOSYSTEM_GRAPH.get(`autocomplete/${file}`);
+    if (!object) {
+      throw new Error(`Autocomplete shard not found: ${file}`);
+    }
+    shard = await readGzipJson(object);
+    if (autocompleteShards.size >= AUTOCOMPLETE_CACHE_SHARDS) {
+      autocompleteShards.delete(autocompleteShards.keys().next().value);
+    }
+  }
+  autocompleteShards.set(file, shard);
+  return shard;
+}
+
+function toCompletions(models, positions, limit) {
+  return positions.slice(0, limit).map((m) => ({ id: models[m][0], downloads: models[m][1], likes: models[m][2] }));
+}
+
+// Top completions for a prefix (same algorithm as autocomplete.py)
+async function complete(env, prefix, limit) {
+  const root = await getAutocompleteRoot(env);
+  const query = prefix.toLowerCase();
+  limit = Math.min(limit, root.top_k);
+  // Own keys only: queries like "constructor" must not match Object.prototype
+  if (Object.hasOwn(root.tops, query)) {
+    return toCompletions(root.models, root.tops[query], limit);
+  }
+
+  let shardPrefix = null;
+  for (let length = Math.min(query.length, AUTOCOMPLETE_MAX_SHARD_PREFIX); length > 1; length--) {
+    if (Object.hasOwn(root.shards, query.substring(0, length))) {
+      shardPrefix = query.substring(0, length);
+      break;
+    }
+  }
+  if (shardPrefix === null) {
+    return [];
+  }
+
+  const shard = await getAutocompleteShard(env, root.shards[shardPrefix]);
+  if (Object.hasOwn(shard.tops, query)) {
+    return toCompletions(shard.models, shard.tops[query], limit);
+  }
+
+  // Few matches (or a long prefix): scan the sorted key range
+  const keys = shard.keys;
+  let low = 0;
+  let high = keys.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (compareCodePoints(keys[mid], query) < 0) {
+      low = mid + 1;
+    } else {
+      high = mid;
+    }
+  }
+  const matches = new Set();
+  for (let i = low; i < keys.length && keys[i].startsWith(query); i++) {
+    matches.add(shard.key_models[i]);
+  }
+  const models = shard.models;
+  const ranked = Array.from(matches).sort((a, b) =>
+    (models[b][1] - models[a][1]) || (models[b][2] - models[a][2]) || compareCodePoints(models[a][0], models[b][0]));
+  return toCompletions(models, ranked, limit);
+}
+
 export default {
   async fetch(request, env) {
     // Handle CORS preflight
@@ -55,25 +274,43 @@ export default {
       return index;
     }
     
-    // Handle search API: /search?q=query (returns matching model IDs)
-    // Note: This endpoint is disabled - search is too slow with full index
-    // Use chunked lookup instead for exact model ID searches
+    // Handle search API: /search?q=query (returns popularity-ranked completions)
+    // Uses the sharded autocomplete index - touches the cached root and at most one shard
     if (pathname === '/search') {
       const query = searchParams.get('q') || '';
-      const limit = parseInt(searchParams.get('limit') || '10');
+      const limitParam = searchParams.get('limit') || '10';
+      if (!/^\d+$/.test(limitParam) || parseInt(limitParam) < 1) {
+        return new Response(JSON.stringify({ matches: [], error: 'limit must be a positive integer' }), {
+          status: 400,
+          headers: {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+          },
+        });
+      }
+      const limit = Math.min(parseInt(limitParam), MAX_SEARCH_LIMIT);
       
-      // Return empty results with CORS headers
-      // Full index search is too slow - use exact model ID lookup instead
-      return new Response(JSON.stringify({ 
-        matches: [],
-        message: 'Search disabled - please enter exact model ID for lookup'
-      }), {
-        headers: {
-          'Content-Type': 'application/json',
-          'Access-Control-Allow-Origin': '*',
-          'Cache-Control': 'public, max-age=300',
-        },
-      });
+      try {
+        const completions = await complete(env, query, limit);
+        return new Response(JSON.stringify({
+          matches: completions.map((completion) => completion.id),
+          completions
+        }), {
+          headers: {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Cache-Control': 'public, max-age=300',
+          },
+        });
+      } catch (error) {
+        return new Response(JSON.stringify({ matches: [], error: error.message }), {
+          status: 500,
+          headers: {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+          },
+        });
+      }
     }
     
     // Handle lookup API: /lookup?model_id=xxx (returns component_id)
@@ -91,18 +328,40 @@ export default {
       }
       
       try {
-        // Get prefix (first 2 characters) for chunk lookup
-        const prefix = modelId.length >= 2 
-          ? modelId.substring(0, 2).toLowerCase() 
-          : (modelId.length === 1 ? modelId[0].toLowerCase() + '0' : '00');
-        
-        // Normalize prefix (only alphanumeric)
-        const normalizedPrefix = /^[a-z0-9]/.test(prefix[0]) ? prefix : '00';
+        // Unknown ids (typos, models newer than the export) are answered without reading a chunk
+        const filter = await getModelFilter(env);
+        if (filter && !(await mightContain(filter, modelId))) {
+          return new Response(JSON.stringify({ error: 'Model not found', component_id: null }), {
+            status: 404,
+            headers: {
+              'Content-Type': 'application/json',
+              'Access-Control-Allow-Origin': '*',
+            },
+          });
+        }
+
+        let chunkKey = await findChunkKey(env, modelId);
+        if (!chunkKey) {
+          return new Response(JSON.stringify({ error: 'Model not found', component_id: null }), {
+            status: 404,
+            headers: {
+              'Content-Type': 'application/json',
+              'Access-Control-Allow-Origin': '*',
+            },
+          });
+        }
         
         // Load only the relevant chunk
         // Note: chunks were uploaded without 'components/' prefix
-        const chunkKey = `chunks/lookup_${normalizedPrefix}.json.gz`;
-        const chunkObject = await env.AI_ECOSYSTEM_GRAPH.get(chunkKey);
+        let chunkObject = await env.AI_ECOSYSTEM_GRAPH.get(chunkKey);
+        if (!chunkObject) {
+          // The cached directory may name chunks a rebuild has replaced; reload it once
+          const freshKey = await findChunkKey(env, modelId, true);
+          if (freshKey && freshKey !== chunkKey) {
+            chunkKey = freshKey;
+            chunkObject = await env.AI_ECOSYSTEM_GRAPH.get(chunkKey);
+          }
+        }
         
         if (!chunkObject) {
           // Chunk not found - log for debugging
@@ -121,12 +380,7 @@ export default {
         }
         
         // Decompress and parse chunk
-        const compressedData = await chunkObject.arrayBuffer();
-        const stream = new DecompressionStream('gzip');
-        const decompressedStream = new Response(compressedData).body.pipeThrough(stream);
-        const decompressedData = await new Response(decompressedStream).arrayBuffer();
-        const jsonText = new TextDecoder().decode(decompressedData);
-        const chunkData = JSON.parse(jsonText);
+        const chunkData = await readGzipJson(chunkObject);
         
         // Look up in chunk
         const componentId = chunkData.index[modelId];
@@ -0,0 +1,398 @@
+"""
+Compact binary columnar encoding of component payloads.
+
+The JSON component files repeat every model id in nodes[].id, nodes[].name
+and again in each edge, and store enum-like fields (type, pipeline_tag,
+library_name) as full strings per record. This format stores the same payload
+as columns (all integers little-endian):
+
+    magic      b'AIECOMP1'
+    header     u32 nodes, u32 edges, i64 component_id, u16 columns, u16 shapes
+    ids        string table of node ids (names are derived from the ids)
+    shapes     distinct node key orders; u16 shape code per node
+    columns    one per node attribute:
+               numeric    int32 / int64 values when all are integers, otherwise
+                          float64 values + u8 kind (null / int / float)
+               timestamp  int64 epoch ms + u8 kind (null / ISO-8601 ms / raw string)
+               category   string dictionary + int32 codes (-1 = null)
+    edges      u32 source indices, u32 target indices, 'type' category column
+
+String tables are u32 count, u32 character offsets and one UTF-8 blob, so a
+whole table is decoded with a single bytes.decode(). decode_component()
+rebuilds a payload that serializes to exactly the same JSON as the original;
+decode_columns() returns the raw arrays without building any dicts.
+
+Run as a script to compare sizes and decode times against the JSON files:
+
+    python component_binary.py components/
+"""
+import gzip
+import json
+import os
+import re
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+MAGIC = b'AIECOMP1'
+BINARY_SUFFIX = '.bin.gz'
+
+# Column kinds
+NUMERIC = 1
+TIMESTAMP = 2
+CATEGORY = 3
+
+# Special column references in node shapes
+ID_KEY = 0xFFFF
+NAME_KEY = 0xFFFE
+
+# Per-value kinds for numeric columns
+NUM_NULL, NUM_INT, NUM_FLOAT = 0, 1, 2
+# Per-value kinds for timestamp columns
+TS_NULL, TS_ISO, TS_RAW = 0, 1, 2
+
+_ISO_MS = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z$')
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _node_name(node_id):
+    return node_id.split('/')[-1] if '/' in node_id else node_id
+
+def _pack_strings(strings):
+    offsets = np.zeros(len(strings) + 1, dtype='<u4')
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    blob = ''.join(strings).encode('utf-8')
+    return struct.pack('<II', len(strings), len(blob)) + offsets.tobytes() + blob
+
+def _unpack_strings(buf, pos):
+    count, blob_len = struct.unpack_from('<II', buf, pos)
+    pos += 8
+    offsets = np.frombuffer(buf, dtype='<u4', count=count + 1, offset=pos).tolist()
+    pos += (count + 1) * 4
+    text = bytes(buf[pos:pos + blob_len]).decode('utf-8')
+    pos += blob_len
+    return [text[offsets[i]:offsets[i + 1]] for i in range(count)], pos
+
+def _iso_to_ms(value):
+    dt = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+def _ms_to_iso(ms):
+    seconds, millis = divmod(int(ms), 1000)
+    dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S') + f'.{millis:03d}Z'
+
+def _column_kind(key, values):
+    """Pick the encoding for a column from its (non-missing) values"""
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return NUMERIC
+    if all(isinstance(v, str) for v in present):
+        if key == 'createdAt':
+            return TIMESTAMP
+        return CATEGORY
+    raise ValueError(f"Unsupported values in column '{key}'")
+
+# Numeric column layouts
+NUM_LAYOUT_MIXED, NUM_LAYOUT_INT32, NUM_LAYOUT_INT64 = 0, 1, 2
+
+def _encode_numeric(values):
+    if all(isinstance(v, int) for v in values):
+        # Plain integer columns (likes, downloads) need no per-value kinds
+        ints = np.asarray(values, dtype='<i8') if values else np.zeros(0, dtype='<i8')
+        if len(ints) == 0 or (ints.min() >= -2 ** 31 and ints.max() < 2 ** 31):
+            return struct.pack('<B', NUM_LAYOUT_INT32) + ints.astype('<i4').tobytes()
+        return struct.pack('<B', NUM_LAYOUT_INT64) + ints.tobytes()
+
+    data = np.zeros(len(values), dtype='<f8')
+    kinds = np.zeros(len(values), dtype=np.uint8)
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        if isinstance(v, int):
+            if abs(v) > 2 ** 53:
+                raise ValueError(f"Integer {v} cannot be stored exactly")
+            kinds[i] = NUM_INT
+        else:
+            kinds[i] = NUM_FLOAT
+        data[i] = v
+    return struct.pack('<B', NUM_LAYOUT_MIXED) + data.tobytes() + kinds.tobytes()
+
+def _decode_numeric(buf, pos, count):
+    (layout,) = struct.unpack_from('<B', buf, pos)
+    pos += 1
+    if layout != NUM_LAYOUT_MIXED:
+        dtype = '<i4' if layout == NUM_LAYOUT_INT32 else '<i8'
+        data = np.frombuffer(buf, dtype=dtype, count=count, offset=pos)
+        return (data, None), pos + count * data.itemsize
+
+    data = np.frombuffer(buf, dtype='<f8', count=count, offset=pos)
+    kinds = np.frombuffer(buf, dtype=np.uint8, count=count, offset=pos + count * 8)
+    return (data, kinds), pos + count * 9
+
+def _encode_timestamp(values):
+    data = np.zeros(len(values), dtype='<i8')
+    kinds = np.zeros(len(values), dtype=np.uint8)
+    raw = []
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        if _ISO_MS.match(v):
+            kinds[i] = TS_ISO
+            data[i] = _iso_to_ms(v)
+        else:
+            # Keep anything that is not a canonical timestamp verbatim
+            kinds[i] = TS_RAW
+            data[i] = len(raw)
+            raw.append(v)
+    return data.tobytes() + kinds.tobytes() + _pack_strings(raw)
+
+def _decode_timestamp(buf, pos, count):
+    data = np.frombuffer(buf, dtype='<i8', count=count, offset=pos)
+    kinds = np.frombuffer(buf, dtype=np.uint8, count=count, offset=pos + count * 8)
+    raw, pos = _unpack_strings(buf, pos + count * 9)
+    return (data, kinds, raw), pos
+
+def _encode_category(values):
+    dictionary = {}
+    codes = np.full(len(values), -1, dtype='<i4')
+    for i, v in enumerate(values):
+        if v is not None:
+            codes[i] = dictionary.setdefault(v, len(dictionary))
+    return _pack_strings(list(dictionary)) + codes.tobytes()
+
+def _decode_category(buf, pos, count):
+    dictionary, pos = _unpack_strings(buf, pos)
+    codes = np.frombuffer(buf, dtype='<i4', count=count, offset=pos)
+    return (dictionary, codes), pos + count * 4
+
+_ENCODERS = {NUMERIC: _encode_numeric, TIMESTAMP: _encode_timestamp, CATEGORY: _encode_category}
+_DECODERS = {NUMERIC: _decode_numeric, TIMESTAMP: _decode_timestamp, CATEGORY: _decode_category}
+
+def encode_component(component_json):
+    """Encode a component payload (component_N.json.gz schema) as bytes"""
+    nodes = component_json['nodes']
+    edges = component_json['edges']
+    metadata = component_json['metadata']
+    if set(metadata) != {'component_id', 'total_nodes', 'total_edges'}:
+        raise ValueError(f"Unsupported metadata keys: {sorted(metadata)}")
+
+    node_ids = [node['id'] for node in nodes]
+    position = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    # Columns in first-seen key order, shapes = distinct per-node key orders
+    column_keys = []
+    column_lookup = {}
+    shapes = []
+    shape_lookup = {}
+    shape_codes = np.zeros(len(nodes), dtype='<u2')
+    for i, node in enumerate(nodes):
+        if node.get('name') != _node_name(node['id']):
+            raise ValueError(f"Node name is not derived from id: {node['id']}")
+        shape = []
+        for key in node:
+            if key == 'id':
+                shape.append(ID_KEY)
+            elif key == 'name':
+                shape.append(NAME_KEY)
+            else:
+                if key not in column_lookup:
+                    column_lookup[key] = len(column_keys)
+                    column_keys.append(key)
+                shape.append(column_lookup[key])
+        shape = tuple(shape)
+        if shape not in shape_lookup:
+            shape_lookup[shape] = len(shapes)
+            shapes.append(shape)
+        shape_codes[i] = shape_lookup[shape]
+
+    parts = [
+        MAGIC,
+        struct.pack('<IIqHH', len(nodes), len(edges), metadata['component_id'], len(column_keys), len(shapes)),
+        _pack_strings(node_ids)
+    ]
+    for shape in shapes:
+        parts.append(struct.pack('<H', len(shape)) + np.asarray(shape, dtype='<u2').tobytes())
+    parts.append(shape_codes.tobytes())
+
+    # Absent keys are encoded as null; the node's shape says whether to emit them
+    for key in column_keys:
+        values = [node.get(key) for node in nodes]
+        kind = _column_kind(key, values)
+        key_bytes = key.encode('utf-8')
+        parts.append(struct.pack('<HB', len(key_bytes), kind) + key_bytes)
+        parts.append(_ENCODERS[kind](values))
+
+    for edge in edges:
+        if len(edge) != 3 or 'type' not in edge:
+            raise ValueError(f"Unsupported edge keys: {sorted(edge)}")
+    parts.append(np.asarray([position[e['source']] for e in edges], dtype='<u4').tobytes())
+    parts.append(np.asarray([position[e['target']] for e in edges], dtype='<u4').tobytes())
+    parts.append(_encode_category([e['type'] for e in edges]))
+    return b''.join(parts)
+
+def decode_columns(data):
+    """
+    Decode an encoded component into raw columns without building records.
+
+    Returns a dict with 'component_id', 'node_ids', 'shapes', 'shape_codes',
+    'columns' (key -> (kind, arrays)), 'edge_source', 'edge_target' (uint32
+    node indices) and 'edge_type' (dictionary, codes).
+    """
+    buf = memoryview(data)
+    if bytes(buf[:8]) != MAGIC:
+        raise ValueError("Not an encoded component")
+    num_nodes, num_edges, component_id, num_columns, num_shapes = struct.unpack_from('<IIqHH', buf, 8)
+    pos = 8 + struct.calcsize('<IIqHH')
+
+    node_ids, pos = _unpack_strings(buf, pos)
+    shapes = []
+    for _ in range(num_shapes):
+        (length,) = struct.unpack_from('<H', buf, pos)
+        shapes.append(np.frombuffer(buf, dtype='<u2', count=length, offset=pos + 2).tolist())
+        pos += 2 + length * 2
+    shape_codes = np.frombuffer(buf, dtype='<u2', count=num_nodes, offset=pos)
+    pos += num_nodes * 2
+
+    columns = {}
+    for _ in range(num_columns):
+        key_len, kind = struct.unpack_from('<HB', buf, pos)
+        key = bytes(buf[pos + 3:pos + 3 + key_len]).decode('utf-8')
+        arrays, pos = _DECODERS[kind](buf, pos + 3 + key_len, num_nodes)
+        columns[key] = (kind, arrays)
+
+    edge_source = np.frombuffer(buf, dtype='<u4', count=num_edges, offset=pos)
+    pos += num_edges * 4
+    edge_target = np.frombuffer(buf, dtype='<u4', count=num_edges, offset=pos)
+    pos += num_edges * 4
+    edge_type, pos = _decode_category(buf, pos, num_edges)
+
+    return {
+        'component_id': component_id,
+        'node_ids': node_ids,
+        'shapes': shapes,
+        'shape_codes': shape_codes,
+        'columns': columns,
+        'edge_source': edge_source,
+        'edge_target': edge_target,
+        'edge_type': edge_type
+    }
+
+def _column_values(kind, arrays):
+    """Expand a decoded column into a list of Python values"""
+    if kind == NUMERIC:
+        data, kinds = arrays
+        if kinds is None:
+            return data.tolist()
+        return [None if k == NUM_NULL else (int(v) if k == NUM_INT else v)
+                for v, k in zip(data.tolist(), kinds.tolist())]
+    if kind == TIMESTAMP:
+        data, kinds, raw = arrays
+        return [None if k == TS_NULL else (_ms_to_iso(v) if k == TS_ISO else raw[v])
+                for v, k in zip(data.tolist(), kinds.tolist())]
+    dictionary, codes = arrays
+    return [dictionary[c] if c >= 0 else None for c in codes.tolist()]
+
+def decode_component(data):
+    """Decode an encoded component back into the component_N.json.gz payload"""
+    decoded = decode_columns(data)
+    node_ids = decoded['node_ids']
+    keys = list(decoded['columns'])
+    values = [_column_values(kind, arrays) for kind, arrays in decoded['columns'].values()]
+
+    nodes = []
+    shapes = decoded['shapes']
+    for i, shape_code in enumerate(decoded['shape_codes'].tolist()):
+        node = {}
+        for ref in shapes[shape_code]:
+            if ref == ID_KEY:
+                node['id'] = node_ids[i]
+            elif ref == NAME_KEY:
+                node['name'] = _node_name(node_ids[i])
+            else:
+                node[keys[ref]] = values[ref][i]
+        nodes.append(node)
+
+    type_names, type_codes = decoded['edge_type']
+    edges = [
+        {'source': node_ids[s], 'target': node_ids[t], 'type': type_names[c]}
+        for s, t, c in zip(decoded['edge_source'].tolist(), decoded['edge_target'].tolist(), type_codes.tolist())
+    ]
+
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'metadata': {
+            'component_id': decoded['component_id'],
+            'total_nodes': len(nodes),
+            'total_edges': len(edges)
+        }
+    }
+
+def write_binary_component(component_json, output_dir):
+    """Save a component as component_N.bin.gz, returning the file path"""
+    component_id = component_json['metadata']['component_id']
+    binary_file = os.path.join(output_dir, f'component_{component_id}{BINARY_SUFFIX}')
+    with gzip.open(binary_file, 'wb') as f:
+        f.write(encode_component(component_json))
+    return binary_file
+
+def read_binary_component(component_id, base='components'):
+    """Load component_N.bin.gz as a component payload"""
+    with gzip.open(os.path.join(base, f'component_{component_id}{BINARY_SUFFIX}'), 'rb') as f:
+        return decode_component(f.read())
+
+def compare_formats(components_dir='components', limit=None):
+    """
+    Compare JSON+gzip and binary+gzip component files: total size and decode time.
+
+    Components without a .bin.gz file are encoded in memory for the comparison.
+    """
+    json_files = sorted(f for f in os.listdir(components_dir)
+                        if f.startswith('component_') and f.endswith('.json.gz') and f != 'component_index.json.gz')
+    if limit:
+        json_files = json_files[:limit]
+
+    totals = {'json_bytes': 0, 'binary_bytes': 0, 'json_seconds': 0.0, 'binary_seconds': 0.0,
+              'columns_seconds': 0.0}
+    for name in json_files:
+        with open(os.path.join(components_dir, name), 'rb') as f:
+            json_gz = f.read()
+        binary_name = name[:-len('.json.gz')] + BINARY_SUFFIX
+        binary_path = os.path.join(components_dir, binary_name)
+        if os.path.exists(binary_path):
+            with open(binary_path, 'rb') as f:
+                binary_gz = f.read()
+        else:
+            binary_gz = gzip.compress(encode_component(json.loads(gzip.decompress(json_gz))))
+
+        start = time.perf_counter()
+        component = json.loads(gzip.decompress(json_gz))
+        totals['json_seconds'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = decode_component(gzip.decompress(binary_gz))
+        totals['binary_seconds'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        decode_columns(gzip.decompress(binary_gz))
+        totals['columns_seconds'] += time.perf_counter() - start
+
+        if json.dumps(decoded) != json.dumps(component):
+            print(f"  Warning: {name} does not round-trip")
+        totals['json_bytes'] += len(json_gz)
+        totals['binary_bytes'] += len(binary_gz)
+
+    print(f"Compared {len(json_files)} components")
+    print(f"  JSON+gzip:   {totals['json_bytes'] / (1024 * 1024):.2f} MB, decode {totals['json_seconds']:.3f}s")
+    print(f"  Binary+gzip: {totals['binary_bytes'] / (1024 * 1024):.2f} MB, decode {totals['binary_seconds']:.3f}s "
+          f"(columns only {totals['columns_seconds']:.3f}s)")
+    if totals['json_bytes']:
+        print(f"  Size ratio:  {totals['binary_bytes'] / totals['json_bytes']:.2%}")
+    return totals
+
+if __name__ == '__main__':
+    compare_formats(sys.argv[1] if len(sys.argv) > 1 else 'components')
@@ -0,0 +1,247 @@
+"""
+Columnar catalog of exported components, queryable without opening any component file.
+
+component_stats in component_index.json.gz only has node / edge counts and
+sits behind the whole model -> component map. The export also writes
+components/component_catalog.npz, one row per component:
+
+    component_id, nodes, edges              int64
+    downloads, likes, max_downloads         int64 (totals over the nodes, and the top model)
+    created_min, created_max                datetime64[D] (NaT without dates)
+    edge_type_counts                        int64 (components, edge types), names in edge_types
+    pipeline_tag_*, library_name_*          sparse per-component distributions:
+                                            <column>_offsets (components + 1), <column>_codes,
+                                            <column>_counts, names in <column>_names
+
+Nodes without a pipeline_tag / library_name are not counted, so a
+component's shares of a column can sum to less than 1.
+
+    catalog = ComponentCatalog('components')
+    ids = catalog.query(min_nodes=50, max_nodes=500, edge_type='quantized', min_share=0.5)
+    picks = catalog.sample(40, seed=0, min_nodes=3, max_nodes=1200)
+
+Exports written before the catalog existed get one from
+python build_indexes.py --outputs catalog.
+"""
+import argparse
+import os
+from collections import Counter
+
+import numpy as np
+
+CATALOG_FILE = 'component_catalog.npz'
+
+# Node columns with a per-component distribution
+DISTRIBUTIONS = ('pipeline_tag', 'library_name')
+
+def as_count(value):
+    """downloads / likes as an int (missing or NaN count as 0)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value:
+        return int(value)
+    return 0
+
+def catalog_row(component_json):
+    """Catalog entry of one component payload (plain Python values, cheap to send between processes)"""
+    nodes = component_json['nodes']
+    edges = component_json['edges']
+    downloads = [as_count(node.get('downloads')) for node in nodes]
+    dates = [node['createdAt'][:10] for node in nodes if isinstance(node.get('createdAt'), str)]
+    row = {
+        'component_id': component_json['metadata']['component_id'],
+        'nodes': len(nodes),
+        'edges': len(edges),
+        'downloads': sum(downloads),
+        'likes': sum(as_count(node.get('likes')) for node in nodes),
+        'max_downloads': max(downloads, default=0),
+        'created_min': min(dates, default=None),
+        'created_max': max(dates, default=None),
+        'edge_types': dict(Counter(edge.get('type', 'unknown') for edge in edges))
+    }
+    for column in DISTRIBUTIONS:
+        row[column] = dict(Counter(node[column] for node in nodes if isinstance(node.get(column), str)))
+    return row
+
+def write_catalog(rows, output_dir):
+    """Write catalog rows (from catalog_row) as output_dir/component_catalog.npz; returns the path"""
+    rows = sorted(rows, key=lambda row: row['component_id'])
+    columns = {
+        name: np.array([row[name] for row in rows], dtype=np.int64)
+        for name in ('component_id', 'nodes', 'edges', 'downloads', 'likes', 'max_downloads')
+    }
+    for name in ('created_min', 'created_max'):
+        columns[name] = np.array([row[name] or 'NaT' for row in rows], dtype='datetime64[D]')
+
+    edge_types = sorted({edge_type for row in rows for edge_type in row['edge_types']})
+    counts = np.zeros((len(rows), len(edge_types)), dtype=np.int64)
+    for i, row in enumerate(rows):
+        for edge_type, count in row['edge_types'].items():
+            counts[i, edge_types.index(edge_type)] = count
+    columns['edge_types'] = np.array(edge_types, dtype=str)
+    columns['edge_type_counts'] = counts
+
+    for column in DISTRIBUTIONS:
+        names = sorted({name for row in rows for name in row[column]})
+        code = {name: i for i, name in enumerate(names)}
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        codes, values = [], []
+        for i, row in enumerate(rows):
+            for name, count in row[column].items():
+                codes.append(code[name])
+                values.append(count)
+            offsets[i + 1] = len(codes)
+        columns[f'{column}_names'] = np.array(names, dtype=str)
+        columns[f'{column}_offsets'] = offsets
+        columns[f'{column}_codes'] = np.array(codes, dtype=np.int32)
+        columns[f'{column}_counts'] = np.array(values, dtype=np.int64)
+
+    path = os.path.join(output_dir, CATALOG_FILE)
+    # np.savez adds .npz to names without it, so write through a file object
+    with open(path + '.tmp', 'wb') as f:
+        np.savez_compressed(f, **columns)
+    os.replace(path + '.tmp', path)
+    return path
+
+class ComponentCatalog:
+    """
+    Filter and sample components by their catalog columns.
+
+    Columns are NumPy arrays aligned by row (sorted by component_id), e.g.
+    catalog.nodes, catalog.downloads; query() returns component ids.
+    """
+
+    def __init__(self, base='components'):
+        with np.load(os.path.join(base, CATALOG_FILE)) as data:
+            self.columns = {name: data[name] for name in data.files}
+        self.component_ids = self.columns['component_id']
+        self.nodes = self.columns['nodes']
+        self.edges = self.columns['edges']
+        self.downloads = self.columns['downloads']
+        self.likes = self.columns['likes']
+        self.max_downloads = self.columns['max_downloads']
+        self.created_min = self.columns['created_min']
+        self.created_max = self.columns['created_max']
+        self.edge_types = self.columns['edge_types'].tolist()
+        self._rows = None
+
+    def __len__(self):
+        return len(self.component_ids)
+
+    def edge_type_share(self, edge_type):
+        """Per-row fraction of edges of edge_type (0 for components without edges)"""
+        if edge_type not in self.edge_types:
+            return np.zeros(len(self))
+        counts = self.columns['edge_type_counts'][:, self.edge_types.index(edge_type)]
+        return counts / np.maximum(self.edges, 1)
+
+    def share(self, column, name):
+        """Per-row fraction of nodes whose column (pipeline_tag / library_name) is name"""
+        if column not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown column {column!r}; expected one of {', '.join(DISTRIBUTIONS)}")
+        names = self.columns[f'{column}_names'].tolist()
+        counts = np.zeros(len(self), dtype=np.int64)
+        if name in names:
+            codes = self.columns[f'{column}_codes']
+            match = codes == names.index(name)
+            rows = np.searchsorted(self.columns[f'{column}_offsets'], np.flatnonzero(match), side='right') - 1
+            np.add.at(counts, rows, self.columns[f'{column}_counts'][match])
+        return counts / np.maximum(self.nodes, 1)
+
+    def mask(self, min_nodes=None, max_nodes=None, min_edges=None, max_edges=None, edge_type=None,
+             pipeline_tag=None, library_name=None, min_share=None, min_downloads=None, created_after=None,
+             created_before=None):
+        """
+        Boolean row mask of the components matching every given filter.
+
+        edge_type, pipeline_tag and library_name require a share of at least
+        min_share (default: any); created_after / created_before ('YYYY-MM-DD')
+        compare with the component's first and last model dates.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for column, low, high in ((self.nodes, min_nodes, max_nodes), (self.edges, min_edges, max_edges)):
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        if min_downloads is not None:
+            mask &= self.downloads >= min_downloads
+        if created_after is not None:
+            mask &= self.created_min >= np.datetime64(created_after, 'D')
+        if created_before is not None:
+            mask &= self.created_max <= np.datetime64(created_before, 'D')
+
+        def matches(shares):
+            return shares >= min_share if min_share is not None else shares > 0
+
+        if edge_type is not None:
+            mask &= matches(self.edge_type_share(edge_type))
+        if pipeline_tag is not None:
+            mask &= matches(self.share('pipeline_tag', pipeline_tag))
+        if library_name is not None:
+            mask &= matches(self.share('library_name', library_name))
+        return mask
+
+    def query(self, **filters):
+        """Component ids matching the filters (see mask())"""
+        return self.component_ids[self.mask(**filters)]
+
+    def sample(self, k, seed=None, weight=None, **filters):
+        """
+        Up to k distinct component ids matching the filters, at random.
+
+        weight: None (uniform) or a column name ('nodes', 'downloads', ...)
+        to draw components in proportion to.
+        """
+        rows = np.flatnonzero(self.mask(**filters))
+        rng = np.random.default_rng(seed)
+        p = None
+        if weight is not None and len(rows):
+            weights = self.columns[weight][rows].astype(np.float64)
+            if weights.sum() > 0:
+                p = weights / weights.sum()
+                k = min(k, int(np.count_nonzero(p)))
+        picks = rng.choice(rows, size=min(k, len(rows)), replace=False, p=p)
+        return self.component_ids[picks].tolist()
+
+    def row(self, component_id):
+        """Everything the catalog knows about one component, as a dict"""
+        if self._rows is None:
+            self._rows = {component_id: i for i, component_id in enumerate(self.component_ids.tolist())}
+        i = self._rows[component_id]
+        row = {name: self.columns[name][i].item()
+               for name in ('component_id', 'nodes', 'edges', 'downloads', 'likes', 'max_downloads')}
+        for name in ('created_min', 'created_max'):
+            value = self.columns[name][i]
+            row[name] = None if np.isnat(value) else str(value)
+        row['edge_types'] = {edge_type: int(count)
+                             for edge_type, count in zip(self.edge_types, self.columns['edge_type_counts'][i])
+                             if count}
+        for column in DISTRIBUTIONS:
+            start, end = self.columns[f'{column}_offsets'][i:i + 2]
+            names = self.columns[f'{column}_names']
+            row[column] = {str(names[code]): int(count) for code, count in
+                           zip(self.columns[f'{column}_codes'][start:end], self.columns[f'{column}_counts'][start:end])}
+        return row
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the component catalog')
+    parser.add_argument('--components-dir', default='components', help='Directory with component_catalog.npz')
+    parser.add_argument('--min-nodes', type=int)
+    parser.add_argument('--max-nodes', type=int)
+    parser.add_argument('--edge-type', help='Edge type the components must contain')
+    parser.add_argument('--pipeline-tag', help='pipeline_tag the components must contain')
+    parser.add_argument('--library-name', help='library_name the components must contain')
+    parser.add_argument('--min-share', type=float, help='Minimum share of the edge type / tag / library')
+    parser.add_argument('--sample', type=int, help='Print this many random matches instead of all')
+    parser.add_argument('--seed', type=int, help='Random seed for --sample')
+    args = parser.parse_args()
+
+    catalog = ComponentCatalog(args.components_dir)
+    filters = {'min_nodes': args.min_nodes, 'max_nodes': args.max_nodes, 'edge_type': args.edge_type,
+               'pipeline_tag': args.pipeline_tag, 'library_name': args.library_name, 'min_share': args.min_share}
+    matches = catalog.query(**filters)
+    print(f"{len(matches):,} of {len(catalog):,} components match")
+    shown = catalog.sample(args.sample, args.seed, **filters) if args.sample else matches[:20].tolist()
+    for component_id in shown:
+        row = catalog.row(component_id)
+        print(f"  component {component_id}: {row['nodes']} nodes, {row['edges']} edges, "
+              f"{row['downloads']:,} downloads, edge types {row['edge_types']}")
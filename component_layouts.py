@@ -0,0 +1,230 @@
+"""
+Precomputed 3D layouts for exported components.
+
+The export pipeline lays out each component once (layout_3d.force_layout_3d)
+and stores the positions as float32 in a single sidecar file, in the same node
+order as the component's nodes list:
+
+    components/layouts/positions.f32          # float32 x, y, z per node, all components
+    components/layouts/layout_index.json.gz
+    {
+      "params": {"algorithm": "force_3d", "iterations": 50, "seed": 0},
+      "components": {"17": [node_offset, node_count, "<content sha256>"], ...}
+    }
+
+A component's positions are the byte range [node_offset * 12, (node_offset +
+node_count) * 12) of positions.f32. Layouts are reused on re-export while the
+component's content hash and the layout params are unchanged, and read only
+for a component whose content hash and node count match the entry. A full
+(non-incremental) export without layouts removes layouts/.
+
+Layouts computed outside the export (create_magazine_cover.py) go to a
+LayoutCache instead: one .npy file per (component id, content hash, params),
+so a layout is computed once however often the cover is re-rendered.
+compute_layouts() lays out many components in a process pool.
+"""
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import component_manifest
+from layout_3d import force_layout_3d
+
+LAYOUTS_DIR = 'layouts'
+POSITIONS_FILE = 'positions.f32'
+LAYOUT_INDEX_FILE = 'layout_index.json.gz'
+
+# Components larger than this are not laid out by the export
+LAYOUT_MAX_NODES = 2000
+LAYOUT_ITERATIONS = 50
+LAYOUT_SEED = 0
+
+# Bytes per node: three little-endian float32 values
+NODE_BYTES = 12
+
+# Default LayoutCache directory
+LAYOUT_CACHE_DIR = 'layout_cache'
+
+def layout_params(iterations=LAYOUT_ITERATIONS, seed=LAYOUT_SEED, method=None):
+    """
+    Parameters that determine a layout; layouts are reused only if these match.
+
+    method (see layout_3d.METHODS) is only recorded when given, so the
+    export's params, and the layouts stored with them, stay as they were.
+    """
+    params = {'algorithm': 'force_3d', 'iterations': iterations, 'seed': seed}
+    if method is not None:
+        params['method'] = method
+    return params
+
+def component_hash(component_json):
+    """Content hash of a component payload, the same hash the export records in the manifest"""
+    return component_manifest.content_hash(json.dumps(component_json))
+
+def compute_component_layout(component_json, params):
+    """Lay out one component payload, returning float32 positions in node order"""
+    nodes = component_json['nodes']
+    position = {node['id']: i for i, node in enumerate(nodes)}
+    edge_src = [position[edge['source']] for edge in component_json['edges']]
+    edge_dst = [position[edge['target']] for edge in component_json['edges']]
+    pos = force_layout_3d(len(nodes), edge_src, edge_dst, iterations=params['iterations'], seed=params['seed'],
+                          method=params.get('method', 'auto'))
+    return pos.astype('<f4')
+
+def _layout_task(task):
+    component_id, component_json, params = task
+    return component_id, compute_component_layout(component_json, params)
+
+def compute_layouts(components, params, workers=1):
+    """
+    Lay out [(component_id, component_json), ...] in a pool of worker processes.
+
+    Returns {component_id: float32 positions in node order}. Larger
+    components are submitted first so no worker is left with a big one at
+    the end.
+    """
+    tasks = sorted(((component_id, component_json, params) for component_id, component_json in components),
+                   key=lambda task: len(task[1]['nodes']), reverse=True)
+    if workers <= 1 or len(tasks) <= 1:
+        return dict(map(_layout_task, tasks))
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        return dict(executor.map(_layout_task, tasks))
+
+def load_layout_index(base='components'):
+    """Load the layout index from a components directory, or None if there is none"""
+    index_file = os.path.join(base, LAYOUTS_DIR, LAYOUT_INDEX_FILE)
+    if not os.path.exists(index_file):
+        return None
+    with gzip.open(index_file, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+def read_layout(component_id, base='components', index=None, content_hash=None, node_count=None):
+    """
+    Read a component's precomputed positions.
+
+    content_hash (component_hash of the component payload) and node_count
+    are those of the component being drawn; a stored layout made for other
+    content is not returned. Returns a float32 array of shape (nodes, 3)
+    aligned with the component's nodes list, or None.
+    """
+    if index is None:
+        index = load_layout_index(base)
+    entry = index['components'].get(str(component_id)) if index else None
+    if entry is None:
+        return None
+    node_offset, stored_count, stored_hash = entry
+    if content_hash is not None and stored_hash != content_hash:
+        return None
+    if node_count is not None and stored_count != node_count:
+        return None
+
+    with open(os.path.join(base, LAYOUTS_DIR, POSITIONS_FILE), 'rb') as f:
+        f.seek(node_offset * NODE_BYTES)
+        data = f.read(stored_count * NODE_BYTES)
+    return np.frombuffer(data, dtype='<f4').reshape(stored_count, 3)
+
+class LayoutWriter:
+    """Write a new layout store, reusing unchanged layouts from the previous one"""
+
+    def __init__(self, output_dir, params):
+        self.layouts_dir = os.path.join(output_dir, LAYOUTS_DIR)
+        self.params = params
+        self.components = {}
+        self.computed = 0
+        self.reused = 0
+        os.makedirs(self.layouts_dir, exist_ok=True)
+
+        # Previous layouts can only be reused if they were made with the same params
+        self.previous = None
+        self._previous_positions = None
+        previous = load_layout_index(output_dir)
+        previous_file = os.path.join(self.layouts_dir, POSITIONS_FILE)
+        if (previous is not None and previous.get('params') == params
+                and os.path.exists(previous_file) and os.path.getsize(previous_file) > 0):
+            self.previous = previous['components']
+            self._previous_positions = np.memmap(previous_file, dtype='<f4', mode='r')
+
+        self._positions_file = os.path.join(self.layouts_dir, POSITIONS_FILE)
+        self._file = open(self._positions_file + '.tmp', 'wb')
+        self._offset = 0
+
+    def previous_hashes(self):
+        """component_id -> content hash of every reusable layout"""
+        if not self.previous:
+            return {}
+        return {int(comp_id): entry[2] for comp_id, entry in self.previous.items()}
+
+    def _append(self, component_id, content_hash, positions):
+        positions = np.ascontiguousarray(positions, dtype='<f4')
+        self._file.write(positions.tobytes())
+        self.components[str(component_id)] = [self._offset, len(positions), content_hash]
+        self._offset += len(positions)
+
+    def add(self, component_id, content_hash, positions):
+        """Store freshly computed positions for a component"""
+        self._append(component_id, content_hash, positions)
+        self.computed += 1
+
+    def reuse(self, component_id, content_hash):
+        """Copy a component's previous layout if its content hash is unchanged"""
+        entry = self.previous.get(str(component_id)) if self.previous else None
+        if entry is None or entry[2] != content_hash:
+            return False
+        node_offset, node_count, _ = entry
+        flat = self._previous_positions[node_offset * 3:(node_offset + node_count) * 3]
+        self._append(component_id, content_hash, flat.reshape(node_count, 3))
+        self.reused += 1
+        return True
+
+    def close(self):
+        """Swap in the new positions file and write the layout index"""
+        self._file.close()
+        self._previous_positions = None
+        os.replace(self._positions_file + '.tmp', self._positions_file)
+
+        index_file = os.path.join(self.layouts_dir, LAYOUT_INDEX_FILE)
+        with gzip.open(index_file, 'wt', encoding='utf-8') as f:
+            json.dump({'params': self.params, 'components': self.components}, f)
+        return index_file
+
+class LayoutCache:
+    """
+    Computed layouts on disk, one float32 .npy file per entry:
+
+        <cache_dir>/component_<id>_<key>.npy
+
+    key hashes the component's content hash and the layout params, so an
+    entry is only found while the component and the params are unchanged.
+    """
+
+    def __init__(self, cache_dir=LAYOUT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, component_id, content_hash, params):
+        key = hashlib.sha256(json.dumps([content_hash, params], sort_keys=True).encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.cache_dir, f'component_{component_id}_{key}.npy')
+
+    def get(self, component_id, content_hash, params):
+        """Cached positions, or None"""
+        try:
+            positions = np.load(self.path(component_id, content_hash, params))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return positions
+
+    def put(self, component_id, content_hash, params, positions):
+        path = self.path(component_id, content_hash, params)
+        # Write then rename, so a concurrent reader never sees a partial file
+        temp_file = f'{path}.{os.getpid()}.tmp'
+        with open(temp_file, 'wb') as f:
+            np.save(f, np.ascontiguousarray(positions, dtype='<f4'))
+        os.replace(temp_file, path)
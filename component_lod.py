@@ -0,0 +1,263 @@
+"""
+Level-of-detail (LOD) files for giant components.
+
+A component above the LOD threshold is coarsened into supernodes: the
+highest-degree models (base models with many derivatives) are picked as hubs
+and every other model joins the hub it is closest to (multi-source BFS), so
+each supernode is a base model plus its derivative subtrees. The coarse graph
+is written first; each supernode can then be fetched on its own:
+
+    components/lod/component_N/root.json.gz
+    {
+      "metadata": {"component_id": N, "path": "", "total_nodes": ..., "total_edges": ...,
+                   "max_nodes": 20000, "max_supernodes": 256},
+      "supernodes": [
+        {"id": "3", "hub": "meta-llama/Llama-3-8B", "name": "Llama-3-8B", "nodes": 18234,
+         "edges": 18301, "downloads": 91234567, "likes": 40213,
+         "file": "super_3.json.gz", "coarse": false},
+        ...
+      ],
+      "superedges": [{"source": "3", "target": "7", "count": 12}, ...]
+    }
+
+    components/lod/component_N/super_3.json.gz      # leaf: component_N.json.gz schema
+    {"nodes": [...], "edges": [...], "boundary_edges": [{..., "supernode": "7"}], "metadata": {...}}
+
+A supernode that is still larger than the threshold is written as another
+coarse level (same schema as root.json.gz, ids "3.0", "3.1", ...). The root
+records the threshold (max_nodes) and max_supernodes it was cut with.
+
+LOD files use the export's codec (compression.py): root.json.zst,
+super_3.json.zst, ... with zstd (no dictionary). The "file" names in a level
+carry the extension.
+"""
+import os
+
+import numpy as np
+
+import compression
+
+LOD_DIR = 'lod'
+ROOT_NAME = 'root.json'
+
+# Components (and supernodes) with more nodes than this are coarsened
+LOD_THRESHOLD = 20000
+# Maximum number of supernodes per coarse level
+LOD_MAX_SUPERNODES = 256
+
+def _numeric(value):
+    """Attribute value as a number for aggregation (missing / NaN count as 0)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value:
+        return value
+    return 0
+
+def _csr(num_nodes, src, dst):
+    """Undirected CSR adjacency from edge index arrays"""
+    both_src = np.concatenate([src, dst])
+    both_dst = np.concatenate([dst, src])
+    order = np.argsort(both_src, kind='stable')
+    indices = both_dst[order]
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(both_src, minlength=num_nodes), out=indptr[1:])
+    return indptr, indices
+
+def partition_by_hubs(num_nodes, src, dst, weights, max_parts=LOD_MAX_SUPERNODES):
+    """
+    Split a connected graph into at most max_parts connected parts.
+
+    Hubs are the highest-degree nodes (ties broken by weight); every node is
+    assigned to its nearest hub by a level-synchronous multi-source BFS, so
+    each part is connected. Returns (assignment, hubs).
+    """
+    indptr, indices = _csr(num_nodes, src, dst)
+    degree = np.diff(indptr)
+    num_parts = min(max_parts, num_nodes)
+    hubs = np.lexsort((-np.asarray(weights, dtype=np.float64), -degree))[:num_parts]
+
+    assignment = np.full(num_nodes, -1, dtype=np.int64)
+    assignment[hubs] = np.arange(num_parts)
+    frontier = hubs
+    while len(frontier):
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+        # Flattened neighbour positions of every frontier node
+        offsets = np.cumsum(counts) - counts
+        positions = np.arange(total) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+        neighbors = indices[positions]
+        owners = np.repeat(assignment[frontier], counts)
+
+        unassigned = assignment[neighbors] == -1
+        neighbors, first = np.unique(neighbors[unassigned], return_index=True)
+        assignment[neighbors] = owners[unassigned][first]
+        frontier = neighbors
+
+    return assignment, hubs
+
+def _supernode_name(path):
+    return f'super_{path}.json'
+
+def root_path(component_id, codec='gzip'):
+    """Path of a component's LOD root, relative to the export directory"""
+    return f'{LOD_DIR}/component_{component_id}/{compression.compressed_path(ROOT_NAME, codec)}'
+
+def _write_level(lod_dir, component_id, path, nodes, edges, node_idx, edge_idx, src, dst, max_nodes,
+                 max_supernodes, codec, outer=()):
+    """
+    Write one coarse level for nodes[node_idx] and recurse into its supernodes.
+
+    outer lists the edges leaving this level as (edge, inside node, supernode
+    id on the other side); they end up in the boundary_edges of the leaves.
+    """
+    n = len(node_idx)
+    local = {int(i): j for j, i in enumerate(node_idx.tolist())}
+    local_src = np.asarray([local[s] for s in src[edge_idx].tolist()], dtype=np.int64)
+    local_dst = np.asarray([local[t] for t in dst[edge_idx].tolist()], dtype=np.int64)
+    downloads = np.asarray([_numeric(nodes[i].get('downloads')) for i in node_idx.tolist()], dtype=np.float64)
+    likes = np.asarray([_numeric(nodes[i].get('likes')) for i in node_idx.tolist()], dtype=np.float64)
+
+    assignment, hubs = partition_by_hubs(n, local_src, local_dst, downloads, max_supernodes)
+    num_parts = len(hubs)
+    prefix = f'{path}.' if path else ''
+    part_ids = [f'{prefix}{p}' for p in range(num_parts)]
+
+    part_sizes = np.bincount(assignment, minlength=num_parts)
+    part_downloads = np.bincount(assignment, weights=downloads, minlength=num_parts)
+    part_likes = np.bincount(assignment, weights=likes, minlength=num_parts)
+
+    edge_parts_src = assignment[local_src]
+    edge_parts_dst = assignment[local_dst]
+    internal = edge_parts_src == edge_parts_dst
+    part_edges = np.bincount(edge_parts_src[internal], minlength=num_parts)
+
+    # Superedges: count of underlying edges between each pair of supernodes
+    low = np.minimum(edge_parts_src[~internal], edge_parts_dst[~internal])
+    high = np.maximum(edge_parts_src[~internal], edge_parts_dst[~internal])
+    pairs, pair_counts = np.unique(low * num_parts + high, return_counts=True)
+    superedges = [
+        {'source': part_ids[int(pair // num_parts)], 'target': part_ids[int(pair % num_parts)], 'count': int(count)}
+        for pair, count in zip(pairs.tolist(), pair_counts.tolist())
+    ]
+
+    supernodes = []
+    for p in range(num_parts):
+        hub_id = nodes[int(node_idx[hubs[p]])]['id']
+        supernodes.append({
+            'id': part_ids[p],
+            'hub': hub_id,
+            'name': hub_id.split('/')[-1] if '/' in hub_id else hub_id,
+            'nodes': int(part_sizes[p]),
+            'edges': int(part_edges[p]),
+            'downloads': int(part_downloads[p]),
+            'likes': int(part_likes[p]),
+            'file': compression.compressed_path(_supernode_name(part_ids[p]), codec),
+            'coarse': bool(part_sizes[p] > max_nodes)
+        })
+
+    metadata = {
+        'component_id': component_id,
+        'path': path,
+        'total_nodes': n,
+        'total_edges': len(edge_idx)
+    }
+    if not path:
+        metadata.update({'max_nodes': max_nodes, 'max_supernodes': max_supernodes})
+    level_file = os.path.join(lod_dir, _supernode_name(path) if path else ROOT_NAME)
+    compression.write_json(level_file, {
+        'metadata': metadata,
+        'supernodes': supernodes,
+        'superedges': superedges
+    }, codec)
+
+    # Group nodes, internal edges and boundary edges by part once
+    node_order = np.argsort(assignment, kind='stable')
+    node_bounds = np.concatenate([[0], np.cumsum(part_sizes)])
+
+    internal_idx = np.flatnonzero(internal)
+    internal_idx = internal_idx[np.argsort(edge_parts_src[internal_idx], kind='stable')]
+    edge_bounds = np.concatenate([[0], np.cumsum(part_edges)])
+
+    # Boundary entries per part: crossing edges of this level (listed under
+    # both of their parts) plus the edges leaving this level altogether
+    boundary = [[] for _ in range(num_parts)]
+    crossing = np.flatnonzero(~internal)
+    for k, ps, pd in zip(crossing.tolist(), edge_parts_src[crossing].tolist(), edge_parts_dst[crossing].tolist()):
+        e = int(edge_idx[k])
+        boundary[ps].append((e, int(src[e]), part_ids[pd]))
+        boundary[pd].append((e, int(dst[e]), part_ids[ps]))
+    for e, inside, label in outer:
+        boundary[assignment[local[inside]]].append((e, inside, label))
+
+    for p in range(num_parts):
+        members = np.sort(node_order[node_bounds[p]:node_bounds[p + 1]])
+        part_node_idx = node_idx[members]
+        part_edge_idx = edge_idx[internal_idx[edge_bounds[p]:edge_bounds[p + 1]]]
+
+        if supernodes[p]['coarse'] and len(members) < n:
+            _write_level(lod_dir, component_id, part_ids[p], nodes, edges, part_node_idx,
+                         part_edge_idx, src, dst, max_nodes, max_supernodes, codec, boundary[p])
+            continue
+
+        boundary_edges = []
+        for e, _, label in boundary[p]:
+            boundary_edge = dict(edges[e])
+            boundary_edge['supernode'] = label
+            boundary_edges.append(boundary_edge)
+
+        compression.write_json(os.path.join(lod_dir, _supernode_name(part_ids[p])), {
+            'nodes': [nodes[i] for i in part_node_idx.tolist()],
+            'edges': [edges[e] for e in part_edge_idx.tolist()],
+            'boundary_edges': boundary_edges,
+            'metadata': {
+                'component_id': component_id,
+                'path': part_ids[p],
+                'total_nodes': len(part_node_idx),
+                'total_edges': len(part_edge_idx)
+            }
+        }, codec)
+
+def write_lod(component_json, output_dir, max_nodes=LOD_THRESHOLD, max_supernodes=LOD_MAX_SUPERNODES,
+              codec='gzip'):
+    """
+    Write the LOD files of one component.
+
+    Returns the root file path relative to output_dir.
+    """
+    component_id = component_json['metadata']['component_id']
+    nodes = component_json['nodes']
+    edges = component_json['edges']
+    position = {node['id']: i for i, node in enumerate(nodes)}
+    src = np.asarray([position[edge['source']] for edge in edges], dtype=np.int64)
+    dst = np.asarray([position[edge['target']] for edge in edges], dtype=np.int64)
+
+    lod_dir = os.path.join(output_dir, LOD_DIR, f'component_{component_id}')
+    os.makedirs(lod_dir, exist_ok=True)
+    for name in os.listdir(lod_dir):
+        os.remove(os.path.join(lod_dir, name))
+
+    _write_level(lod_dir, component_id, '', nodes, edges, np.arange(len(nodes)), np.arange(len(edges)),
+                 src, dst, max_nodes, max_supernodes, codec)
+    return root_path(component_id, codec)
+
+def lod_settings(component_id, output_dir, codec='gzip'):
+    """(max_nodes, max_supernodes) the component's LOD files were cut with, or None without a root in codec"""
+    root_file = os.path.join(output_dir, root_path(component_id, codec))
+    if not os.path.exists(root_file):
+        return None
+    metadata = compression.read_json(root_file)['metadata']
+    # Roots written before the threshold was recorded
+    if 'max_nodes' not in metadata:
+        return None
+    return metadata['max_nodes'], metadata['max_supernodes']
+
+def read_lod(component_id, path='', base='components'):
+    """Load the root level (path='') or a supernode ('3', '3.5', ...) of a component's LOD files, in any codec"""
+    lod_dir = os.path.join(base, LOD_DIR, f'component_{component_id}')
+    name = _supernode_name(path) if path else ROOT_NAME
+    for codec in compression.CODECS:
+        level_file = compression.compressed_path(os.path.join(lod_dir, name), codec)
+        if os.path.exists(level_file):
+            return compression.read_json(level_file)
+    raise FileNotFoundError(f"No LOD level '{path}' for component {component_id} in {lod_dir}")
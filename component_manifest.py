@@ -0,0 +1,108 @@
+"""
+Manifest of exported components for incremental re-exports.
+
+Each component is keyed on a canonical member (its smallest model id when it
+first got its id), so a component keeps its component_id across data refreshes
+as long as that member stays in it, whatever other models join or leave.
+
+The manifest also records a content hash per component, letting
+export_components.py rewrite only the component files whose contents changed.
+
+Manifest layout (components/manifest.json.gz):
+
+    {
+      "version": 1,
+      "next_id": 12346,
+      "compression": {"codec": "zstd", "dictionary": "<sha256 of the zstd dictionary>"},
+      "components": {
+        "0": {"canonical": "zera09/SmolVLM", "hash": "<sha256>", "nodes": 1042,
+              "edges": 1041, "file_size_mb": 0.36},
+        ...
+      }
+    }
+
+Component files are only kept while "compression" (see compression.py)
+matches the current export; a manifest without it was written with gzip.
+"""
+import bisect
+import gzip
+import hashlib
+import json
+import os
+
+MANIFEST_FILE = 'manifest.json.gz'
+MANIFEST_VERSION = 1
+
+def empty_manifest():
+    """Manifest for a directory that has never been exported"""
+    return {'version': MANIFEST_VERSION, 'next_id': 0, 'components': {}}
+
+def load_manifest(output_dir):
+    """Load the manifest from output_dir, or an empty one if there is none"""
+    manifest_file = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return empty_manifest()
+
+    with gzip.open(manifest_file, 'rt', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"Warning: unsupported manifest version {manifest.get('version')}, starting fresh")
+        return empty_manifest()
+    return manifest
+
+def save_manifest(manifest, output_dir):
+    """Write the manifest to output_dir"""
+    manifest_file = os.path.join(output_dir, MANIFEST_FILE)
+    with gzip.open(manifest_file, 'wt', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest_file
+
+def content_hash(payload):
+    """Content hash of a serialized component payload (str or bytes)"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def assign_stable_ids(node_ids, labels, canonicals, manifest):
+    """
+    Map each component to a stable component id.
+
+    node_ids are the model ids sorted (build_graph_arrays(sort_nodes=True)),
+    labels the component label of every node and canonicals the smallest
+    member of every component label. Every previous canonical member that is
+    still in the graph votes for its old id in the component it now belongs
+    to:
+
+    - a component keeps its id as long as the member it is keyed on stays in
+      it, even when a model with a smaller id joins
+    - when components merge, the merged one keeps the smallest of their ids
+      and the others are retired
+    - when a component splits, the part holding the old canonical member
+      keeps the id; the other parts get fresh ids from manifest['next_id']
+
+    Returns (ids, canonicals, next_id): the id and the member it is keyed on
+    (kept from the manifest, or the smallest member for a fresh id) for every
+    component label.
+    """
+    next_id = manifest.get('next_id', 0)
+    keyed = {}
+    for comp_id, entry in manifest['components'].items():
+        canonical = entry['canonical']
+        i = bisect.bisect_left(node_ids, canonical)
+        if i == len(node_ids) or node_ids[i] != canonical:
+            continue
+        label = int(labels[i])
+        if label not in keyed or int(comp_id) < keyed[label][0]:
+            keyed[label] = (int(comp_id), canonical)
+
+    ids = []
+    anchors = []
+    for label, canonical in enumerate(canonicals):
+        comp_id, canonical = keyed.get(label, (None, canonical))
+        if comp_id is None:
+            comp_id = next_id
+            next_id += 1
+        ids.append(comp_id)
+        anchors.append(canonical)
+    return ids, anchors, next_id
@@ -0,0 +1,151 @@
+"""
+Pack small components into shard files with a byte-offset directory.
+
+Instead of one component_N.json.gz per tiny component, the gzip payloads of
+small components are appended to shard files (components/shards/shard_K.bin)
+of roughly a target size. Every payload is an independent gzip member, so a
+single component can still be fetched with one range read:
+
+    components/shards/shard_directory.json.gz
+    {
+      "shards": ["shard_0.bin", "shard_1.bin", ...],
+      "components": {"17": [0, 1843, 412], ...},   # id -> [shard, offset, length]
+      "max_nodes": 10,
+      "target_bytes": 4194304,
+      "compression": "gzip"
+    }
+
+With another codec (compression.py) every member is compressed with it
+instead, using the export's zstd dictionary if there is one.
+
+Large components keep their own component_N.json.gz files; read_component()
+resolves either kind, from a local directory or an http(s) base URL.
+"""
+import gzip
+import json
+import os
+import urllib.error
+import urllib.request
+
+import compression
+
+SHARDS_DIR = 'shards'
+SHARD_DIRECTORY_FILE = 'shard_directory.json.gz'
+
+# Components with fewer nodes than this are packed into shards
+SHARD_MAX_NODES = 10
+# Shard files are closed once they reach this many bytes
+SHARD_TARGET_BYTES = 4 * 1024 * 1024
+
+def pack_payload(payload, codec='gzip', dictionary=None):
+    """Compress a serialized component payload (str or bytes) as a standalone gzip member or zstd/brotli frame"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return compression.compress(payload, codec, dictionary)
+
+class ShardWriter:
+    """Append gzip members to shard files and record their byte ranges"""
+
+    def __init__(self, output_dir, max_nodes=SHARD_MAX_NODES, target_bytes=SHARD_TARGET_BYTES, codec='gzip'):
+        self.shards_dir = os.path.join(output_dir, SHARDS_DIR)
+        self.max_nodes = max_nodes
+        self.target_bytes = target_bytes
+        self.codec = codec
+        self.shards = []
+        self.components = {}
+        self._file = None
+        self._offset = 0
+        os.makedirs(self.shards_dir, exist_ok=True)
+
+    def _open_next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        shard_name = f'shard_{len(self.shards)}.bin'
+        self.shards.append(shard_name)
+        self._file = open(os.path.join(self.shards_dir, shard_name), 'wb')
+        self._offset = 0
+
+    def add(self, component_id, packed):
+        """Append one packed component, starting a new shard when the current one is full"""
+        if self._file is None or self._offset >= self.target_bytes:
+            self._open_next_shard()
+        self._file.write(packed)
+        self.components[str(component_id)] = [len(self.shards) - 1, self._offset, len(packed)]
+        self._offset += len(packed)
+
+    def close(self):
+        """Close the last shard, remove leftover shards and write the directory"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        # Shards from a previous, larger export are no longer referenced
+        for name in os.listdir(self.shards_dir):
+            if name.startswith('shard_') and name.endswith('.bin') and name not in self.shards:
+                os.remove(os.path.join(self.shards_dir, name))
+
+        directory = {
+            'shards': self.shards,
+            'components': self.components,
+            'max_nodes': self.max_nodes,
+            'target_bytes': self.target_bytes,
+            'compression': self.codec
+        }
+        directory_file = os.path.join(self.shards_dir, SHARD_DIRECTORY_FILE)
+        with gzip.open(directory_file, 'wt', encoding='utf-8') as f:
+            json.dump(directory, f)
+        return directory_file
+
+def _is_url(base):
+    return base.startswith('http://') or base.startswith('https://')
+
+def _read_bytes(base, path, offset=None, length=None):
+    """Read a whole file or a byte range from a local directory or http(s) base"""
+    if _is_url(base):
+        request = urllib.request.Request(f"{base.rstrip('/')}/{path}")
+        if offset is not None:
+            request.add_header('Range', f'bytes={offset}-{offset + length - 1}')
+        with urllib.request.urlopen(request) as response:
+            data = response.read()
+            # Servers without range support answer 200 with the whole file
+            if offset is not None and response.status != 206:
+                data = data[offset:offset + length]
+            return data
+
+    with open(os.path.join(base, path), 'rb') as f:
+        if offset is None:
+            return f.read()
+        f.seek(offset)
+        return f.read(length)
+
+def load_shard_directory(base='components'):
+    """Load the shard directory, or None if the export has no shards"""
+    try:
+        data = _read_bytes(base, f'{SHARDS_DIR}/{SHARD_DIRECTORY_FILE}')
+    except (FileNotFoundError, urllib.error.HTTPError):
+        return None
+    return json.loads(gzip.decompress(data))
+
+def read_component(component_id, base='components', directory=None, codec=None, dictionary=None):
+    """
+    Load one component, from its shard (range read) or its own file.
+
+    Parameters:
+    - component_id: component id
+    - base: local components directory or http(s) base URL
+    - directory: shard directory (from load_shard_directory) to avoid reloading it
+    - codec: compression of the export (default: the shard directory's, else gzip)
+    - dictionary: zstd dictionary the export was written with, if any
+    """
+    if directory is None:
+        directory = load_shard_directory(base)
+    if codec is None:
+        codec = directory.get('compression', 'gzip') if directory else 'gzip'
+
+    entry = directory['components'].get(str(component_id)) if directory else None
+    if entry is None:
+        data = _read_bytes(base, compression.compressed_path(f'component_{component_id}.json', codec))
+    else:
+        shard, offset, length = entry
+        data = _read_bytes(base, f"{SHARDS_DIR}/{directory['shards'][shard]}", offset, length)
+    return json.loads(compression.decompress(data, codec, dictionary))
@@ -0,0 +1,261 @@
+"""
+Pluggable compression for component and index files.
+
+Every artifact used to be written with stdlib gzip. Thousands of small files
+that share the same JSON keys and vocabulary compress poorly on their own, so
+the exporters and index builders can also write:
+
+    gzip     component_N.json.gz     stdlib, default, readable everywhere
+    zstd     component_N.json.zst    optional 'zstandard' package; with a
+                                     dictionary trained on sample payloads
+    brotli   component_N.json.br     optional 'brotli' package
+
+A zstd dictionary is stored next to the files it was trained for (e.g.
+components/component_dictionary.zdict) and is needed to decompress them.
+
+The Cloudflare worker and index.html only decode gzip (DecompressionStream),
+so zstd / brotli exports are for local consumers: serve_components.py,
+create_magazine_cover.py, create_mini_sample.py, build_indexes.py and the
+Python readers. sync_to_r2.py and upload_chunks_to_r2.py refuse to deploy
+them (see undeployable_files()).
+
+Compare the formats on an existing export (size and decompression speed):
+
+    python compression.py components
+    python compression.py components --pattern 'chunks/lookup_*.json.*'
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import time
+
+CODECS = ('gzip', 'zstd', 'brotli')
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst', 'brotli': '.br'}
+# Codecs the worker and the frontend can decode
+WORKER_CODECS = ('gzip',)
+
+# Levels for files that are compressed once and downloaded many times
+LEVELS = {'gzip': 9, 'zstd': 19, 'brotli': 11}
+
+DICTIONARY_FILE = 'component_dictionary.zdict'
+# zstd's default dictionary size (110 KB)
+DICTIONARY_SIZE = 112640
+# Number of sample payloads a dictionary is trained on
+DICTIONARY_SAMPLES = 2000
+
+_zstd_compressors = {}
+_zstd_decompressors = {}
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        raise ImportError("brotli compression requires the 'brotli' package (pip install brotli)")
+    return brotli
+
+def check_codec(codec):
+    """Raise if a codec is unknown or its optional package is missing"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression '{codec}', expected one of {CODECS}")
+    if codec == 'zstd':
+        _zstd()
+    elif codec == 'brotli':
+        _brotli()
+
+def codec_from_path(path):
+    """Codec of a file from its extension"""
+    for codec, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    raise ValueError(f"Unknown compressed file extension: {path}")
+
+def compressed_path(path, codec='gzip'):
+    """Path of a file (e.g. 'component_3.json') compressed with codec"""
+    return path + EXTENSIONS[codec]
+
+def _zstd_compressor(level, dictionary):
+    # Compressors are reused; loading a dictionary into one is not free
+    key = (level, dictionary)
+    if key not in _zstd_compressors:
+        zstandard = _zstd()
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        _zstd_compressors[key] = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+    return _zstd_compressors[key]
+
+def _zstd_decompressor(dictionary):
+    if dictionary not in _zstd_decompressors:
+        zstandard = _zstd()
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        _zstd_decompressors[dictionary] = zstandard.ZstdDecompressor(dict_data=dict_data)
+    return _zstd_decompressors[dictionary]
+
+def compress(data, codec='gzip', dictionary=None, level=None):
+    """
+    Compress bytes with a codec.
+
+    dictionary (zstd only) is the raw dictionary from train_dictionary(); the
+    same dictionary is needed to decompress.
+    """
+    if level is None:
+        level = LEVELS[codec]
+    if codec == 'gzip':
+        # mtime=0 keeps identical payloads byte-identical across runs
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if codec == 'zstd':
+        return _zstd_compressor(level, dictionary).compress(data)
+    if codec == 'brotli':
+        return _brotli().compress(data, quality=level)
+    raise ValueError(f"Unknown compression '{codec}', expected one of {CODECS}")
+
+def decompress(data, codec='gzip', dictionary=None):
+    """Decompress bytes written by compress()"""
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    if codec == 'zstd':
+        return _zstd_decompressor(dictionary).decompress(data)
+    if codec == 'brotli':
+        return _brotli().decompress(data)
+    raise ValueError(f"Unknown compression '{codec}', expected one of {CODECS}")
+
+def write_json(path, data, codec='gzip', dictionary=None):
+    """
+    Write JSON (an object or an already serialized string) to path + the codec's extension.
+
+    Returns the path written.
+    """
+    output_file = compressed_path(path, codec)
+    if codec == 'gzip':
+        with gzip.open(output_file, 'wt', encoding='utf-8') as f:
+            if isinstance(data, str):
+                f.write(data)
+            else:
+                json.dump(data, f)
+        return output_file
+
+    payload = data if isinstance(data, str) else json.dumps(data)
+    with open(output_file, 'wb') as f:
+        f.write(compress(payload.encode('utf-8'), codec, dictionary))
+    return output_file
+
+def read_json(path, dictionary=None):
+    """Load a JSON file compressed with any codec (detected from the extension)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return json.loads(decompress(data, codec_from_path(path), dictionary))
+
+def train_dictionary(samples, dict_size=DICTIONARY_SIZE):
+    """
+    Train a zstd dictionary on sample payloads (bytes).
+
+    Returns the raw dictionary bytes, or None if there are too few samples
+    to train on.
+    """
+    zstandard = _zstd()
+    samples = [sample for sample in samples if sample]
+    if len(samples) < 8:
+        return None
+    # A dictionary larger than the samples themselves cannot be trained
+    dict_size = min(dict_size, sum(len(sample) for sample in samples) // 4)
+    try:
+        return zstandard.train_dictionary(dict_size, samples).as_bytes()
+    except zstandard.ZstdError as e:
+        print(f"  Could not train zstd dictionary: {e}")
+        return None
+
+def save_dictionary(dictionary, path):
+    with open(path, 'wb') as f:
+        f.write(dictionary)
+    return path
+
+def load_dictionary(path):
+    """Load a dictionary file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+def undeployable_files(paths):
+    """Paths compressed with a codec the worker cannot decode (or a zstd dictionary for them)"""
+    suffixes = tuple(EXTENSIONS[codec] for codec in CODECS if codec not in WORKER_CODECS) + ('.zdict',)
+    return [path for path in paths if path.endswith(suffixes)]
+
+def available_codecs():
+    """Codecs whose packages are installed"""
+    codecs = []
+    for codec in CODECS:
+        try:
+            check_codec(codec)
+        except ImportError:
+            continue
+        codecs.append(codec)
+    return codecs
+
+def compare_codecs(files, dict_size=DICTIONARY_SIZE, source_dictionary=None):
+    """
+    Compare codecs on a set of compressed JSON files.
+
+    source_dictionary is needed if the files themselves were written with a
+    zstd dictionary. Every file is decompressed and re-compressed with each available codec.
+    The zstd dictionary is trained on every other file and measured on all of
+    them, so it is not only scored on its own training data. Returns
+    {format: {'bytes', 'ratio', 'decompress_mb_s', 'mean_file_bytes'}}.
+    """
+    payloads = []
+    for path in files:
+        with open(path, 'rb') as f:
+            payloads.append(decompress(f.read(), codec_from_path(path), source_dictionary))
+    raw_bytes = sum(len(payload) for payload in payloads)
+    if not payloads:
+        return {}
+
+    formats = [(codec, None) for codec in available_codecs()]
+    if 'zstd' in dict(formats):
+        dictionary = train_dictionary(payloads[::2], dict_size)
+        if dictionary is not None:
+            formats.append(('zstd', dictionary))
+
+    results = {}
+    for codec, dictionary in formats:
+        name = f'{codec}+dict' if dictionary else codec
+        compressed = [compress(payload, codec, dictionary) for payload in payloads]
+        start = time.perf_counter()
+        for blob in compressed:
+            decompress(blob, codec, dictionary)
+        elapsed = time.perf_counter() - start
+        total = sum(len(blob) for blob in compressed) + (len(dictionary) if dictionary else 0)
+        results[name] = {
+            'bytes': total,
+            'ratio': round(raw_bytes / total, 2),
+            'decompress_mb_s': round(raw_bytes / (1024 * 1024) / elapsed, 1) if elapsed else None,
+            'mean_file_bytes': round(total / len(payloads))
+        }
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare compression formats on exported files')
+    parser.add_argument('directory', nargs='?', default='components', help='Directory with compressed JSON files')
+    parser.add_argument('--pattern', default='component_*.json.*', help='Glob (relative to directory) of files to compare')
+    parser.add_argument('--limit', type=int, default=DICTIONARY_SAMPLES, help='Maximum number of files to compare')
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.directory, args.pattern)))[:args.limit]
+    files = [path for path in files if not path.endswith('.bin.gz')]
+    print(f"Comparing {', '.join(available_codecs())} on {len(files)} files...")
+    results = compare_codecs(files, source_dictionary=load_dictionary(os.path.join(args.directory, DICTIONARY_FILE)))
+    if not results:
+        print("No files found")
+    else:
+        print(f"\n{'format':<12}{'total MB':>10}{'ratio':>8}{'mean file':>12}{'decompress MB/s':>18}")
+        for name, result in results.items():
+            print(f"{name:<12}{result['bytes'] / (1024 * 1024):>10.2f}{result['ratio']:>8.2f}"
+                  f"{result['mean_file_bytes']:>10} B{result['decompress_mb_s']:>18}")
+        print("\n(zstd+dict total includes the dictionary itself)")
@@ -1,91 +1,37 @@
 """
 Create chunked lookup index files organized alphabetically.
-Each chunk contains models starting with the same first 2 characters.
+Each chunk holds a contiguous range of the sorted model ids of about the same
+size (--chunking range, the default), or all models starting with the same
+first 2 characters (--chunking prefix).
+
+Chunks are gzip by default; --compression zstd trains a dictionary on the
+chunks themselves (components/chunks/chunk_dictionary.zdict) and brotli is
+available too (see compression.py). chunks_index.json.gz stays gzip.
+
+To build this together with the other index files from a single load of the
+component index, use build_indexes.py.
 """
-import gzip
-import json
-import os
-from collections import defaultdict
+import argparse
 
-def create_chunked_index():
-    """Split component index into chunks by first 2 characters of model ID"""
-    print("Loading component index...")
-    
-    # Load the full component index
-    with gzip.open('components/component_index.json.gz', 'rt') as f:
-        index_data = json.load(f)
-    
-    component_index = index_data['component_index']
-    print(f"Total models: {len(component_index):,}")
-    
-    # Group by first 2 characters (case-insensitive, alphanumeric)
-    chunks = defaultdict(dict)
-    
-    for modelId, componentId in component_index.items():
-        # Get first 2 characters, convert to lowercase
-        # Handle edge cases (single char, empty, special chars)
-        prefix = modelId[:2].lower() if len(modelId) >= 2 else modelId[0].lower() if len(modelId) == 1 else '00'
-        
-        # Normalize: only alphanumeric, fallback to '00' for special chars
-        if not prefix[0].isalnum():
-            prefix = '00'
-        elif len(prefix) == 1:
-            prefix = prefix + '0'
-        
-        chunks[prefix][modelId] = componentId
-    
-    # Create chunks directory
-    os.makedirs('components/chunks', exist_ok=True)
-    
-    # Save each chunk
-    chunk_files = []
-    total_chunks = len(chunks)
-    
-    for prefix, chunk_data in sorted(chunks.items()):
-        chunk_file = f'components/chunks/lookup_{prefix}.json.gz'
-        
-        chunk_info = {
-            'prefix': prefix,
-            'index': chunk_data,
-            'count': len(chunk_data)
-        }
-        
-        with gzip.open(chunk_file, 'wt', encoding='utf-8') as f:
-            json.dump(chunk_info, f)
-        
-        file_size_mb = os.path.getsize(chunk_file) / (1024 * 1024)
-        chunk_files.append({
-            'prefix': prefix,
-            'file': chunk_file,
-            'count': len(chunk_data),
-            'size_mb': file_size_mb
-        })
-        
-        print(f"  {prefix}: {len(chunk_data):,} models, {file_size_mb:.2f} MB")
-    
-    # Create index of chunks (metadata file)
-    chunks_index = {
-        'chunks': {c['prefix']: {'file': c['file'], 'count': c['count'], 'size_mb': c['size_mb']} 
-                   for c in chunk_files},
-        'total_chunks': total_chunks,
-        'total_models': len(component_index)
-    }
-    
-    with gzip.open('components/chunks_index.json.gz', 'wt', encoding='utf-8') as f:
-        json.dump(chunks_index, f)
-    
-    print(f"\n✓ Created {total_chunks} chunk files")
-    print(f"✓ Chunks index: components/chunks_index.json.gz")
-    
-    # Show statistics
-    sizes = [c['size_mb'] for c in chunk_files]
-    print(f"\nChunk size stats:")
-    print(f"  Min: {min(sizes):.2f} MB")
-    print(f"  Max: {max(sizes):.2f} MB")
-    print(f"  Avg: {sum(sizes)/len(sizes):.2f} MB")
-    
-    return chunk_files
+import build_indexes
+import compression
 
-if __name__ == '__main__':
-    create_chunked_index()
+def create_chunked_index(codec='gzip', use_dictionary=True, chunking='range',
+                         target_bytes=build_indexes.CHUNK_TARGET_BYTES):
+    """Split component index into size-balanced range chunks (or 2-character prefix chunks)"""
+    index = build_indexes.load_index()
+    return build_indexes.write_chunked_index(index, codec=codec, use_dictionary=use_dictionary, chunking=chunking,
+                                             target_bytes=target_bytes)
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create chunked lookup index files')
+    parser.add_argument('--compression', choices=compression.CODECS, default='gzip',
+                        help='Compression of the chunk files (zstd/brotli: local use only)')
+    parser.add_argument('--no-dictionary', action='store_true',
+                        help='With --compression zstd, do not train a shared dictionary')
+    parser.add_argument('--chunking', choices=build_indexes.CHUNKINGS, default='range',
+                        help="Size-balanced id 'range's or 2-character 'prefix'es")
+    parser.add_argument('--chunk-target-kb', type=int, default=build_indexes.CHUNK_TARGET_BYTES // 1024,
+                        help='Uncompressed JSON size of each range chunk in KB')
+    args = parser.parse_args()
+    create_chunked_index(args.compression, not args.no_dictionary, args.chunking, args.chunk_target_kb * 1024)
@@ -2,8 +2,14 @@
 """
 Create a magazine cover visualization of 40 randomly selected model families
 in 3D force layout, formatted for 8.5x11 inch print.
+
+Larger formats come from PRESETS (python create_magazine_cover.py --preset
+poster-24x36). Every component goes into one CoverBatch, drawn as one line
+collection per edge colour and a single node scatter, so covers of hundreds
+of components render in seconds; --rasterize keeps PDF / SVG output small.
 """
 
+import argparse
 import json
 import gzip
 import random
@@ -13,6 +19,14 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.patches import Rectangle
 import os
+from collections import defaultdict
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+import component_catalog
+import component_layouts
+import component_shards
+import compression
+from layout_3d import force_layout_3d
 
 # Configuration
 DPI = 300  # Print quality
@@ -21,8 +35,38 @@ HEIGHT_INCHES = 11
 COMPONENTS_DIR = "components"  # Directory containing component JSON files
 OUTPUT_FILE = "magazine_cover_visualization.png"
 NUM_COMPONENTS = 40
+COLUMNS = 8
+# Rasterize edges and nodes inside vector output (PDF / SVG)
+RASTERIZE = False
 MIN_NODES = 3
 MAX_NODES = 1200
+# Fixed seed for the component choice and layouts (None: a different cover every run)
+SEED = None
+# Layout repulsion: 'exact', 'barnes-hut' or 'auto' (see layout_3d.py)
+LAYOUT_METHOD = 'auto'
+LAYOUT_ITERATIONS = 50
+# Layouts are computed in this many processes and kept in LAYOUT_CACHE_DIR,
+# so re-rendering (other grid, DPI or colours) skips the layout step
+WORKERS = os.cpu_count() or 1
+LAYOUT_CACHE_DIR = component_layouts.LAYOUT_CACHE_DIR
+
+# Print formats: page size (inches), DPI, number of components and grid columns
+PRESETS = {
+    'magazine': {'width': 8.5, 'height': 11, 'dpi': 300, 'components': 40, 'columns': 8},
+    'poster-18x24': {'width': 18, 'height': 24, 'dpi': 200, 'components': 150, 'columns': 10},
+    'poster-24x36': {'width': 24, 'height': 36, 'dpi': 150, 'components': 300, 'columns': 14},
+    'poster-36x48': {'width': 36, 'height': 48, 'dpi': 150, 'components': 600, 'columns': 21},
+}
+
+EDGE_COLORS = {
+    'finetune': '#ff6b6b',
+    'quantized': '#4ecdc4',
+    'adapter': '#45b7d1',
+    'unknown': '#96ceb4',
+    'default': '#cccccc'
+}
+PARENT_COLOR = '#ff6b6b'
+LEAF_COLOR = '#4ecdc4'
 
 # Prefer components 1-500 (70% chance)
 def get_random_component_id():
@@ -31,143 +75,224 @@ def get_random_component_id():
     else:
         return random.randint(501, 10000)
 
+# Codec and zstd dictionary of the export, read once from its index
+_compression = None
+
+def load_compression():
+    """(codec, dictionary) the components were exported with (see compression.py)"""
+    global _compression
+    if _compression is None:
+        index_file = os.path.join(COMPONENTS_DIR, 'component_index.json.gz')
+        settings = {}
+        if os.path.exists(index_file):
+            with gzip.open(index_file, 'rt', encoding='utf-8') as f:
+                settings = json.load(f).get('compression') or {}
+        dictionary = None
+        if settings.get('dictionary'):
+            dictionary = compression.load_dictionary(os.path.join(COMPONENTS_DIR, settings['dictionary']))
+        _compression = (settings.get('codec', 'gzip'), dictionary)
+    return _compression
+
 # Load a component from file
 def load_component(component_id):
     """Load a component JSON file."""
-    file_path = os.path.join(COMPONENTS_DIR, f"component_{component_id}.json.gz")
+    codec, dictionary = load_compression()
+    file_path = compression.compressed_path(os.path.join(COMPONENTS_DIR, f"component_{component_id}.json"), codec)
     if not os.path.exists(file_path):
         return None
     
     try:
-        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-            return json.load(f)
+        return compression.read_json(file_path, dictionary)
     except Exception as e:
         print(f"Error loading component {component_id}: {e}")
         return None
 
-# Simple 3D force-directed layout
-def compute_3d_layout(graph, iterations=100):
-    """Compute 3D force-directed layout for a graph."""
-    n = len(graph.nodes())
-    if n == 0:
+# 3D force-directed layout (layout_3d.py: NumPy all-pairs or Barnes-Hut octree)
+def compute_3d_layout(graph, iterations=100, seed=None, method='auto'):
+    """
+    Compute 3D force-directed layout for a graph.
+    
+    Returns {node: array([x, y, z])}. seed fixes the initial positions for
+    reproducible covers; method is one of layout_3d.METHODS.
+    """
+    nodes = list(graph.nodes())
+    if not nodes:
         return {}
     
-    # Initialize positions randomly
-    pos = {node: np.random.rand(3) * 10 - 5 for node in graph.nodes()}
+    position = {node: i for i, node in enumerate(nodes)}
+    edge_src = [position[source] for source, _ in graph.edges()]
+    edge_dst = [position[target] for _, target in graph.edges()]
+    pos = force_layout_3d(len(nodes), edge_src, edge_dst, iterations=iterations, seed=seed, method=method)
+    return {node: pos[i] for i, node in enumerate(nodes)}
+
+class CoverBatch:
+    """
+    Edges and nodes of any number of components, drawn in a few artists.
     
-    # Force parameters (conservative for stability)
-    repulsion = 0.1 / np.sqrt(n / 100) if n > 1200 else 0.1
-    attraction = 0.01 if n <= 1200 else 0.002
-    damping = 0.9 if n <= 1200 else 0.8
+    Edges become one Line3DCollection per edge colour and nodes one scatter,
+    instead of an ax.plot() call per edge, so the artist count does not grow
+    with the cover.
+    """
     
-    for _ in range(iterations):
-        # Calculate forces
-        forces = {node: np.zeros(3) for node in graph.nodes()}
-        
-        # Repulsion between all nodes
-        nodes_list = list(graph.nodes())
-        for i, node1 in enumerate(nodes_list):
-            for node2 in nodes_list[i+1:]:
-                vec = pos[node1] - pos[node2]
-                dist = np.linalg.norm(vec)
-                if dist > 0:
-                    force = repulsion / (dist * dist + 1)
-                    direction = vec / dist
-                    forces[node1] += direction * force
-                    forces[node2] -= direction * force
+    def __init__(self):
+        self.segments = defaultdict(list)
+        self.points = []
+        self.colors = []
+        self.sizes = []
+    
+    def add_component(self, component_data, positions, x_offset=0, y_offset=0, z_offset=0, scale=1.0):
+        """Add a component laid out at positions ((nodes, 3), aligned with component_data['nodes'])"""
+        nodes = component_data['nodes']
+        if not nodes:
+            return
+        points = np.asarray(positions, dtype=np.float64) * scale + np.array([x_offset, y_offset, z_offset])
+        index = {node['id']: i for i, node in enumerate(nodes)}
         
-        # Attraction along edges
-        for edge in graph.edges():
-            node1, node2 = edge
-            vec = pos[node2] - pos[node1]
-            dist = np.linalg.norm(vec)
-            if dist > 0:
-                k = np.sqrt(n * 100 / n)
-                force = (dist - k) * attraction
-                direction = vec / dist
-                forces[node1] += direction * force
-                forces[node2] -= direction * force
+        # Edges, grouped by colour
+        is_parent = np.zeros(len(nodes), dtype=bool)
+        by_color = defaultdict(lambda: ([], []))
+        for edge in component_data['edges']:
+            source = index.get(edge['source'])
+            target = index.get(edge['target'])
+            if source is None or target is None:
+                continue
+            is_parent[source] = True
+            color = EDGE_COLORS.get(edge.get('type', 'unknown'), EDGE_COLORS['default'])
+            by_color[color][0].append(source)
+            by_color[color][1].append(target)
+        for color, (sources, targets) in by_color.items():
+            self.segments[color].append(np.stack([points[sources], points[targets]], axis=1))
         
-        # Update positions
-        for node in graph.nodes():
-            pos[node] += forces[node] * 0.1
-            pos[node] *= damping
+        # Nodes: red for parents, cyan for leaves
+        self.points.append(points)
+        self.colors.append(np.where(is_parent, PARENT_COLOR, LEAF_COLOR))
+        self.sizes.append(np.where(is_parent, 20, 10))
     
-    return pos
+    def draw(self, ax, rasterized=False):
+        """Draw everything added so far; rasterized keeps vector output (PDF/SVG) small"""
+        for color, parts in self.segments.items():
+            ax.add_collection3d(Line3DCollection(np.concatenate(parts), colors=color, alpha=0.3, linewidths=0.5,
+                                                 rasterized=rasterized))
+        if self.points:
+            points = np.concatenate(self.points)
+            ax.scatter(points[:, 0], points[:, 1], points[:, 2], c=np.concatenate(self.colors),
+                       s=np.concatenate(self.sizes), alpha=0.8, edgecolors='white', linewidths=0.5,
+                       rasterized=rasterized)
 
 # Create visualization for a single component
-def visualize_component_3d(ax, component_data, x_offset=0, y_offset=0, z_offset=0, scale=1.0):
-    """Visualize a single component in 3D on the given axes."""
-    # Create graph from component data
-    G = nx.DiGraph()
+def visualize_component_3d(ax, component_data, x_offset=0, y_offset=0, z_offset=0, scale=1.0, positions=None,
+                           layout_seed=None, batch=None, rasterized=False):
+    """
+    Visualize a single component in 3D on the given axes.
     
-    # Add nodes
-    for node in component_data['nodes']:
-        G.add_node(node['id'], **node)
-    
-    # Add edges
-    for edge in component_data['edges']:
-        G.add_edge(edge['source'], edge['target'], **edge)
-    
-    if len(G.nodes()) == 0:
+    positions: optional precomputed (nodes, 3) layout aligned with
+    component_data['nodes'] (see component_layouts.py); skips the layout step.
+    layout_seed: seed for the layout computed otherwise.
+    batch: a CoverBatch to add the component to (drawn later with the rest
+    of the cover); without one the component is drawn right away.
+    """
+    if not component_data['nodes']:
         return
     
-    # Compute layout
-    pos = compute_3d_layout(G, iterations=50)
+    # Use the precomputed layout if there is one, otherwise compute it
+    if positions is None:
+        G = nx.DiGraph()
+        for node in component_data['nodes']:
+            G.add_node(node['id'], **node)
+        for edge in component_data['edges']:
+            G.add_edge(edge['source'], edge['target'], **edge)
+        pos = compute_3d_layout(G, iterations=LAYOUT_ITERATIONS, seed=layout_seed, method=LAYOUT_METHOD)
+        positions = [pos[node['id']] for node in component_data['nodes']]
     
-    # Edge colors
-    edge_colors = {
-        'finetune': '#ff6b6b',
-        'quantized': '#4ecdc4',
-        'adapter': '#45b7d1',
-        'unknown': '#96ceb4',
-        'default': '#cccccc'
-    }
+    if batch is not None:
+        batch.add_component(component_data, positions, x_offset, y_offset, z_offset, scale)
+        return
+    batch = CoverBatch()
+    batch.add_component(component_data, positions, x_offset, y_offset, z_offset, scale)
+    batch.draw(ax, rasterized)
+
+def select_components_from_catalog():
+    """Draw NUM_COMPONENTS components with MIN_NODES..MAX_NODES nodes from the catalog and load them"""
+    catalog = component_catalog.ComponentCatalog(COMPONENTS_DIR)
+    component_ids = catalog.sample(NUM_COMPONENTS, seed=SEED, min_nodes=MIN_NODES, max_nodes=MAX_NODES)
+    print(f"  {len(catalog.query(min_nodes=MIN_NODES, max_nodes=MAX_NODES)):,} of {len(catalog):,} components "
+          f"have {MIN_NODES}-{MAX_NODES} nodes")
     
-    # Draw edges
-    for edge in component_data['edges']:
-        source = edge['source']
-        target = edge['target']
-        if source in pos and target in pos:
-            edge_type = edge.get('type', 'unknown')
-            color = edge_colors.get(edge_type, edge_colors['default'])
-            
-            x = [pos[source][0] * scale + x_offset, pos[target][0] * scale + x_offset]
-            y = [pos[source][1] * scale + y_offset, pos[target][1] * scale + y_offset]
-            z = [pos[source][2] * scale + z_offset, pos[target][2] * scale + z_offset]
-            
-            ax.plot(x, y, z, color=color, alpha=0.3, linewidth=0.5)
+    codec, dictionary = load_compression()
+    directory = component_shards.load_shard_directory(COMPONENTS_DIR)
+    valid_components = []
+    for component_id in component_ids:
+        component_data = component_shards.read_component(component_id, COMPONENTS_DIR, directory, codec, dictionary)
+        valid_components.append((component_id, component_data))
+        print(f"  Found component {component_id}: {len(component_data['nodes'])} nodes")
+    return valid_components
+
+def probe_random_components():
+    """Exports without a catalog: open random component files until enough have MIN_NODES..MAX_NODES nodes"""
+    valid_components = []
+    attempts = 0
+    max_attempts = 500
     
-    # Draw nodes
-    # Determine which nodes have children (parents)
-    has_children = set()
-    for edge in component_data['edges']:
-        has_children.add(edge['source'])
+    while len(valid_components) < NUM_COMPONENTS and attempts < max_attempts:
+        component_id = get_random_component_id()
+        component_data = load_component(component_id)
+        
+        if component_data and 'nodes' in component_data:
+            node_count = len(component_data['nodes'])
+            if MIN_NODES <= node_count <= MAX_NODES:
+                valid_components.append((component_id, component_data))
+                print(f"  Found component {component_id}: {node_count} nodes")
+        
+        attempts += 1
+    return valid_components
+
+def compute_cover_layouts(components):
+    """
+    Positions for every (component_id, component_data) of the cover.
     
-    xs, ys, zs = [], [], []
-    colors = []
-    sizes = []
+    Layouts come from the export (python export_components.py --layouts),
+    then the layout cache; the rest are computed in a process pool and
+    cached. Returns ({component_id: positions}, {component_id: note}).
+    """
+    params = component_layouts.layout_params(LAYOUT_ITERATIONS, SEED, LAYOUT_METHOD)
+    layout_index = component_layouts.load_layout_index(COMPONENTS_DIR)
+    cache = component_layouts.LayoutCache(LAYOUT_CACHE_DIR)
     
-    for node in component_data['nodes']:
-        node_id = node['id']
-        if node_id in pos:
-            xs.append(pos[node_id][0] * scale + x_offset)
-            ys.append(pos[node_id][1] * scale + y_offset)
-            zs.append(pos[node_id][2] * scale + z_offset)
-            
-            # Color: red for parents, cyan for leaves
-            if node_id in has_children:
-                colors.append('#ff6b6b')
-                sizes.append(20)
-            else:
-                colors.append('#4ecdc4')
-                sizes.append(10)
+    positions_by_id, notes, missing, hashes = {}, {}, [], {}
+    for component_id, component_data in components:
+        # A stored layout is only used if it was made for this content (an
+        # older export's layouts/ may describe other components)
+        hashes[component_id] = component_layouts.component_hash(component_data)
+        positions = None
+        if layout_index:
+            positions = component_layouts.read_layout(component_id, COMPONENTS_DIR, layout_index,
+                                                      hashes[component_id], len(component_data['nodes']))
+        if positions is not None:
+            positions_by_id[component_id] = positions
+            notes[component_id] = " (precomputed layout)"
+            continue
+        positions = cache.get(component_id, hashes[component_id], params)
+        if positions is not None:
+            positions_by_id[component_id] = positions
+            notes[component_id] = " (cached layout)"
+        else:
+            missing.append((component_id, component_data))
     
-    ax.scatter(xs, ys, zs, c=colors, s=sizes, alpha=0.8, edgecolors='white', linewidths=0.5)
+    if missing:
+        print(f"\nComputing {len(missing)} layouts in {min(WORKERS, len(missing))} processes...")
+        computed = component_layouts.compute_layouts(missing, params, WORKERS)
+        for component_id, positions in computed.items():
+            cache.put(component_id, hashes[component_id], params, positions)
+        positions_by_id.update(computed)
+    print(f"Layouts: {len(components) - len(missing) - cache.hits} precomputed, {cache.hits} cached, "
+          f"{len(missing)} computed")
+    return positions_by_id, notes
 
 def main():
     print("Creating magazine cover visualization...")
     print(f"Target: {NUM_COMPONENTS} components, {WIDTH_INCHES}x{HEIGHT_INCHES} inches at {DPI} DPI")
+    if SEED is not None:
+        random.seed(SEED)
     
     # Check if components directory exists
     if not os.path.exists(COMPONENTS_DIR):
@@ -177,28 +302,12 @@ def main():
     
     # Collect valid components
     print("\nCollecting valid components...")
-    valid_components = []
-    attempts = 0
-    max_attempts = 500
-    
-    while len(valid_components) < NUM_COMPONENTS and attempts < max_attempts:
-        component_id = get_random_component_id()
-        component_data = load_component(component_id)
-        
-        if component_data and 'nodes' in component_data:
-            node_count = len(component_data['nodes'])
-            if MIN_NODES <= node_count <= MAX_NODES:
-                valid_components.append((component_id, component_data))
-                print(f"  Found component {component_id}: {node_count} nodes")
-        
-        attempts += 1
-        
-        # Try next component if current one is invalid
-        if component_data is None or (component_data and 'nodes' in component_data and 
-                                     not (MIN_NODES <= len(component_data['nodes']) <= MAX_NODES)):
-            component_id += 1
-            if component_id > 10000:
-                component_id = 1
+    if os.path.exists(os.path.join(COMPONENTS_DIR, component_catalog.CATALOG_FILE)):
+        valid_components = select_components_from_catalog()
+    else:
+        print(f"  No {component_catalog.CATALOG_FILE}; probing random component files "
+              "(python build_indexes.py --outputs catalog creates it)")
+        valid_components = probe_random_components()
     
     if len(valid_components) < NUM_COMPONENTS:
         print(f"\nWarning: Only found {len(valid_components)} valid components out of {NUM_COMPONENTS} requested.")
@@ -206,7 +315,7 @@ def main():
     
     # Arrange components in a grid
     # 8 columns, 5 rows for 40 components
-    cols = 8
+    cols = COLUMNS
     rows = (len(valid_components) + cols - 1) // cols
     
     # Calculate spacing
@@ -235,6 +344,9 @@ def main():
     ax.grid(False)
     ax.set_facecolor('white')
     
+    positions_by_id, layout_notes = compute_cover_layouts(valid_components)
+    batch = CoverBatch()
+    
     # Visualize each component
     print(f"\nVisualizing {len(valid_components)} components...")
     for idx, (component_id, component_data) in enumerate(valid_components):
@@ -249,8 +361,10 @@ def main():
         # Scale to fit within component area
         scale = min(component_width, component_height) / 15.0
         
-        print(f"  Component {component_id} at position ({row}, {col})")
-        visualize_component_3d(ax, component_data, x_offset, y_offset, z_offset, scale)
+        positions = positions_by_id.get(component_id)
+        print(f"  Component {component_id} at position ({row}, {col}){layout_notes.get(component_id, '')}")
+        visualize_component_3d(ax, component_data, x_offset, y_offset, z_offset, scale, positions, SEED, batch)
+    batch.draw(ax, RASTERIZE)
     
     # Set axis limits to match page dimensions
     ax.set_xlim(0, WIDTH_INCHES)
@@ -278,6 +392,36 @@ def main():
     
     plt.close()
 
+def apply_preset(name):
+    """Set the page size, DPI, component count and grid columns from PRESETS[name]"""
+    global WIDTH_INCHES, HEIGHT_INCHES, DPI, NUM_COMPONENTS, COLUMNS
+    preset = PRESETS[name]
+    WIDTH_INCHES, HEIGHT_INCHES = preset['width'], preset['height']
+    DPI = preset['dpi']
+    NUM_COMPONENTS = preset['components']
+    COLUMNS = preset['columns']
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render a grid of model families in 3D force layout')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='magazine', help='Page format (default: magazine)')
+    parser.add_argument('--components', type=int, help='Number of components (default: from the preset)')
+    parser.add_argument('--columns', type=int, help='Grid columns (default: from the preset)')
+    parser.add_argument('--dpi', type=int, help='Output DPI (default: from the preset)')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Output file; .pdf / .svg for vector output')
+    parser.add_argument('--rasterize', action='store_true', help='Rasterize edges and nodes in vector output')
+    parser.add_argument('--components-dir', default=COMPONENTS_DIR, help='Directory with the exported components')
+    parser.add_argument('--seed', type=int, help='Fixed seed for the component choice and layouts')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Processes for the layouts')
+    args = parser.parse_args()
+
+    apply_preset(args.preset)
+    NUM_COMPONENTS = args.components or NUM_COMPONENTS
+    COLUMNS = args.columns or COLUMNS
+    DPI = args.dpi or DPI
+    OUTPUT_FILE = args.output
+    RASTERIZE = args.rasterize
+    COMPONENTS_DIR = args.components_dir
+    SEED = args.seed
+    WORKERS = args.workers
     main()
 
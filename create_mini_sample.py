@@ -1,168 +1,501 @@
 """
 Script to create a mini sample of graph_data.json for testing the front-end.
-This creates a small connected component with a few nodes and edges.
+
+The sampler never holds the full graph as Python dicts. It reads one of two
+sources:
+
+- graph_data.json, streamed element by element (iter_graph_json) into an
+  id -> index map plus int32 edge arrays; the records of the sampled nodes
+  and edges are picked up by a second streaming pass
+- a components directory (--components-dir): the component index plus only
+  the component files the sampler touches, so a BFS from a seed reads a
+  single component
+
+Strategies (every one yields nodes in sampling order, with a deque frontier):
+
+- bfs                breadth-first from a seed model (default zera09/SmolVLM)
+- forest-fire        forest-fire sampling: every burned node burns a
+                     geometric number of its unburned neighbours, restarting
+                     from a random node when the fire dies out
+- stratified-size    components bucketed by log2(size), taken round-robin
+                     across buckets (big components are cut to a BFS piece)
+- stratified-type    edges reservoir-sampled per edge type, taken
+                     round-robin across types
+
+Several tiers come out of one traversal: tier N is the first N sampled nodes
+plus every edge between them, so smaller tiers are subsets of larger ones.
+
+    python create_mini_sample.py
+    python create_mini_sample.py --components-dir components --strategy forest-fire --tiers 100 1000 10000
 """
+import argparse
+import gzip
 import json
+import os
 import random
+from array import array
+from collections import OrderedDict, defaultdict, deque
+
+import numpy as np
+
+import compression
+import component_shards
+from build_indexes import INDEX_FILE
+from graph_arrays import connected_component_labels
+
+DEFAULT_SEED_MODEL = 'zera09/SmolVLM'
+STRATEGIES = ('bfs', 'forest-fire', 'stratified-size', 'stratified-type')
+# Sample size for strategies that cannot run "until the component is exhausted"
+DEFAULT_SAMPLE_NODES = 1000
+# Forward burning probability (mean burned neighbours per node is p / (1 - p))
+BURN_PROBABILITY = 0.7
+# graph_data.json is read in blocks of this many characters
+BLOCK_SIZE = 1 << 20
+# Components kept decoded by ComponentGraph
+COMPONENT_CACHE_SIZE = 64
+
+_WHITESPACE = ' \t\r\n'
+
+def iter_graph_json(path, block_size=BLOCK_SIZE):
+    """
+    Stream a JSON object file like graph_data.json without loading it.
 
-def create_mini_sample(input_file='graph_data.json', output_file='graph_data_mini.json', max_nodes=None):
+    Yields (key, element) for every element of a top-level array ("nodes",
+    "edges") and (key, value) for any other top-level value ("metadata").
+    Only one block plus the element being decoded is held in memory.
     """
-    Create a mini sample from the full graph_data.json.
-    Takes a random connected component or creates a small sample.
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+
+        def peek(skip):
+            # Next character after any in `skip`, reading more input as needed ('' at the end)
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos] in skip:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos] if pos < len(buffer) else ''
+                buffer, pos = f.read(block_size), 0
+                eof = not buffer
+
+        def decode():
+            nonlocal buffer, pos, eof
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A number at the very end of the buffer may continue in the next block
+                    if end < len(buffer) or eof:
+                        pos = end
+                        if pos > block_size:
+                            buffer, pos = buffer[pos:], 0
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                more = f.read(block_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+
+        if peek(_WHITESPACE) != '{':
+            raise ValueError(f"{path} is not a JSON object")
+        pos += 1
+        while True:
+            c = peek(_WHITESPACE + ',')
+            if c in ('}', ''):
+                return
+            key = decode()
+            if peek(_WHITESPACE) != ':':
+                raise ValueError(f"Malformed JSON in {path} after key {key!r}")
+            pos += 1
+            if peek(_WHITESPACE) != '[':
+                yield key, decode()
+                continue
+            pos += 1
+            while True:
+                c = peek(_WHITESPACE + ',')
+                if c == ']':
+                    pos += 1
+                    break
+                if c == '':
+                    raise ValueError(f"Unexpected end of {path} inside {key!r}")
+                yield key, decode()
+
+class StreamedGraph:
     """
-    try:
-        print(f"Loading {input_file}...")
-        with open(input_file, 'r') as f:
-            data = json.load(f)
-        
-        print(f"Original: {len(data['nodes'])} nodes, {len(data['edges'])} edges")
-        
-        # Strategy: Find a node with connections and build a small connected component
-        if len(data['nodes']) == 0:
-            raise ValueError("No nodes in input file!")
-        
-        # Create node and edge maps for efficient lookup
-        node_map = {node['id']: node for node in data['nodes']}
-        edges_by_source = {}
-        edges_by_target = {}
-        
-        for edge in data['edges']:
-            source = edge['source']
-            target = edge['target']
-            
-            if source not in edges_by_source:
-                edges_by_source[source] = []
-            edges_by_source[source].append(edge)
-            
-            if target not in edges_by_target:
-                edges_by_target[target] = []
-            edges_by_target[target].append(edge)
-        
-        # Find a node that has connections
-        nodes_with_edges = set()
-        for edge in data['edges']:
-            nodes_with_edges.add(edge['source'])
-            nodes_with_edges.add(edge['target'])
-        
-        if not nodes_with_edges:
-            raise ValueError("No edges found in graph!")
-        
-        # Start with the specific model: zera09/SmolVLM
-        target_model = 'zera09/SmolVLM'
-        if target_model not in node_map:
-            print(f"Warning: {target_model} not found in graph. Using random node instead.")
-            start_node_id = random.choice(list(nodes_with_edges))
+    graph_data.json streamed into an id -> index map and int32 edge arrays.
+
+    Nodes must come before edges in the file (as the notebook writes it);
+    edges with an unknown endpoint are skipped. Neighbours are kept as an
+    undirected CSR adjacency: outgoing edges first, then incoming ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.ids = []
+        src, dst, types = array('i'), array('i'), array('i')
+        type_lookup = {}
+        for key, item in iter_graph_json(path):
+            if key == 'nodes':
+                if item['id'] not in self.index:
+                    self.index[item['id']] = len(self.ids)
+                    self.ids.append(item['id'])
+            elif key == 'edges':
+                source = self.index.get(item['source'])
+                target = self.index.get(item['target'])
+                if source is None or target is None:
+                    continue
+                src.append(source)
+                dst.append(target)
+                types.append(type_lookup.setdefault(item.get('type'), len(type_lookup)))
+        self.type_names = list(type_lookup)
+        self.num_nodes = len(self.ids)
+        self.src = np.frombuffer(src, dtype=np.int32) if src else np.zeros(0, dtype=np.int32)
+        self.dst = np.frombuffer(dst, dtype=np.int32) if dst else np.zeros(0, dtype=np.int32)
+        self.types = np.frombuffer(types, dtype=np.int32) if types else np.zeros(0, dtype=np.int32)
+        self.num_edges = len(self.src)
+
+        ends = np.concatenate([self.src, self.dst])
+        order = np.argsort(ends, kind='stable')
+        self._neighbors = np.concatenate([self.dst, self.src])[order]
+        self._neighbor_types = np.concatenate([self.types, self.types])[order]
+        self._offsets = np.searchsorted(ends[order], np.arange(self.num_nodes + 1))
+        self._labels = None
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def neighbors(self, node):
+        """[(neighbour id, edge type), ...]"""
+        i = self.index[node]
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return [(self.ids[j], self.type_names[t])
+                for j, t in zip(self._neighbors[start:end].tolist(), self._neighbor_types[start:end].tolist())]
+
+    def random_node(self, rng):
+        return rng.choice(self.ids)
+
+    def components(self):
+        """[(component key, size), ...]"""
+        if self._labels is None:
+            self._labels = connected_component_labels(self.num_nodes, self.src, self.dst)
+        keys, sizes = np.unique(self._labels, return_counts=True)
+        return list(zip(keys.tolist(), sizes.tolist()))
+
+    def component_seed(self, key):
+        # Components are labelled with their smallest node index
+        return self.ids[key]
+
+    def iter_edges(self):
+        """(source, target, type) for every edge"""
+        for s, t, c in zip(self.src.tolist(), self.dst.tolist(), self.types.tolist()):
+            yield self.ids[s], self.ids[t], self.type_names[c]
+
+    def subgraph(self, node_ids):
+        """Original node and edge records among node_ids, from a second streaming pass"""
+        nodes, edges = {}, []
+        for key, item in iter_graph_json(self.path):
+            if key == 'nodes':
+                if item['id'] in node_ids and item['id'] not in nodes:
+                    nodes[item['id']] = item
+            elif key == 'edges':
+                if item['source'] in node_ids and item['target'] in node_ids:
+                    edges.append(item)
+        return nodes, edges
+
+class ComponentGraph:
+    """
+    A components directory read through its index, one component at a time.
+
+    Memory is the component index plus up to cache_size decoded components.
+    """
+
+    def __init__(self, base='components', cache_size=COMPONENT_CACHE_SIZE):
+        self.base = base
+        with gzip.open(os.path.join(base, INDEX_FILE), 'rt', encoding='utf-8') as f:
+            index_data = json.load(f)
+        self.component_of = index_data['component_index']
+        self.stats = {stat['component_id']: stat for stat in index_data.get('component_stats', [])}
+        self.num_nodes = index_data.get('total_nodes', len(self.component_of))
+        self.num_edges = index_data.get('total_edges', 0)
+
+        settings = index_data.get('compression') or {}
+        self.codec = settings.get('codec', 'gzip')
+        self.dictionary = None
+        if settings.get('dictionary'):
+            self.dictionary = compression.load_dictionary(os.path.join(base, settings['dictionary']))
+        self.directory = component_shards.load_shard_directory(base)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._model_ids = None
+
+    def _read(self, component_id):
+        return component_shards.read_component(component_id, self.base, self.directory, self.codec,
+                                               self.dictionary)
+
+    def _adjacency(self, component_id):
+        adjacency = self._cache.get(component_id)
+        if adjacency is not None:
+            self._cache.move_to_end(component_id)
+            return adjacency
+        component = self._read(component_id)
+        adjacency = defaultdict(list)
+        for edge in component['edges']:
+            adjacency[edge['source']].append((edge['target'], edge.get('type')))
+        for edge in component['edges']:
+            adjacency[edge['target']].append((edge['source'], edge.get('type')))
+        self._cache[component_id] = adjacency
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return adjacency
+
+    def __contains__(self, node):
+        return node in self.component_of
+
+    def neighbors(self, node):
+        """[(neighbour id, edge type), ...]"""
+        return self._adjacency(self.component_of[node]).get(node, [])
+
+    def random_node(self, rng):
+        if self._model_ids is None:
+            self._model_ids = list(self.component_of)
+        return rng.choice(self._model_ids)
+
+    def components(self):
+        """[(component id, size), ...]"""
+        return [(component_id, stat['nodes']) for component_id, stat in self.stats.items()]
+
+    def component_seed(self, component_id):
+        sample_models = self.stats[component_id].get('sample_models')
+        if sample_models:
+            return sample_models[0]
+        return self._read(component_id)['nodes'][0]['id']
+
+    def iter_edges(self):
+        """(source, target, type) for every edge, reading each component once"""
+        for component_id in self.stats:
+            for edge in self._read(component_id)['edges']:
+                yield edge['source'], edge['target'], edge.get('type')
+
+    def subgraph(self, node_ids):
+        """Original node and edge records among node_ids, reading each of their components once"""
+        nodes, edges = {}, []
+        for component_id in sorted({self.component_of[node] for node in node_ids}):
+            component = self._read(component_id)
+            for node in component['nodes']:
+                if node['id'] in node_ids:
+                    nodes[node['id']] = node
+            edges.extend(edge for edge in component['edges']
+                         if edge['source'] in node_ids and edge['target'] in node_ids)
+        return nodes, edges
+
+def sample_bfs(graph, seed, limit=None):
+    """Nodes in breadth-first order from seed (the whole component if limit is None)"""
+    order = [seed]
+    seen = {seed}
+    frontier = deque([seed])
+    while frontier and (limit is None or len(order) < limit):
+        for neighbor, _ in graph.neighbors(frontier.popleft()):
+            if neighbor not in seen:
+                seen.add(neighbor)
+                order.append(neighbor)
+                frontier.append(neighbor)
+                if limit is not None and len(order) >= limit:
+                    break
+    return order
+
+def sample_forest_fire(graph, seed, limit, rng, burn_probability=BURN_PROBABILITY):
+    """Nodes in the order a forest fire from seed burns them"""
+    order = []
+    burned = set()
+    frontier = deque()
+
+    def ignite(node):
+        burned.add(node)
+        order.append(node)
+        frontier.append(node)
+
+    ignite(seed)
+    limit = min(limit, graph.num_nodes)
+    while len(order) < limit:
+        if not frontier:
+            # The fire died out: restart from a random unburned node
+            node = graph.random_node(rng)
+            while node in burned:
+                node = graph.random_node(rng)
+            ignite(node)
+            continue
+        unburned = [neighbor for neighbor, _ in graph.neighbors(frontier.popleft()) if neighbor not in burned]
+        count = 0
+        while rng.random() < burn_probability:
+            count += 1
+        for neighbor in rng.sample(unburned, min(count, len(unburned))):
+            if neighbor not in burned and len(order) < limit:
+                ignite(neighbor)
+    return order
+
+def sample_stratified_by_size(graph, limit, rng):
+    """
+    Nodes from components of every size class.
+
+    Components are bucketed by log2(size) and taken round-robin from the
+    smallest bucket up, so every prefix of the order spans the size classes.
+    A component contributes at most limit / buckets nodes (a BFS piece).
+    """
+    buckets = defaultdict(list)
+    for key, size in graph.components():
+        buckets[int(size).bit_length()].append(key)
+    for keys in buckets.values():
+        rng.shuffle(keys)
+    share = max(1, limit // max(len(buckets), 1))
+
+    order = []
+    seen = set()
+    while len(order) < limit and any(buckets.values()):
+        for bucket in sorted(buckets):
+            if not buckets[bucket] or len(order) >= limit:
+                continue
+            piece = sample_bfs(graph, graph.component_seed(buckets[bucket].pop()), min(share, limit - len(order)))
+            for node in piece:
+                if node not in seen:
+                    seen.add(node)
+                    order.append(node)
+    return order
+
+def sample_stratified_by_type(graph, limit, rng):
+    """
+    Endpoints of edges of every type.
+
+    One pass reservoir-samples up to limit edges per type; the reservoirs are
+    then taken round-robin, so every prefix of the order balances the types.
+    """
+    reservoirs = defaultdict(list)
+    counts = defaultdict(int)
+    for source, target, edge_type in graph.iter_edges():
+        counts[edge_type] += 1
+        reservoir = reservoirs[edge_type]
+        if len(reservoir) < limit:
+            reservoir.append((source, target))
         else:
-            start_node_id = target_model
-        print(f"Starting from node: {start_node_id}")
-        
-        # BFS to collect a small connected component
-        visited = set()
-        queue = [start_node_id]
-        selected_nodes = set()
-        selected_edges_dict = {}  # Use dict to store edges by (source, target) key
-        
-        while queue and (max_nodes is None or len(selected_nodes) < max_nodes):
-            current = queue.pop(0)
-            if current in visited:
+            j = rng.randrange(counts[edge_type])
+            if j < limit:
+                reservoir[j] = (source, target)
+    for reservoir in reservoirs.values():
+        rng.shuffle(reservoir)
+    print(f"  Edge types: {', '.join(f'{edge_type}: {count:,}' for edge_type, count in counts.items())}")
+
+    order = []
+    seen = set()
+    queues = [deque(reservoirs[edge_type]) for edge_type in sorted(reservoirs, key=str)]
+    while len(order) < limit and any(queues):
+        for queue in queues:
+            if not queue:
                 continue
-            
-            visited.add(current)
-            if current in node_map:
-                selected_nodes.add(current)
-            
-            # Add outgoing edges
-            if current in edges_by_source:
-                for edge in edges_by_source[current]:
-                    target = edge['target']
-                    if target in node_map:  # Make sure target exists
-                        edge_key = (edge['source'], edge['target'])
-                        selected_edges_dict[edge_key] = edge
-                        if target not in visited and (max_nodes is None or len(selected_nodes) < max_nodes):
-                            queue.append(target)
-            
-            # Add incoming edges
-            if current in edges_by_target:
-                for edge in edges_by_target[current]:
-                    source = edge['source']
-                    if source in node_map:  # Make sure source exists
-                        edge_key = (edge['source'], edge['target'])
-                        selected_edges_dict[edge_key] = edge
-                        if source not in visited and (max_nodes is None or len(selected_nodes) < max_nodes):
-                            queue.append(source)
-        
-        # Build the mini graph
-        mini_nodes = [node_map[node_id] for node_id in selected_nodes if node_id in node_map]
-        mini_edges = list(selected_edges_dict.values())
-        
-        if len(mini_nodes) == 0:
-            raise ValueError("Could not create connected component!")
-        
-    except (FileNotFoundError, ValueError) as e:
-        print(f"Error: {e}")
-        print("Creating a mock sample instead...")
-        
-        # Create a mock sample
-        mini_nodes = [
-            {
-                'id': 'meta-llama/Llama-3-8B',
-                'name': 'Llama-3-8B',
-                'likes': 5000,
-                'downloads': 1000000,
-                'createdAt': '2024-01-01T00:00:00.000Z',
-                'pipeline_tag': 'text-generation',
-                'library_name': 'transformers',
-                'size': 1.0
-            },
-            {
-                'id': 'meta-llama/Llama-3-8B-Instruct',
-                'name': 'Llama-3-8B-Instruct',
-                'likes': 3000,
-                'downloads': 800000,
-                'createdAt': '2024-02-01T00:00:00.000Z',
-                'pipeline_tag': 'text-generation',
-                'library_name': 'transformers',
-                'size': 1.0
-            },
-            {
-                'id': 'user/finetuned-llama',
-                'name': 'finetuned-llama',
-                'likes': 100,
-                'downloads': 5000,
-                'createdAt': '2024-03-01T00:00:00.000Z',
-                'pipeline_tag': 'text-generation',
-                'library_name': 'transformers',
-                'size': 1.0
-            },
-            {
-                'id': 'user/quantized-llama',
-                'name': 'quantized-llama',
-                'likes': 50,
-                'downloads': 2000,
-                'createdAt': '2024-04-01T00:00:00.000Z',
-                'pipeline_tag': 'text-generation',
-                'library_name': 'transformers',
-                'size': 1.0
-            }
-        ]
-        mini_edges = [
-            {
-                'source': 'meta-llama/Llama-3-8B',
-                'target': 'meta-llama/Llama-3-8B-Instruct',
-                'type': 'finetune'
-            },
-            {
-                'source': 'meta-llama/Llama-3-8B',
-                'target': 'user/finetuned-llama',
-                'type': 'finetune'
-            },
-            {
-                'source': 'meta-llama/Llama-3-8B-Instruct',
-                'target': 'user/quantized-llama',
-                'type': 'quantized'
-            }
-        ]
-    
+            for node in queue.popleft():
+                if node not in seen and len(order) < limit:
+                    seen.add(node)
+                    order.append(node)
+    return order
+
+def choose_seed(graph, seed_model, rng):
+    """seed_model if it is in the graph, else a random node with at least one edge"""
+    if seed_model in graph:
+        return seed_model
+    print(f"Warning: {seed_model} not found in graph. Using random node instead.")
+    for _ in range(1000):
+        node = graph.random_node(rng)
+        if graph.neighbors(node):
+            return node
+    raise ValueError("No edges found in graph!")
+
+def sample_order(graph, strategy='bfs', limit=None, seed_model=DEFAULT_SEED_MODEL, rng=None):
+    """Sampled node ids in sampling order, up to limit"""
+    rng = rng or random.Random()
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}")
+    if strategy == 'stratified-size':
+        return sample_stratified_by_size(graph, limit or DEFAULT_SAMPLE_NODES, rng)
+    if strategy == 'stratified-type':
+        return sample_stratified_by_type(graph, limit or DEFAULT_SAMPLE_NODES, rng)
+
+    seed = choose_seed(graph, seed_model, rng)
+    print(f"Starting from node: {seed}")
+    if strategy == 'forest-fire':
+        return sample_forest_fire(graph, seed, limit or DEFAULT_SAMPLE_NODES, rng)
+    return sample_bfs(graph, seed, limit)
+
+def tier_path(output_file, size):
+    """graph_data_mini.json -> graph_data_mini_1000.json"""
+    root, ext = os.path.splitext(output_file)
+    return f'{root}_{size}{ext}'
+
+def mock_sample():
+    """A tiny hand-made graph, used when no input graph is available"""
+    mini_nodes = [
+        {
+            'id': 'meta-llama/Llama-3-8B',
+            'name': 'Llama-3-8B',
+            'likes': 5000,
+            'downloads': 1000000,
+            'createdAt': '2024-01-01T00:00:00.000Z',
+            'pipeline_tag': 'text-generation',
+            'library_name': 'transformers',
+            'size': 1.0
+        },
+        {
+            'id': 'meta-llama/Llama-3-8B-Instruct',
+            'name': 'Llama-3-8B-Instruct',
+            'likes': 3000,
+            'downloads': 800000,
+            'createdAt': '2024-02-01T00:00:00.000Z',
+            'pipeline_tag': 'text-generation',
+            'library_name': 'transformers',
+            'size': 1.0
+        },
+        {
+            'id': 'user/finetuned-llama',
+            'name': 'finetuned-llama',
+            'likes': 100,
+            'downloads': 5000,
+            'createdAt': '2024-03-01T00:00:00.000Z',
+            'pipeline_tag': 'text-generation',
+            'library_name': 'transformers',
+            'size': 1.0
+        },
+        {
+            'id': 'user/quantized-llama',
+            'name': 'quantized-llama',
+            'likes': 50,
+            'downloads': 2000,
+            'createdAt': '2024-04-01T00:00:00.000Z',
+            'pipeline_tag': 'text-generation',
+            'library_name': 'transformers',
+            'size': 1.0
+        }
+    ]
+    mini_edges = [
+        {
+            'source': 'meta-llama/Llama-3-8B',
+            'target': 'meta-llama/Llama-3-8B-Instruct',
+            'type': 'finetune'
+        },
+        {
+            'source': 'meta-llama/Llama-3-8B',
+            'target': 'user/finetuned-llama',
+            'type': 'finetune'
+        },
+        {
+            'source': 'meta-llama/Llama-3-8B-Instruct',
+            'target': 'user/quantized-llama',
+            'type': 'quantized'
+        }
+    ]
+    return mini_nodes, mini_edges
+
+def write_sample(mini_nodes, mini_edges, output_file, original_size=0, strategy=None):
     mini_data = {
         'nodes': mini_nodes,
         'edges': mini_edges,
@@ -171,21 +504,80 @@ def create_mini_sample(input_file='graph_data.json', output_file='graph_data_min
             'total_edges': len(mini_edges),
             'full_graph': True,  # Mark as full graph so the UI works correctly
             'sample': True,
-            'original_size': len(data.get('nodes', [])) if 'data' in locals() else 0
+            'original_size': original_size
         }
     }
-    
+    if strategy:
+        mini_data['metadata']['strategy'] = strategy
+
     print(f"Mini sample: {len(mini_nodes)} nodes, {len(mini_edges)} edges")
     print(f"Saving to {output_file}...")
-    
     with open(output_file, 'w') as f:
         json.dump(mini_data, f, indent=2)
-    
-    file_size_kb = len(json.dumps(mini_data)) / 1024
     print(f"✓ Mini sample created successfully!")
-    print(f"  File size: {file_size_kb:.2f} KB")
-    
+    print(f"  File size: {os.path.getsize(output_file) / 1024:.2f} KB")
     return mini_data
 
+def create_mini_sample(input_file='graph_data.json', output_file='graph_data_mini.json', max_nodes=None,
+                       strategy='bfs', tiers=None, seed_model=DEFAULT_SEED_MODEL, components_dir=None,
+                       random_seed=None):
+    """
+    Create a mini sample from the full graph_data.json (or a components directory).
+
+    Parameters:
+    - max_nodes: sample size (bfs without it takes the seed's whole component)
+    - strategy: one of STRATEGIES
+    - tiers: several sample sizes from one traversal, written to
+      graph_data_mini_<size>.json; overrides max_nodes
+    - components_dir: read a components directory instead of input_file
+    - random_seed: seed for random choices, for reproducible samples
+
+    Returns the sample written, or {size: sample} when tiers are given.
+    """
+    rng = random.Random(random_seed)
+    sizes = sorted(set(tiers)) if tiers else [max_nodes]
+    try:
+        if components_dir:
+            print(f"Loading component index from {components_dir}...")
+            graph = ComponentGraph(components_dir)
+        else:
+            print(f"Streaming {input_file}...")
+            graph = StreamedGraph(input_file)
+        print(f"Original: {graph.num_nodes} nodes, {graph.num_edges} edges")
+        if graph.num_nodes == 0:
+            raise ValueError("No nodes in input file!")
+
+        order = sample_order(graph, strategy, sizes[-1], seed_model, rng)
+        nodes, edges = graph.subgraph(set(order))
+        if not nodes:
+            raise ValueError("Could not create connected component!")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        print("Creating a mock sample instead...")
+        mini_nodes, mini_edges = mock_sample()
+        return write_sample(mini_nodes, mini_edges, output_file)
+
+    samples = {}
+    for size in sizes:
+        selected = set(order[:size] if size else order)
+        mini_nodes = [nodes[node] for node in order if node in selected and node in nodes]
+        mini_edges = [edge for edge in edges if edge['source'] in selected and edge['target'] in selected]
+        path = tier_path(output_file, size) if tiers else output_file
+        samples[size] = write_sample(mini_nodes, mini_edges, path, graph.num_nodes, strategy)
+    return samples if tiers else samples[sizes[0]]
+
 if __name__ == '__main__':
-    create_mini_sample()
+    parser = argparse.ArgumentParser(description='Create mini samples of the ecosystem graph for testing')
+    parser.add_argument('--input', default='graph_data.json', help='Full graph JSON (streamed)')
+    parser.add_argument('--components-dir', help='Sample from a components directory instead of --input')
+    parser.add_argument('--output', default='graph_data_mini.json', help='Output file (tiers add a _<size> suffix)')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='bfs', help='Sampling strategy')
+    parser.add_argument('--max-nodes', type=int, help='Sample size (default: the whole component for bfs, '
+                                                     f'{DEFAULT_SAMPLE_NODES} otherwise)')
+    parser.add_argument('--tiers', type=int, nargs='+', help='Several sample sizes from one traversal, e.g. 100 1000 10000')
+    parser.add_argument('--seed-model', default=DEFAULT_SEED_MODEL, help='Start node for bfs / forest-fire')
+    parser.add_argument('--random-seed', type=int, help='Random seed for reproducible samples')
+    args = parser.parse_args()
+
+    create_mini_sample(args.input, args.output, args.max_nodes, args.strategy, args.tiers, args.seed_model,
+                       args.components_dir, args.random_seed)
@@ -4,46 +4,60 @@ This allows loading only the needed component instead of the entire 570MB file.
 """
 import pickle
 import networkx as nx
+import numpy as np
 import json
 import gzip
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import argparse
+import cProfile
 import os
+import shutil
+import graph_arrays
+import component_manifest
+import component_shards
+import component_layouts
+import component_binary
+import component_catalog
+import component_lod
+import compression
+from run_report import RunReport, timed
 
-def export_components(G, output_dir='components', include_attributes=['likes', 'downloads', 'createdAt', 'pipeline_tag', 'library_name']):
+DEFAULT_ATTRIBUTES = ['likes', 'downloads', 'createdAt', 'pipeline_tag', 'library_name']
+
+# Target number of nodes per task handed to a worker process. Tiny components
+# are batched together so per-task pickling overhead stays negligible.
+BATCH_NODES = 20000
+
+# Components with more nodes than this are not used to train the zstd dictionary
+DICTIONARY_SAMPLE_MAX_NODES = 1000
+
+# Export engines: 'subgraph' copies a networkx subgraph per component,
+# 'arrays' converts the graph once (see graph_arrays.py) and slices arrays
+ENGINES = ('subgraph', 'arrays')
+
+# State shared with worker processes (set by _init_worker)
+_worker_source = None
+_worker_components = None
+_worker_options = None
+
+def build_component_json(G, comp_id, component_nodes, include_attributes=DEFAULT_ATTRIBUTES, report=None):
     """
-    Export graph as separate connected components with an index.
+    Build the JSON payload for a single connected component.
     
     Parameters:
     - G: networkx graph
-    - output_dir: directory to save component files
+    - comp_id: component id to record in the metadata
+    - component_nodes: iterable of node ids in the component
     - include_attributes: list of node attributes to include
+    - report: run_report.RunReport to time the 'subgraph' and 'attributes' stages in
     """
-    print(f"Processing graph: {len(G.nodes())} nodes, {len(G.edges())} edges")
-    
-    # Create output directory
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Find all connected components
-    print("Finding connected components...")
-    components = list(nx.connected_components(G))
-    print(f"Found {len(components)} connected components")
-    
-    # Create index: model_id -> component_id
-    component_index = {}
-    component_stats = []
-    
-    # Process each component
-    for comp_id, component_nodes in enumerate(components):
-        comp_size = len(component_nodes)
-        print(f"Processing component {comp_id}: {comp_size} nodes")
-        
-        # Map all nodes in this component to component_id
-        for node_id in component_nodes:
-            component_index[node_id] = comp_id
-        
-        # Build subgraph for this component
+    # Build subgraph for this component
+    with timed(report, 'subgraph', items=1):
         G_sub = G.subgraph(component_nodes).copy()
-        
+    
+    with timed(report, 'attributes', items=len(G_sub)):
         # Prepare nodes data
         nodes_data = []
         for node_id in G_sub.nodes():
@@ -51,7 +65,7 @@ def export_components(G, output_dir='components', include_attributes=['likes', '
                 'id': node_id,
                 'name': node_id.split('/')[-1] if '/' in node_id else node_id
             }
-            
+        
             # Add requested attributes
             for attr in include_attributes:
                 if attr in G_sub.nodes[node_id]:
@@ -69,12 +83,12 @@ def export_components(G, output_dir='components', include_attributes=['likes', '
                             node_data[attr] = value
                     except:
                         node_data[attr] = None
-            
+        
             node_data['size'] = 1.0
             node_data['downloads'] = G_sub.nodes[node_id].get('downloads', 0)
             node_data['likes'] = G_sub.nodes[node_id].get('likes', 0)
             nodes_data.append(node_data)
-        
+    
         # Prepare edges data
         edges_data = []
         for source, target in G_sub.edges():
@@ -82,7 +96,7 @@ def export_components(G, output_dir='components', include_attributes=['likes', '
                 'source': source,
                 'target': target
             }
-            
+        
             # Add edge attributes
             if 'edge_type' in G_sub.edges[source, target]:
                 edge_data['type'] = G_sub.edges[source, target]['edge_type']
@@ -91,55 +105,531 @@ def export_components(G, output_dir='components', include_attributes=['likes', '
                 edge_data['type'] = edge_types[0] if edge_types else 'unknown'
             else:
                 edge_data['type'] = 'unknown'
-            
-            edges_data.append(edge_data)
         
-        # Create component JSON
-        component_json = {
-            'nodes': nodes_data,
-            'edges': edges_data,
-            'metadata': {
-                'component_id': comp_id,
-                'total_nodes': len(nodes_data),
-                'total_edges': len(edges_data)
-            }
+            edges_data.append(edge_data)
+    
+    # Create component JSON
+    return {
+        'nodes': nodes_data,
+        'edges': edges_data,
+        'metadata': {
+            'component_id': comp_id,
+            'total_nodes': len(nodes_data),
+            'total_edges': len(edges_data)
         }
+    }
+
+def write_component(component_json, output_dir, previous=None, pack=False, binary=False, codec='gzip',
+                    dictionary=None, report=None):
+    """
+    Save a component payload as component_N.json.gz and return its stats entry.
+    
+    With another codec (see compression.py) the file is component_N.json.zst
+    or component_N.json.br instead; dictionary is the export's zstd dictionary.
+    The stats entry carries the payload's 'content_hash'. If previous (the
+    component's manifest entry from the last export) has the same hash and the
+    file is still on disk, the file is left untouched and 'unchanged' is set.
+    With pack=True nothing is written; the gzip member for a shard file is
+    returned in stat['packed'] instead. With binary=True a component_N.bin.gz
+    (see component_binary.py) is written next to the JSON file. The encode,
+    compress, write and binary stages are timed in report, if given.
+    """
+    comp_id = component_json['metadata']['component_id']
+    component_file = compression.compressed_path(os.path.join(output_dir, f'component_{comp_id}.json'), codec)
+    
+    with timed(report, 'encode', items=1) as counters:
+        payload = json.dumps(component_json).encode('utf-8')
+        content_hash = component_manifest.content_hash(payload)
+        counters['bytes_out'] = len(payload)
+    stat = {
+        'component_id': comp_id,
+        'nodes': component_json['metadata']['total_nodes'],
+        'edges': component_json['metadata']['total_edges']
+    }
+    
+    if pack:
+        with timed(report, 'compress', items=1, bytes_in=len(payload)) as counters:
+            packed = component_shards.pack_payload(payload, codec, dictionary)
+            counters['bytes_out'] = len(packed)
+        stat['file_size_mb'] = round(len(packed) / (1024 * 1024), 2)
+        stat['content_hash'] = content_hash
+        stat['packed'] = packed
+        return stat
+    
+    binary_file = os.path.join(output_dir, f'component_{comp_id}{component_binary.BINARY_SUFFIX}')
+    if (previous and previous['hash'] == content_hash and os.path.exists(component_file)
+            and (not binary or os.path.exists(binary_file))):
+        stat['file_size_mb'] = previous['file_size_mb']
+        stat['content_hash'] = content_hash
+        stat['unchanged'] = True
+        return stat
+    
+    # Save component (compressed)
+    with timed(report, 'compress', items=1, bytes_in=len(payload)) as counters:
+        data = compression.compress(payload, codec, dictionary)
+        counters['bytes_out'] = len(data)
+    with timed(report, 'write', items=1, bytes_out=len(data)):
+        with open(component_file, 'wb') as f:
+            f.write(data)
+        remove_component_files(output_dir, comp_id, keep=component_file)
+    if binary:
+        with timed(report, 'binary', items=1):
+            component_binary.write_binary_component(component_json, output_dir)
+    
+    file_size_mb = len(data) / (1024 * 1024)
+    stat['file_size_mb'] = round(file_size_mb, 2)
+    stat['content_hash'] = content_hash
+    return stat
+
+def remove_component_files(output_dir, comp_id, keep=None):
+    """Remove a component's JSON files in every codec (except keep) and its binary file"""
+    paths = [compression.compressed_path(os.path.join(output_dir, f'component_{comp_id}.json'), codec)
+             for codec in compression.CODECS]
+    if keep is None:
+        paths.append(os.path.join(output_dir, f'component_{comp_id}{component_binary.BINARY_SUFFIX}'))
+    for path in paths:
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+def add_layout(stat, component_json, layout, report=None):
+    """
+    Compute the component's 3D layout into stat['layout'] if the layout stage needs it.
+    
+    layout holds 'params', 'max_nodes' and 'previous' (component_id -> content
+    hash of reusable layouts); components with an unchanged hash are skipped
+    here and copied from the previous layout store by the parent.
+    """
+    if layout is None or stat['nodes'] > layout['max_nodes']:
+        return
+    if layout['previous'].get(stat['component_id']) == stat['content_hash']:
+        return
+    with timed(report, 'layout', items=stat['nodes']):
+        stat['layout'] = component_layouts.compute_component_layout(component_json, layout['params'])
+
+def add_lod(stat, component_json, output_dir, lod_threshold, codec='gzip', report=None):
+    """
+    Write level-of-detail files (component_lod.py) for a component above lod_threshold.
+    
+    The LOD root path is recorded in stat['lod']. Unchanged components keep
+    their existing LOD files if they were cut with the same threshold and
+    codec; components that no longer get LOD files lose their old ones.
+    """
+    lod_dir = os.path.join(output_dir, component_lod.LOD_DIR, f"component_{stat['component_id']}")
+    if lod_threshold is None or stat['nodes'] <= lod_threshold:
+        if os.path.isdir(lod_dir):
+            shutil.rmtree(lod_dir)
+        return
+    settings = (lod_threshold, component_lod.LOD_MAX_SUPERNODES)
+    if stat.get('unchanged') and component_lod.lod_settings(stat['component_id'], output_dir, codec) == settings:
+        root = component_lod.root_path(stat['component_id'], codec)
+    else:
+        with timed(report, 'lod', items=stat['nodes']):
+            root = component_lod.write_lod(component_json, output_dir, max_nodes=lod_threshold, codec=codec)
+    stat['lod'] = root
+
+def export_component(G, comp_id, component_nodes, output_dir, include_attributes=DEFAULT_ATTRIBUTES,
+                     pack=False, layout=None, binary=False, lod_threshold=None, codec='gzip', dictionary=None,
+                     report=None):
+    """Build and save one component, returning its component_stats entry"""
+    component_json = build_component_json(G, comp_id, component_nodes, include_attributes, report)
+    stat = write_component(component_json, output_dir, pack=pack, binary=binary, codec=codec, dictionary=dictionary,
+                           report=report)
+    add_layout(stat, component_json, layout, report)
+    add_lod(stat, component_json, output_dir, lod_threshold, codec, report)
+    stat['catalog'] = component_catalog.catalog_row(component_json)
+    stat['sample_models'] = list(component_nodes)[:5]  # First 5 models as examples
+    return stat
+
+def export_component_arrays(arrays, comp_id, output_dir, component_id=None, previous=None, pack=False,
+                            layout=None, binary=False, lod_threshold=None, codec='gzip', dictionary=None,
+                            report=None):
+    """
+    Build and save one component from graph arrays, returning its component_stats entry.
+    
+    comp_id is the array label; component_id overrides the id used for the
+    file name and metadata (stable ids in incremental mode).
+    """
+    with timed(report, 'build', items=1):
+        component_json = graph_arrays.component_json(arrays, comp_id, component_id)
+    stat = write_component(component_json, output_dir, previous, pack, binary, codec, dictionary, report)
+    add_layout(stat, component_json, layout, report)
+    add_lod(stat, component_json, output_dir, lod_threshold, codec, report)
+    stat['catalog'] = component_catalog.catalog_row(component_json)
+    stat['sample_models'] = [node['id'] for node in component_json['nodes'][:5]]
+    return stat
+
+def _export_one(source, components, comp_id, options, report=None):
+    """Export one component with the configured engine"""
+    shard_max_nodes = options.get('shard_max_nodes')
+    pack = shard_max_nodes is not None and options['component_sizes'][comp_id] < shard_max_nodes
+    if options['engine'] == 'arrays':
+        component_id = comp_id
+        if options.get('component_ids') is not None:
+            component_id = options['component_ids'][comp_id]
+        previous = options.get('previous', {}).get(component_id)
+        return export_component_arrays(source, comp_id, options['output_dir'], component_id, previous, pack,
+                                       options.get('layout'), options['binary'], options['lod_threshold'],
+                                       options['codec'], options['dictionary'], report)
+    return export_component(source, comp_id, components[comp_id], options['output_dir'],
+                            options['include_attributes'], pack, options.get('layout'), options['binary'],
+                            options['lod_threshold'], options['codec'], options['dictionary'], report)
+
+def build_dictionary(source, components, component_sizes, options, samples=compression.DICTIONARY_SAMPLES,
+                     max_nodes=DICTIONARY_SAMPLE_MAX_NODES):
+    """
+    Train a zstd dictionary on the payloads of a sample of components.
+    
+    Samples are spread evenly over the components with at most max_nodes
+    nodes: the small files are the ones a shared dictionary helps most.
+    """
+    candidates = [comp_id for comp_id, size in enumerate(component_sizes) if size <= max_nodes]
+    if len(candidates) > samples:
+        candidates = [candidates[i] for i in np.linspace(0, len(candidates) - 1, samples).astype(int).tolist()]
+    
+    payloads = []
+    for comp_id in candidates:
+        if options['engine'] == 'arrays':
+            component_json = graph_arrays.component_json(source, comp_id, comp_id)
+        else:
+            component_json = build_component_json(source, comp_id, components[comp_id], options['include_attributes'])
+        payloads.append(json.dumps(component_json).encode('utf-8'))
+    return compression.train_dictionary(payloads)
+
+def _init_worker(source, components, options):
+    """Process pool initializer: keep the graph (or graph arrays) in module globals"""
+    global _worker_source, _worker_components, _worker_options
+    _worker_source = source
+    _worker_components = components
+    _worker_options = options
+
+def _export_batch(batch):
+    """Worker task: export a batch of component ids, returning their stats and the batch's stage timings"""
+    report = RunReport()
+    stats = [_export_one(_worker_source, _worker_components, comp_id, _worker_options, report) for comp_id in batch]
+    return stats, report.stages
+
+def batch_components(component_sizes, batch_nodes=BATCH_NODES):
+    """Group component ids into batches of roughly batch_nodes nodes"""
+    batch = []
+    batch_size = 0
+    for comp_id, size in enumerate(component_sizes):
+        batch.append(comp_id)
+        batch_size += size
+        if batch_size >= batch_nodes:
+            yield batch
+            batch = []
+            batch_size = 0
+    if batch:
+        yield batch
+
+def export_components_parallel(source, components, component_sizes, options, workers, collect, report=None):
+    """
+    Export components with a process pool.
+    
+    Each worker writes its component files independently and returns the
+    component_stats entries, which are passed to collect() as they arrive;
+    results are returned ordered by component_id. Stage timings measured in
+    the workers are merged into report.
+    """
+    # Prefer fork so workers inherit the graph instead of unpickling a copy each
+    try:
+        mp_context = multiprocessing.get_context('fork')
+    except ValueError:
+        mp_context = None
+    
+    component_stats = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(source, components, options)) as executor:
+        futures = [executor.submit(_export_batch, batch) for batch in batch_components(component_sizes)]
+        
+        for future in as_completed(futures):
+            stats, stages = future.result()
+            if report is not None:
+                report.merge(stages)
+            for stat in stats:
+                collect(stat)
+                component_stats.append(stat)
+                print(f"  Saved component {stat['component_id']}: {stat['nodes']} nodes ({stat['file_size_mb']:.2f} MB)")
+    
+    component_stats.sort(key=lambda stat: stat['component_id'])
+    return component_stats
+
+def export_components(G, output_dir='components', include_attributes=DEFAULT_ATTRIBUTES, workers=1,
+                      engine='subgraph', incremental=False, shard_max_nodes=None,
+                      shard_target_bytes=component_shards.SHARD_TARGET_BYTES, layouts=False,
+                      layout_max_nodes=component_layouts.LAYOUT_MAX_NODES, binary=False, lod_threshold=None,
+                      codec='gzip', use_dictionary=True, report=None):
+    """
+    Export graph as separate connected components with an index.
+    
+    Parameters:
+    - G: networkx graph
+    - output_dir: directory to save component files
+    - include_attributes: list of node attributes to include
+    - workers: number of worker processes (1 exports serially in this process)
+    - engine: 'subgraph' (per-component subgraph copy) or 'arrays' (single-pass array engine)
+    - incremental: keep component ids stable across exports (keyed on each
+      component's smallest model id) and only rewrite components whose content
+      hash changed since the last export; requires engine='arrays'
+    - shard_max_nodes: pack components with fewer nodes than this into shard
+      files (see component_shards.py) instead of one file each; None disables
+      sharding and removes the shards/ of a previous export
+    - shard_target_bytes: target size of each shard file
+    - layouts: precompute 3D layouts into layouts/ (see component_layouts.py),
+      reusing stored layouts of components whose content hash is unchanged
+    - layout_max_nodes: skip the layout stage for larger components
+    - binary: also write the binary columnar component_N.bin.gz files
+      (component_binary.py) for components that get their own file
+    - lod_threshold: also write level-of-detail files (component_lod.py) for
+      components with more nodes than this; None disables
+    - codec: compression of component files and shard members, 'gzip',
+      'zstd' or 'brotli' (see compression.py); the index stays gzip
+    - use_dictionary: with zstd, train a dictionary on a sample of components
+      (reused from output_dir on later exports) and compress with it
+    - report: run_report.RunReport that stage timings are recorded in (a new
+      one by default); a summary is printed at the end
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    if incremental and engine != 'arrays':
+        raise ValueError("Incremental export requires engine='arrays'")
+    compression.check_codec(codec)
+    if report is None:
+        report = RunReport()
+    report.info.update({'engine': engine, 'workers': workers, 'incremental': incremental, 'codec': codec,
+                        'nodes': len(G.nodes()), 'edges': len(G.edges())})
+    
+    print(f"Processing graph: {len(G.nodes())} nodes, {len(G.edges())} edges")
+    
+    # Create output directory
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Find all connected components
+    print("Finding connected components...")
+    component_index = {}
+    component_ids = None
+    if engine == 'arrays':
+        # Incremental exports need payloads independent of insertion order
+        with report.stage('discover', items=len(G.nodes())):
+            source = graph_arrays.build_graph_arrays(G, include_attributes, sort_nodes=incremental)
+        components = None
+        component_sizes = np.diff(source['node_offsets']).tolist()
+        node_ids = source['node_ids']
+        labels = source['labels'].tolist()
         
-        # Save component (compressed)
-        component_file = os.path.join(output_dir, f'component_{comp_id}.json.gz')
-        with gzip.open(component_file, 'wt', encoding='utf-8') as f:
-            json.dump(component_json, f)
+        if incremental:
+            manifest = component_manifest.load_manifest(output_dir)
+            # Nodes are sorted, so a component's first node is its smallest model id
+            canonicals = [node_ids[i] for i in source['node_order'][source['node_offsets'][:-1]].tolist()]
+            component_ids, canonicals, next_id = component_manifest.assign_stable_ids(
+                node_ids, source['labels'], canonicals, manifest)
+            labels = [component_ids[label] for label in labels]
         
-        # Track stats
-        file_size_mb = os.path.getsize(component_file) / (1024 * 1024)
-        component_stats.append({
-            'component_id': comp_id,
-            'nodes': comp_size,
-            'edges': len(edges_data),
-            'file_size_mb': round(file_size_mb, 2),
-            'sample_models': list(component_nodes)[:5]  # First 5 models as examples
-        })
+        with report.stage('index_map', items=len(node_ids)):
+            for node_id, comp_id in zip(node_ids, labels):
+                component_index[node_id] = comp_id
+    else:
+        source = G
+        with report.stage('discover', items=len(G.nodes())):
+            components = list(nx.connected_components(G))
+        component_sizes = [len(component_nodes) for component_nodes in components]
+        
+        # Create index: model_id -> component_id
+        with report.stage('index_map', items=len(G.nodes())):
+            for comp_id, component_nodes in enumerate(components):
+                # Map all nodes in this component to component_id
+                for node_id in component_nodes:
+                    component_index[node_id] = comp_id
+    num_components = len(component_sizes)
+    print(f"Found {num_components} connected components")
+    
+    # Process each component
+    options = {
+        'output_dir': output_dir,
+        'include_attributes': include_attributes,
+        'engine': engine,
+        'component_sizes': component_sizes,
+        'shard_max_nodes': shard_max_nodes,
+        'binary': binary,
+        'lod_threshold': lod_threshold,
+        'codec': codec,
+        'dictionary': None
+    }
+    
+    dictionary_file = os.path.join(output_dir, compression.DICTIONARY_FILE)
+    dictionary = None
+    if codec == 'zstd' and use_dictionary:
+        dictionary = compression.load_dictionary(dictionary_file)
+        if dictionary is None:
+            print("Training zstd dictionary...")
+            with report.stage('dictionary'):
+                dictionary = build_dictionary(source, components, component_sizes, options)
+            if dictionary is not None:
+                compression.save_dictionary(dictionary, dictionary_file)
+                print(f"  Dictionary saved: {dictionary_file} ({len(dictionary) / 1024:.0f} KB)")
+        options['dictionary'] = dictionary
+    elif os.path.exists(dictionary_file):
+        os.remove(dictionary_file)
+    compression_settings = {
+        'codec': codec,
+        'dictionary': component_manifest.content_hash(dictionary) if dictionary is not None else None
+    }
+    
+    if incremental:
+        options['component_ids'] = component_ids
+        options['previous'] = {int(comp_id): entry for comp_id, entry in manifest['components'].items()}
+        # Files compressed with other settings (e.g. an older dictionary) can't be kept
+        if manifest.get('compression', {'codec': 'gzip', 'dictionary': None}) != compression_settings:
+            options['previous'] = {}
+    
+    shard_writer = None
+    if shard_max_nodes is not None:
+        shard_writer = component_shards.ShardWriter(output_dir, shard_max_nodes, shard_target_bytes, codec)
+    else:
+        # read_component() checks the shard directory first, so a previous
+        # export's shards would shadow the new component files
+        shards_dir = os.path.join(output_dir, component_shards.SHARDS_DIR)
+        if os.path.isdir(shards_dir):
+            shutil.rmtree(shards_dir)
+    
+    layout_writer = None
+    if layouts:
+        layout_writer = component_layouts.LayoutWriter(output_dir, component_layouts.layout_params())
+        options['layout'] = {
+            'params': layout_writer.params,
+            'max_nodes': layout_max_nodes,
+            'previous': layout_writer.previous_hashes()
+        }
+    elif not incremental:
+        # Layouts of the previous export would be served for the new components
+        layouts_dir = os.path.join(output_dir, component_layouts.LAYOUTS_DIR)
+        if os.path.isdir(layouts_dir):
+            shutil.rmtree(layouts_dir)
+    
+    def collect(stat):
+        """Store layouts and append packed components to the current shard as they come in"""
+        if 'layout' in stat:
+            layout_writer.add(stat['component_id'], stat['content_hash'], stat.pop('layout'))
+        elif layout_writer is not None and stat['nodes'] <= layout_max_nodes:
+            layout_writer.reuse(stat['component_id'], stat['content_hash'])
         
-        print(f"  Saved: {component_file} ({file_size_mb:.2f} MB)")
+        if 'packed' not in stat:
+            return
+        with timed(report, 'shard', items=1, bytes_out=len(stat['packed'])):
+            shard_writer.add(stat['component_id'], stat.pop('packed'))
+        # A component that used to have its own file now lives in a shard
+        # (small enough to never have LOD files)
+        remove_component_files(output_dir, stat['component_id'])
+    
+    with report.stage('export', items=num_components):
+        if workers > 1:
+            print(f"Exporting with {workers} worker processes...")
+            component_stats = export_components_parallel(source, components, component_sizes, options, workers,
+                                                         collect, report)
+        else:
+            component_stats = []
+            for comp_id, comp_size in enumerate(component_sizes):
+                print(f"Processing component {comp_id}: {comp_size} nodes")
+                stat = _export_one(source, components, comp_id, options, report)
+                packed = 'packed' in stat
+                collect(stat)
+                component_stats.append(stat)
+                component_file = compression.compressed_path(
+                    os.path.join(output_dir, f"component_{stat['component_id']}.json"), codec)
+                if packed:
+                    print(f"  Packed into shard {len(shard_writer.shards) - 1}")
+                elif stat.get('unchanged'):
+                    print(f"  Unchanged: {component_file}")
+                else:
+                    print(f"  Saved: {component_file} ({stat['file_size_mb']:.2f} MB)")
+            component_stats.sort(key=lambda stat: stat['component_id'])
+    
+    if shard_writer is not None:
+        with report.stage('shards'):
+            directory_file = shard_writer.close()
+        print(f"\n✓ Packed {len(shard_writer.components)} small components into {len(shard_writer.shards)} shards")
+        print(f"  Shard directory: {directory_file}")
+    
+    if layout_writer is not None:
+        with report.stage('layouts'):
+            layout_index_file = layout_writer.close()
+        print(f"\n✓ Layouts: {layout_writer.computed} computed, {layout_writer.reused} reused")
+        print(f"  Layout index: {layout_index_file}")
+    
+    # Split the manifest bookkeeping and catalog rows off the component_stats entries
+    content_hashes = {}
+    catalog_rows = []
+    unchanged = 0
+    for stat in component_stats:
+        content_hashes[stat['component_id']] = stat.pop('content_hash')
+        catalog_rows.append(stat.pop('catalog'))
+        unchanged += stat.pop('unchanged', False)
+    
+    with report.stage('catalog', items=len(catalog_rows)):
+        catalog_file = component_catalog.write_catalog(catalog_rows, output_dir)
+    print(f"\n✓ Component catalog saved: {catalog_file}")
+    
+    if incremental:
+        # Remove files of components that no longer exist (merged or deleted)
+        stale_ids = {int(comp_id) for comp_id in manifest['components']} - set(content_hashes)
+        for comp_id in stale_ids:
+            remove_component_files(output_dir, comp_id)
+            stale_lod = os.path.join(output_dir, component_lod.LOD_DIR, f'component_{comp_id}')
+            if os.path.isdir(stale_lod):
+                shutil.rmtree(stale_lod)
+        
+        canonical_by_id = dict(zip(component_ids, canonicals))
+        manifest = {
+            'version': component_manifest.MANIFEST_VERSION,
+            'next_id': next_id,
+            'compression': compression_settings,
+            'components': {
+                str(stat['component_id']): {
+                    'canonical': canonical_by_id[stat['component_id']],
+                    'hash': content_hashes[stat['component_id']],
+                    'nodes': stat['nodes'],
+                    'edges': stat['edges'],
+                    'file_size_mb': stat['file_size_mb']
+                }
+                for stat in component_stats
+            }
+        }
+        with report.stage('manifest'):
+            manifest_file = component_manifest.save_manifest(manifest, output_dir)
+        print(f"\n✓ Manifest saved: {manifest_file}")
+        packed = len(shard_writer.components) if shard_writer is not None else 0
+        print(f"  Rewritten: {len(component_stats) - unchanged - packed}, unchanged: {unchanged}, "
+              f"packed: {packed}, removed: {len(stale_ids)}")
     
     # Create index file
     index_data = {
         'component_index': component_index,
         'component_stats': component_stats,
-        'total_components': len(components),
+        'total_components': num_components,
         'total_nodes': len(G.nodes()),
         'total_edges': len(G.edges())
     }
+    if codec != 'gzip':
+        index_data['compression'] = {
+            'codec': codec,
+            'dictionary': compression.DICTIONARY_FILE if dictionary is not None else None
+        }
     
     # Save index (compressed)
     index_file = os.path.join(output_dir, 'component_index.json.gz')
-    with gzip.open(index_file, 'wt', encoding='utf-8') as f:
-        json.dump(index_data, f)
+    with report.stage('index', items=len(component_index)) as counters:
+        with gzip.open(index_file, 'wt', encoding='utf-8') as f:
+            json.dump(index_data, f)
+        counters['bytes_out'] = os.path.getsize(index_file)
     
     index_size_mb = os.path.getsize(index_file) / (1024 * 1024)
     print(f"\n✓ Index saved: {index_file} ({index_size_mb:.2f} MB)")
-    print(f"✓ Total components: {len(components)}")
-    print(f"✓ Total files: {len(components)} components + 1 index")
+    print(f"✓ Total components: {num_components}")
+    if shard_writer is not None:
+        standalone = num_components - len(shard_writer.components)
+        print(f"✓ Total files: {standalone} components + {len(shard_writer.shards)} shards + 1 index")
+    else:
+        print(f"✓ Total files: {num_components} components + 1 index")
     
     # Print summary
     print("\nComponent size distribution:")
@@ -159,29 +649,88 @@ def export_components(G, output_dir='components', include_attributes=['likes', '
     for bucket, count in sorted(size_buckets.items()):
         print(f"  {bucket} nodes: {count} components")
     
+    report.print_summary()
     return index_file, component_stats
 
 if __name__ == '__main__':
-    import pandas as pd
+    parser = argparse.ArgumentParser(description='Export graph connected components with an index')
+    parser.add_argument('--graph', default='data/ai_ecosystem_graph_nomerges.pkl', help='Pickled networkx graph')
+    parser.add_argument('--output-dir', default='components', help='Directory for component files')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for the export (default: 1, serial)')
+    parser.add_argument('--engine', choices=ENGINES, default='subgraph',
+                        help="Export engine: 'subgraph' or single-pass 'arrays'")
+    parser.add_argument('--incremental', action='store_true',
+                        help='Stable component ids; only rewrite changed components (uses the arrays engine)')
+    parser.add_argument('--shard-max-nodes', type=int, default=None,
+                        help=f'Pack components with fewer nodes into shard files (e.g. {component_shards.SHARD_MAX_NODES})')
+    parser.add_argument('--shard-target-mb', type=float, default=component_shards.SHARD_TARGET_BYTES / (1024 * 1024),
+                        help='Target shard file size in MB')
+    parser.add_argument('--layouts', action='store_true',
+                        help='Precompute 3D layouts for components up to --layout-max-nodes nodes')
+    parser.add_argument('--layout-max-nodes', type=int, default=component_layouts.LAYOUT_MAX_NODES,
+                        help='Largest component to lay out during export')
+    parser.add_argument('--lod-threshold', type=int, default=None,
+                        help=f'Write level-of-detail files for components above this many nodes '
+                             f'(e.g. {component_lod.LOD_THRESHOLD})')
+    parser.add_argument('--binary', action='store_true',
+                        help='Also write binary columnar component_N.bin.gz files')
+    parser.add_argument('--compression', choices=compression.CODECS, default='gzip',
+                        help='Compression of component files and shards (zstd/brotli: local use only)')
+    parser.add_argument('--no-dictionary', action='store_true',
+                        help='With --compression zstd, do not train a shared dictionary')
+    parser.add_argument('--report', default=None,
+                        help='Write a JSON run report (stage timings, memory, throughput) to this file')
+    parser.add_argument('--profile', default=None,
+                        help='Write cProfile stats of the main process to this file (view with pstats/snakeviz)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also record peak Python allocations per stage with tracemalloc (slower)')
+    args = parser.parse_args()
+    
+    report = RunReport(trace_memory=args.trace_memory)
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
     
     # Load graph
     print("Loading graph...")
-    with open('data/ai_ecosystem_graph_nomerges.pkl', 'rb') as f:
-        G = pickle.load(f)
+    with report.stage('load', items=1, bytes_in=os.path.getsize(args.graph)):
+        with open(args.graph, 'rb') as f:
+            G = pickle.load(f)
     
     print(f"Graph loaded: {len(G.nodes())} nodes, {len(G.edges())} edges\n")
     
     # Export components
     index_file, stats = export_components(
         G,
-        output_dir='components',
-        include_attributes=['likes', 'downloads', 'createdAt', 'pipeline_tag', 'library_name']
+        output_dir=args.output_dir,
+        include_attributes=DEFAULT_ATTRIBUTES,
+        workers=args.workers,
+        engine='arrays' if args.incremental else args.engine,
+        incremental=args.incremental,
+        shard_max_nodes=args.shard_max_nodes,
+        shard_target_bytes=int(args.shard_target_mb * 1024 * 1024),
+        layouts=args.layouts,
+        layout_max_nodes=args.layout_max_nodes,
+        binary=args.binary,
+        lod_threshold=args.lod_threshold,
+        codec=args.compression,
+        use_dictionary=not args.no_dictionary,
+        report=report
     )
     
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"\n✓ Profile saved: {args.profile}")
+    if args.report:
+        report.save(args.report)
+        print(f"✓ Run report saved: {args.report}")
+    
     print(f"\n✓ Export complete!")
     print(f"  Index file: {index_file}")
-    print(f"  Components directory: components/")
+    print(f"  Components directory: {args.output_dir}/")
     print(f"\nNext steps:")
     print(f"  1. Upload components/ directory to R2 bucket")
     print(f"  2. Update frontend to load index first, then load components on demand")
-
@@ -0,0 +1,254 @@
+"""
+Array-backed view of the ecosystem graph for single-pass component export.
+
+The networkx graph is converted once into integer-indexed arrays: a CSR
+adjacency, a component label per node and cleaned attribute columns.
+Component payloads are then built by slicing those arrays instead of copying
+a subgraph (and re-cleaning every attribute) for each component.
+
+Nodes keep the graph's insertion order, neighbours keep the graph's adjacency
+order and components are numbered like nx.connected_components, so the
+payloads have the component_N.json.gz schema (keys and key order) and the
+component ids and membership of export_components.build_component_json.
+Record order is not guaranteed to match: the subgraph engine iterates a
+hashed node set for small components, so there its node order, edge
+orientation (source / target of an undirected edge) and the
+component_stats sample_models can differ. With sort_nodes=True nodes and
+neighbours are ordered by model id instead, which makes every payload
+independent of insertion order (needed for stable content hashes).
+"""
+import numpy as np
+import pandas as pd
+
+# Sentinel for "attribute not written for this node"
+_SKIP = object()
+
+def connected_component_labels(num_nodes, src, dst):
+    """
+    Label connected components of an undirected edge list.
+
+    Uses vectorized hooking + pointer jumping (a min-label union-find), so no
+    Python-level loop runs per node or per edge. Returns an int64 array with
+    the smallest node index of each node's component.
+    """
+    labels = np.arange(num_nodes, dtype=np.int64)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    if len(src) == 0:
+        return labels
+
+    while True:
+        lu = labels[src]
+        lv = labels[dst]
+        changed = lu != lv
+        if not changed.any():
+            return labels
+
+        # Hook the larger root under the smaller one
+        lu = lu[changed]
+        lv = lv[changed]
+        low = np.minimum(lu, lv)
+        high = np.maximum(lu, lv)
+        np.minimum.at(labels, high, low)
+
+        # Pointer jumping until every node points at its root
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+def _clean_column(values):
+    """
+    Clean one attribute column the way build_component_json cleans a value.
+
+    Non-string iterables are skipped, NaN / NA values become None and
+    everything else is kept as-is.
+    """
+    # fromiter keeps list / tuple values as single objects (no broadcasting)
+    column = np.fromiter(values, dtype=object, count=len(values))
+
+    iterable = np.fromiter(
+        (hasattr(v, '__iter__') and not isinstance(v, str) for v in values),
+        dtype=bool, count=len(values)
+    )
+    scalars = ~iterable
+    if scalars.any():
+        # pd.isna is elementwise on object arrays; one call per column
+        missing = np.zeros(len(values), dtype=bool)
+        missing[scalars] = pd.isna(column[scalars])
+        column[missing] = None
+    column[iterable] = _SKIP
+    return column
+
+def build_graph_arrays(G, include_attributes, sort_nodes=False):
+    """
+    Convert a networkx graph into the arrays used for component export.
+
+    Parameters:
+    - G: undirected networkx graph
+    - include_attributes: list of node attributes to include
+    - sort_nodes: order nodes and neighbours by model id instead of insertion order
+
+    Returns a dict with node ids/names, CSR adjacency, component layout
+    (nodes and edges grouped by component) and attribute columns.
+    """
+    node_ids = sorted(G.nodes()) if sort_nodes else list(G.nodes())
+    num_nodes = len(node_ids)
+    position = {node_id: i for i, node_id in enumerate(node_ids)}
+    names = [node_id.split('/')[-1] if '/' in node_id else node_id for node_id in node_ids]
+
+    # CSR adjacency in the graph's own neighbour order. Each undirected edge is
+    # kept once (u <= v), which is the orientation Graph.edges() reports when
+    # nodes are visited in insertion order.
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    indices = []
+    edge_src = []
+    edge_dst = []
+    edge_type_codes = []
+    edge_type_names = []
+    edge_type_lookup = {}
+
+    adjacency = G.adj
+    for u, node_id in enumerate(node_ids):
+        neighbors = adjacency[node_id].items()
+        if sort_nodes:
+            neighbors = sorted(neighbors, key=lambda item: position[item[0]])
+        for neighbor, edge_attrs in neighbors:
+            v = position[neighbor]
+            indices.append(v)
+            if v < u:
+                continue
+
+            if 'edge_type' in edge_attrs:
+                edge_type = edge_attrs['edge_type']
+            elif 'edge_types' in edge_attrs:
+                edge_types = edge_attrs['edge_types']
+                edge_type = edge_types[0] if edge_types else 'unknown'
+            else:
+                edge_type = 'unknown'
+
+            code = edge_type_lookup.get(edge_type)
+            if code is None:
+                code = edge_type_lookup[edge_type] = len(edge_type_names)
+                edge_type_names.append(edge_type)
+
+            edge_src.append(u)
+            edge_dst.append(v)
+            edge_type_codes.append(code)
+        indptr[u + 1] = len(indices)
+
+    indices = np.asarray(indices, dtype=np.int64)
+    edge_src = np.asarray(edge_src, dtype=np.int64)
+    edge_dst = np.asarray(edge_dst, dtype=np.int64)
+    edge_type_codes = np.asarray(edge_type_codes, dtype=np.int32)
+
+    # Component labels numbered by first node in graph order, which is the
+    # order nx.connected_components yields components in
+    roots = connected_component_labels(num_nodes, edge_src, edge_dst)
+    _, labels = np.unique(roots, return_inverse=True)
+    labels = labels.astype(np.int64)
+    num_components = int(labels.max()) + 1 if num_nodes else 0
+
+    # Group nodes and edges by component (stable, so graph order is kept)
+    node_order = np.argsort(labels, kind='stable')
+    node_offsets = np.zeros(num_components + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=num_components), out=node_offsets[1:])
+
+    edge_labels = labels[edge_src]
+    edge_order = np.argsort(edge_labels, kind='stable')
+    edge_offsets = np.zeros(num_components + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edge_labels, minlength=num_components), out=edge_offsets[1:])
+
+    # Attribute columns, cleaned once for the whole graph
+    graph_nodes = G.nodes
+    node_attrs = [graph_nodes[node_id] for node_id in node_ids]
+    columns = {}
+    for attr in include_attributes:
+        values = [attrs.get(attr, _SKIP) for attrs in node_attrs]
+        present = np.fromiter((v is not _SKIP for v in values), dtype=bool, count=num_nodes)
+        column = np.empty(num_nodes, dtype=object)
+        column[:] = _SKIP
+        if present.any():
+            column[present] = _clean_column([v for v in values if v is not _SKIP])
+        columns[attr] = column
+
+    # downloads / likes are always written with their raw value (default 0)
+    raw_columns = {}
+    for attr in ('downloads', 'likes'):
+        raw_columns[attr] = np.fromiter((attrs.get(attr, 0) for attrs in node_attrs),
+                                        dtype=object, count=num_nodes)
+
+    return {
+        'node_ids': node_ids,
+        'names': names,
+        'indptr': indptr,
+        'indices': indices,
+        'labels': labels,
+        'num_components': num_components,
+        'node_order': node_order,
+        'node_offsets': node_offsets,
+        'edge_src': edge_src[edge_order],
+        'edge_dst': edge_dst[edge_order],
+        'edge_type_codes': edge_type_codes[edge_order],
+        'edge_type_names': edge_type_names,
+        'edge_offsets': edge_offsets,
+        'columns': columns,
+        'raw_columns': raw_columns,
+        'total_nodes': num_nodes,
+        'total_edges': len(edge_src)
+    }
+
+def component_node_indices(arrays, comp_id):
+    """Node indices of a component, in graph order"""
+    offsets = arrays['node_offsets']
+    return arrays['node_order'][offsets[comp_id]:offsets[comp_id + 1]]
+
+def component_members(arrays, comp_id):
+    """Model ids of a component, in graph order"""
+    node_ids = arrays['node_ids']
+    return [node_ids[i] for i in component_node_indices(arrays, comp_id).tolist()]
+
+def component_json(arrays, comp_id, component_id=None):
+    """
+    Build the component_N.json.gz payload for one component from the arrays.
+
+    comp_id is the array label of the component; component_id (defaults to
+    comp_id) is the id recorded in the payload metadata.
+    """
+    node_ids = arrays['node_ids']
+    names = arrays['names']
+    columns = list(arrays['columns'].items())
+    raw_downloads = arrays['raw_columns']['downloads']
+    raw_likes = arrays['raw_columns']['likes']
+
+    nodes_data = []
+    for i in component_node_indices(arrays, comp_id).tolist():
+        node_data = {'id': node_ids[i], 'name': names[i]}
+        for attr, column in columns:
+            value = column[i]
+            if value is not _SKIP:
+                node_data[attr] = value
+        node_data['size'] = 1.0
+        node_data['downloads'] = raw_downloads[i]
+        node_data['likes'] = raw_likes[i]
+        nodes_data.append(node_data)
+
+    start, end = arrays['edge_offsets'][comp_id], arrays['edge_offsets'][comp_id + 1]
+    type_names = arrays['edge_type_names']
+    edges_data = [
+        {'source': node_ids[u], 'target': node_ids[v], 'type': type_names[code]}
+        for u, v, code in zip(arrays['edge_src'][start:end].tolist(),
+                              arrays['edge_dst'][start:end].tolist(),
+                              arrays['edge_type_codes'][start:end].tolist())
+    ]
+
+    return {
+        'nodes': nodes_data,
+        'edges': edges_data,
+        'metadata': {
+            'component_id': comp_id if component_id is None else component_id,
+            'total_nodes': len(nodes_data),
+            'total_edges': len(edges_data)
+        }
+    }
@@ -0,0 +1,213 @@
+"""
+3D force-directed layout on integer edge arrays.
+
+Same force model as the original compute_3d_layout() of
+create_magazine_cover.py (pairwise repulsion, spring attraction along edges,
+damping), evaluated with NumPy on whole arrays instead of per node pair.
+Repulsion has two modes:
+
+- 'exact': all pairs, in row blocks of at most PAIR_BLOCK pairs; O(n^2) per
+  iteration, fine up to a few thousand nodes
+- 'barnes-hut': an octree over the nodes; a cell whose size / distance is
+  below theta acts as one body of its node count at its centre of mass.
+  O(n log n) per iteration, for components of tens of thousands of nodes
+
+'auto' picks exact up to BARNES_HUT_MIN_NODES nodes, so layouts of the
+sizes the export stores (component_layouts.LAYOUT_MAX_NODES) do not change.
+"""
+import numpy as np
+
+# Pairwise repulsion is evaluated in row blocks of at most this many pairs
+PAIR_BLOCK = 4_000_000
+
+METHODS = ('auto', 'exact', 'barnes-hut')
+# 'auto' uses Barnes-Hut above this many nodes
+BARNES_HUT_MIN_NODES = 2000
+# Opening angle: larger is faster and coarser
+BARNES_HUT_THETA = 0.8
+# Octree depth limit (Morton codes use 3 bits per level in an int64)
+MAX_DEPTH = 20
+# Barnes-Hut nodes are processed this many at a time, bounding the pair lists
+NODE_BLOCK = 1024
+
+def _spread_bits(v):
+    """Insert two zero bits between the low 21 bits of every value (for Morton codes)"""
+    v = v.astype(np.int64) & 0x1fffff
+    v = (v | (v << 32)) & 0x1f00000000ffff
+    v = (v | (v << 16)) & 0x1f0000ff0000ff
+    v = (v | (v << 8)) & 0x100f00f00f00f00f
+    v = (v | (v << 4)) & 0x10c30c30c30c30c3
+    v = (v | (v << 2)) & 0x1249249249249249
+    return v
+
+class Octree:
+    """
+    Level-by-level octree of point positions.
+
+    Level d has a sorted array of the Morton keys of its non-empty cells, with
+    each cell's node count, centre of mass and child range on level d + 1;
+    cell[d][i] is the cell of node i on level d.
+    """
+
+    def __init__(self, pos, max_depth=MAX_DEPTH):
+        n = len(pos)
+        lo = pos.min(axis=0)
+        self.size = max(float((pos.max(axis=0) - lo).max()), 1e-9)
+        self.depth = int(min(max_depth, max(1, np.ceil(np.log(max(n, 2)) / np.log(8)) + 2)))
+        grid = (pos - lo) / self.size * ((1 << self.depth) - 1e-6)
+        grid = grid.astype(np.int64)
+        morton = (_spread_bits(grid[:, 0]) << 2) | (_spread_bits(grid[:, 1]) << 1) | _spread_bits(grid[:, 2])
+
+        self.keys, self.cell, self.count, self.com, self.mass_pos = [], [], [], [], []
+        for d in range(self.depth + 1):
+            keys, cell = np.unique(morton >> (3 * (self.depth - d)), return_inverse=True)
+            count = np.bincount(cell, minlength=len(keys))
+            mass_pos = np.stack([np.bincount(cell, weights=pos[:, axis], minlength=len(keys)) for axis in range(3)],
+                                axis=1)
+            self.keys.append(keys)
+            self.cell.append(cell)
+            self.count.append(count)
+            self.mass_pos.append(mass_pos)
+            self.com.append(mass_pos / count[:, None])
+
+        # Nodes of leaf cell c: leaf_order[leaf_start[c]:leaf_start[c + 1]]
+        self.leaf_order = np.argsort(self.cell[-1], kind='stable')
+        self.leaf_start = np.concatenate([[0], np.cumsum(self.count[-1])])
+
+        # Children of cell c on level d: cells child_start[d][c] .. child_end[d][c] of level d + 1
+        self.child_start, self.child_end = [], []
+        for d in range(self.depth):
+            parents = self.keys[d + 1] >> 3
+            self.child_start.append(np.searchsorted(parents, self.keys[d], side='left'))
+            self.child_end.append(np.searchsorted(parents, self.keys[d], side='right'))
+
+    def cell_size(self, d):
+        return self.size / (1 << d)
+
+def _ranges(counts):
+    """Concatenated arange(c) for every c in counts"""
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+def _barnes_hut_repulsion(pos, repulsion, theta=BARNES_HUT_THETA, tree=None):
+    """Approximate sum over j != i of repulsion / (d^2 + 1) along (p_i - p_j) / d"""
+    n = len(pos)
+    tree = tree or Octree(pos)
+    forces = np.zeros((n, 3))
+
+    for block_start in range(0, n, NODE_BLOCK):
+        nodes = np.arange(block_start, min(block_start + NODE_BLOCK, n))
+        cells = np.zeros(len(nodes), dtype=np.int64)
+        block_forces = forces[block_start:block_start + NODE_BLOCK]
+        for d in range(tree.depth + 1):
+            if not len(nodes):
+                break
+            if d == tree.depth:
+                # Leaf level: the nodes of every remaining cell are taken one by one
+                start = tree.leaf_start[cells]
+                fanout = tree.leaf_start[cells + 1] - start
+                nodes = np.repeat(nodes, fanout)
+                others = tree.leaf_order[np.repeat(start, fanout) + _ranges(fanout)]
+                accept = nodes != others
+                mass = 1.0
+                vec = pos[nodes[accept]] - pos[others[accept]]
+                dist2 = np.einsum('ij,ij->i', vec, vec)
+            else:
+                count = tree.count[d][cells]
+                own = tree.cell[d][nodes] == cells
+                vec = pos[nodes] - tree.com[d][cells]
+                dist2 = np.einsum('ij,ij->i', vec, vec)
+                # A cell holding only the node itself exerts nothing; other single-node cells are exact
+                accept = ~own & ((tree.cell_size(d) ** 2 < theta ** 2 * dist2) | (count == 1))
+                expand = ~accept & ~(own & (count == 1))
+                mass = count[accept]
+                vec = vec[accept]
+                dist2 = dist2[accept]
+
+            dist = np.sqrt(dist2)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scale = np.where(dist > 0, mass * repulsion / ((dist2 + 1) * dist), 0.0)
+            body_nodes = nodes[accept] - block_start
+            for axis in range(3):
+                block_forces[:, axis] += np.bincount(body_nodes, weights=vec[:, axis] * scale,
+                                                     minlength=len(block_forces))
+
+            if d == tree.depth:
+                break
+            # Open the remaining cells: one (node, child) pair per child
+            nodes = nodes[expand]
+            start = tree.child_start[d][cells[expand]]
+            fanout = tree.child_end[d][cells[expand]] - start
+            nodes = np.repeat(nodes, fanout)
+            cells = np.repeat(start, fanout) + _ranges(fanout)
+    return forces
+
+def _exact_repulsion(pos, repulsion):
+    """Sum over j != i of repulsion / (d^2 + 1) along (p_i - p_j) / d, all pairs"""
+    n = len(pos)
+    forces = np.zeros((n, 3))
+    block = max(1, PAIR_BLOCK // n)
+    for start in range(0, n, block):
+        vec = pos[start:start + block, None, :] - pos[None, :, :]
+        dist2 = np.einsum('ijk,ijk->ij', vec, vec)
+        dist = np.sqrt(dist2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(dist > 0, repulsion / ((dist2 + 1) * dist), 0.0)
+        forces[start:start + block] += np.einsum('ijk,ij->ik', vec, scale)
+    return forces
+
+def force_layout_3d(num_nodes, edge_src, edge_dst, iterations=50, seed=None, method='auto',
+                    theta=BARNES_HUT_THETA):
+    """
+    Compute 3D positions for a graph given as edge index arrays.
+
+    Parameters:
+    - num_nodes: number of nodes (indices 0..num_nodes-1)
+    - edge_src, edge_dst: edge endpoint indices
+    - iterations: number of force iterations
+    - seed: random seed for the initial positions (None for random)
+    - method: 'exact', 'barnes-hut' or 'auto' (see METHODS)
+    - theta: Barnes-Hut opening angle
+
+    Returns a float64 array of shape (num_nodes, 3).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown layout method {method!r}; expected one of {', '.join(METHODS)}")
+    n = num_nodes
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 3)) * 10 - 5
+    if n <= 1:
+        return pos
+    if method == 'auto':
+        method = 'barnes-hut' if n > BARNES_HUT_MIN_NODES else 'exact'
+
+    edge_src = np.asarray(edge_src, dtype=np.int64)
+    edge_dst = np.asarray(edge_dst, dtype=np.int64)
+
+    # Force parameters (conservative for stability)
+    repulsion = 0.1 / np.sqrt(n / 100) if n > 1200 else 0.1
+    attraction = 0.01 if n <= 1200 else 0.002
+    damping = 0.9 if n <= 1200 else 0.8
+    k = 10.0  # ideal edge length, sqrt(n * 100 / n)
+
+    for _ in range(iterations):
+        # Repulsion between all nodes
+        if method == 'exact':
+            forces = _exact_repulsion(pos, repulsion)
+        else:
+            forces = _barnes_hut_repulsion(pos, repulsion, theta)
+
+        # Attraction along edges
+        if len(edge_src):
+            vec = pos[edge_dst] - pos[edge_src]
+            dist = np.linalg.norm(vec, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scale = np.where(dist > 0, (dist - k) * attraction / dist, 0.0)
+            edge_forces = vec * scale[:, None]
+            np.add.at(forces, edge_src, edge_forces)
+            np.add.at(forces, edge_dst, -edge_forces)
+
+        # Update positions
+        pos += forces * 0.1
+        pos *= damping
+
+    return pos
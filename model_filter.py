@@ -0,0 +1,138 @@
+"""
+Bloom filter over all model ids, for answering lookup misses without a chunk.
+
+A lookup of an unknown model id (a typo, or a model newer than the export)
+used to fetch and decompress a whole lookup chunk just to find it absent.
+model_filter.bin is checked first: if it says no, the model is definitely
+not in the index; if it says yes, the model is present apart from a small
+false-positive rate (1% by default), and the chunk is read as before.
+
+Layout (all integers little-endian):
+
+    header (32 bytes)   magic b'AIEBLOOM', version u32, num_hashes u32,
+                        num_bits u64, num_items u64
+    bits                ceil(num_bits / 8) bytes; bit i is (byte i >> 3) & (1 << (i & 7))
+
+The bits of a model id are (h1 + i * h2) % num_bits for i < num_hashes,
+where h1 and h2 are the first two little-endian u32 words of the SHA-256 of
+its UTF-8 bytes. The Cloudflare worker computes the same bits with
+crypto.subtle.
+
+    python model_filter.py components/model_filter.bin zera09/SmolVLM not-a/model
+"""
+import argparse
+import hashlib
+import math
+import os
+import random
+import struct
+
+import numpy as np
+
+MODEL_FILTER_FILE = 'model_filter.bin'
+
+MAGIC = b'AIEBLOOM'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')
+
+FALSE_POSITIVE_RATE = 0.01
+
+def filter_size(num_items, false_positive_rate=FALSE_POSITIVE_RATE):
+    """Optimal (num_bits, num_hashes) for num_items at a target false-positive rate"""
+    num_items = max(num_items, 1)
+    num_bits = max(8, math.ceil(-num_items * math.log(false_positive_rate) / math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / num_items * math.log(2)))
+    return num_bits, num_hashes
+
+def _hash_pair(model_id):
+    return struct.unpack_from('<II', hashlib.sha256(model_id.encode('utf-8')).digest())
+
+def write_model_filter(model_ids, path, false_positive_rate=FALSE_POSITIVE_RATE):
+    """Write a Bloom filter of model_ids to path; returns the path"""
+    num_bits, num_hashes = filter_size(len(model_ids), false_positive_rate)
+    digests = b''.join(hashlib.sha256(model_id.encode('utf-8')).digest()[:8] for model_id in model_ids)
+    pairs = np.frombuffer(digests, dtype='<u4').reshape(-1, 2).astype(np.uint64)
+    h1, h2 = pairs[:, 0], pairs[:, 1]
+
+    bits = np.zeros(num_bits, dtype=bool)
+    for i in range(num_hashes):
+        bits[(h1 + np.uint64(i) * h2) % np.uint64(num_bits)] = True
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, num_hashes, num_bits, len(model_ids)))
+        f.write(np.packbits(bits, bitorder='little').tobytes())
+    return path
+
+class ModelFilter:
+    """
+    Read-only Bloom filter of model ids.
+
+        model_filter = ModelFilter('components/model_filter.bin')
+        if not model_filter.might_contain(model_id):
+            ...  # definitely not in the index
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.num_hashes, self.num_bits, self.num_items = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} model filter file")
+        self.bits = data[HEADER.size:]
+
+    def might_contain(self, model_id):
+        """False if model_id is definitely not in the index, True if it probably is"""
+        h1, h2 = _hash_pair(model_id)
+        bits = self.bits
+        for i in range(self.num_hashes):
+            bit = (h1 + i * h2) % self.num_bits
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+        return True
+
+    __contains__ = might_contain
+
+    def fill_ratio(self):
+        """Fraction of bits set"""
+        ones = int(np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8)).sum())
+        return ones / self.num_bits
+
+    def expected_false_positive_rate(self):
+        """False-positive rate implied by the bits actually set"""
+        return self.fill_ratio() ** self.num_hashes
+
+def measure_false_positive_rate(model_filter, model_ids, samples=100000, seed=0):
+    """
+    Fraction of absent model ids the filter lets through.
+
+    The absent ids are real ids with one character changed, like the typos
+    that make up most lookup misses.
+    """
+    if not model_ids:
+        return 0.0
+    present = set(model_ids)
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789-_.'
+    tested = false_positives = 0
+    for _ in range(samples):
+        model_id = rng.choice(model_ids)
+        i = rng.randrange(len(model_id))
+        absent = model_id[:i] + rng.choice(alphabet) + model_id[i + 1:]
+        if absent in present:
+            continue
+        tested += 1
+        false_positives += model_filter.might_contain(absent)
+    return false_positives / tested if tested else 0.0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check model ids against a model_filter.bin file')
+    parser.add_argument('path', help='Path to model_filter.bin')
+    parser.add_argument('model_ids', nargs='*', help='Model ids to check')
+    args = parser.parse_args()
+
+    model_filter = ModelFilter(args.path)
+    print(f"{args.path}: {model_filter.num_items:,} models, {model_filter.num_bits:,} bits, "
+          f"{model_filter.num_hashes} hashes, {os.path.getsize(args.path) / (1024 * 1024):.2f} MB")
+    print(f"  Expected false-positive rate: {model_filter.expected_false_positive_rate():.4%}")
+    for model_id in args.model_ids:
+        print(f"  {model_id}: {'maybe present' if model_filter.might_contain(model_id) else 'absent'}")
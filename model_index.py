@@ -0,0 +1,251 @@
+"""
+Memory-mappable binary lookup file: model_id -> component_id.
+
+compact_index.json.gz has to be decompressed and parsed in full before the
+first lookup. model_index.bin is read in place through mmap instead, so a
+lookup process starts instantly, touches only a few pages per lookup and
+shares those pages with every other process reading the same file.
+
+Layout (all integers little-endian):
+
+    header (64 bytes)
+        magic b'AIEMIDX1', version u32, block_size u32, num_entries u64,
+        num_blocks u64, id_width u8 (+7 pad), dir_offset u64,
+        ids_offset u64, keys_offset u64
+    block directory     u64 * (num_blocks + 1), byte offset of each block
+                        in the key data (the last one is its end)
+    component ids       num_entries packed unsigned ints of id_width bytes
+                        (1, 2, 4 or 8, the smallest that fits), in key order
+    key data            model ids (UTF-8) sorted bytewise, in blocks of
+                        block_size keys; the first key of a block is stored
+                        whole (varint length + bytes), the others
+                        front-coded as varint shared-prefix length, varint
+                        suffix length, suffix bytes
+
+A lookup binary-searches the blocks by their first key and scans one block.
+
+    python model_index.py components/model_index.bin zera09/SmolVLM
+    python model_index.py components/model_index.bin --benchmark 100000
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+
+MODEL_INDEX_FILE = 'model_index.bin'
+
+MAGIC = b'AIEMIDX1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQB7xQQQ')
+
+# Keys per front-coded block: larger blocks compress better, smaller ones scan faster
+BLOCK_SIZE = 32
+
+ID_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _read_varint(buffer, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _id_width(max_id):
+    for width in (1, 2, 4, 8):
+        if max_id < 1 << (8 * width):
+            return width
+    raise ValueError(f"Component id {max_id} does not fit in 8 bytes")
+
+def write_model_index(model_ids, component_ids, path, block_size=BLOCK_SIZE):
+    """
+    Write a model index file.
+
+    model_ids must be sorted (Python's string order equals the bytewise
+    UTF-8 order the reader searches in); component_ids are aligned with them.
+    """
+    keys = [model_id.encode('utf-8') for model_id in model_ids]
+    for i in range(1, len(keys)):
+        if keys[i - 1] >= keys[i]:
+            raise ValueError(f"Model ids must be sorted and unique: {model_ids[i - 1]!r} >= {model_ids[i]!r}")
+    if component_ids and min(component_ids) < 0:
+        raise ValueError("Component ids must be non-negative")
+
+    id_width = _id_width(max(component_ids, default=0))
+    num_blocks = (len(keys) + block_size - 1) // block_size
+
+    key_data = bytearray()
+    block_offsets = []
+    previous = b''
+    for i, key in enumerate(keys):
+        if i % block_size == 0:
+            block_offsets.append(len(key_data))
+            key_data += _varint(len(key))
+            key_data += key
+        else:
+            shared = 0
+            limit = min(len(previous), len(key))
+            while shared < limit and previous[shared] == key[shared]:
+                shared += 1
+            key_data += _varint(shared)
+            key_data += _varint(len(key) - shared)
+            key_data += key[shared:]
+        previous = key
+    block_offsets.append(len(key_data))
+
+    dir_offset = HEADER.size
+    ids_offset = dir_offset + 8 * len(block_offsets)
+    ids_size = id_width * len(keys)
+    # Keep the key data 8-byte aligned
+    keys_offset = ids_offset + ids_size + (-ids_size % 8)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, block_size, len(keys), num_blocks, id_width,
+                            dir_offset, ids_offset, keys_offset))
+        f.write(struct.pack(f'<{len(block_offsets)}Q', *block_offsets))
+        f.write(struct.pack(f'<{len(keys)}{ID_FORMATS[id_width]}', *component_ids))
+        f.write(b'\0' * (keys_offset - ids_offset - ids_size))
+        f.write(key_data)
+    return path
+
+class ModelIndex:
+    """
+    Read-only, memory-mapped model index.
+
+        with ModelIndex('components/model_index.bin') as index:
+            component_id = index.get('zera09/SmolVLM')
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.block_size, self.num_entries, self.num_blocks, id_width,
+         self._dir_offset, self._ids_offset, self._keys_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} model index file")
+        self._id = struct.Struct(f'<{ID_FORMATS[id_width]}')
+        self._id_width = id_width
+        self._offset = struct.Struct('<Q')
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.num_entries
+
+    def _block_start(self, block):
+        return self._keys_offset + self._offset.unpack_from(self._mm, self._dir_offset + 8 * block)[0]
+
+    def _first_key(self, block):
+        length, pos = _read_varint(self._mm, self._block_start(block))
+        return self._mm[pos:pos + length]
+
+    def _find(self, key):
+        """Entry number of key, or -1"""
+        if self.num_blocks == 0:
+            return -1
+        # Last block whose first key is <= key
+        low, high = 0, self.num_blocks - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._first_key(mid) <= key:
+                low = mid
+            else:
+                high = mid - 1
+
+        mm = self._mm
+        pos = self._block_start(low)
+        length, pos = _read_varint(mm, pos)
+        current = mm[pos:pos + length]
+        pos += length
+        entry = low * self.block_size
+        end = min(entry + self.block_size, self.num_entries)
+        while True:
+            if current == key:
+                return entry
+            if current > key:
+                return -1
+            entry += 1
+            if entry == end:
+                return -1
+            shared, pos = _read_varint(mm, pos)
+            length, pos = _read_varint(mm, pos)
+            current = current[:shared] + mm[pos:pos + length]
+            pos += length
+
+    def get(self, model_id, default=None):
+        """Component id of a model, or default if it is not in the index"""
+        entry = self._find(model_id.encode('utf-8'))
+        if entry < 0:
+            return default
+        return self._id.unpack_from(self._mm, self._ids_offset + self._id_width * entry)[0]
+
+    def __getitem__(self, model_id):
+        component_id = self.get(model_id)
+        if component_id is None:
+            raise KeyError(model_id)
+        return component_id
+
+    def __contains__(self, model_id):
+        return self._find(model_id.encode('utf-8')) >= 0
+
+    def model_ids(self):
+        """Iterate over all model ids in sorted order"""
+        mm = self._mm
+        for block in range(self.num_blocks):
+            pos = self._block_start(block)
+            count = min(self.block_size, self.num_entries - block * self.block_size)
+            length, pos = _read_varint(mm, pos)
+            current = mm[pos:pos + length]
+            pos += length
+            yield current.decode('utf-8')
+            for _ in range(count - 1):
+                shared, pos = _read_varint(mm, pos)
+                length, pos = _read_varint(mm, pos)
+                current = current[:shared] + mm[pos:pos + length]
+                pos += length
+                yield current.decode('utf-8')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Look up models in a model_index.bin file')
+    parser.add_argument('path', help='Path to model_index.bin')
+    parser.add_argument('model_ids', nargs='*', help='Model ids to look up')
+    parser.add_argument('--benchmark', type=int, default=0, help='Time this many random lookups')
+    args = parser.parse_args()
+
+    with ModelIndex(args.path) as index:
+        print(f"{args.path}: {len(index):,} models, {index.num_blocks:,} blocks of {index.block_size}, "
+              f"{os.path.getsize(args.path) / (1024 * 1024):.2f} MB")
+        for model_id in args.model_ids:
+            print(f"  {model_id}: {index.get(model_id)}")
+
+        if args.benchmark:
+            sample = random.sample(list(index.model_ids()), min(args.benchmark, len(index)))
+            start = time.perf_counter()
+            for model_id in sample:
+                index.get(model_id)
+            elapsed = time.perf_counter() - start
+            print(f"  {len(sample):,} lookups: {elapsed / len(sample) * 1e6:.1f} µs per lookup")
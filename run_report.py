@@ -0,0 +1,189 @@
+"""
+Stage-level timing, memory and throughput report for the export pipeline.
+
+Stages are timed with RunReport.stage() (or timed(), which accepts
+report=None). Each stage accumulates wall and CPU time, call and item counts,
+and bytes in/out. Worker processes keep their own report and hand back its
+stages, which the parent merges with merge().
+
+    {
+      "total_wall_s": 84.2, "total_cpu_s": 80.1,
+      "peak_rss_mb": 5120.4, "peak_rss_children_mb": 2210.7,
+      "info": {"engine": "arrays", "workers": 4, ...},
+      "stages": {
+        "encode": {"wall_s": 12.3, "cpu_s": 12.1, "calls": 412345, "items": 412345,
+                   "bytes_in": 0, "bytes_out": 1834567890, "items_per_s": 33524.0,
+                   "mb_out_per_s": 142.2, "process_peak_rss_mb": 4980.2},
+        ...
+      }
+    }
+
+Times of stages that ran in worker processes are summed over the workers,
+so they can add up to more than total_wall_s.
+
+Memory figures:
+
+- process_peak_rss_mb (per stage) is the process's RSS high-water mark
+  (ru_maxrss) at the end of the stage, not the stage's own usage. It never
+  goes down, so every stage after the peak repeats it; the first stage that
+  reaches the run's peak_rss_mb is the one that raised it. For the memory a
+  stage itself allocated, use --trace-memory (traced_peak_mb, the
+  tracemalloc peak within the stage)
+- peak_rss_children_mb is the largest worker peak: RUSAGE_CHILDREN only
+  counts children that have exited and been waited for, so it is combined
+  with the peaks the workers report through merge() while their pool is
+  still alive
+"""
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def peak_rss_mb(who='self'):
+    """Peak resident set size of this process ('self') or its finished children, in MB"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+def _empty_stage():
+    return {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0, 'items': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+class RunReport:
+    """Accumulate per-stage wall/CPU time, counters and memory for one run"""
+
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.info = {}
+        self.trace_memory = trace_memory
+        # Largest process peak reported by merged worker stages
+        self.worker_peak_rss_mb = None
+        self._depth = 0
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def record(self, name, wall_s, cpu_s, calls=1, items=0, bytes_in=0, bytes_out=0):
+        """Add one measurement to a stage"""
+        stage = self.stages.setdefault(name, _empty_stage())
+        stage['wall_s'] += wall_s
+        stage['cpu_s'] += cpu_s
+        stage['calls'] += calls
+        stage['items'] += items
+        stage['bytes_in'] += bytes_in
+        stage['bytes_out'] += bytes_out
+        return stage
+
+    @contextmanager
+    def stage(self, name, items=0, bytes_in=0, bytes_out=0):
+        """
+        Time a block as (part of) a stage.
+
+        Yields a counters dict; set 'items', 'bytes_in' or 'bytes_out' on it
+        inside the block if they are only known there.
+        """
+        counters = {'items': items, 'bytes_in': bytes_in, 'bytes_out': bytes_out}
+        top_level = self._depth == 0
+        if self.trace_memory and top_level:
+            tracemalloc.reset_peak()
+        self._depth += 1
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield counters
+        finally:
+            wall_s = time.perf_counter() - start_wall
+            cpu_s = time.process_time() - start_cpu
+            self._depth -= 1
+            stage = self.record(name, wall_s, cpu_s, 1, counters['items'], counters['bytes_in'],
+                                counters['bytes_out'])
+            # Per-component stages run thousands of times; sample memory only for top-level stages
+            if top_level:
+                stage['process_peak_rss_mb'] = peak_rss_mb()
+                if self.trace_memory:
+                    traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                    stage['traced_peak_mb'] = round(max(stage.get('traced_peak_mb', 0), traced_peak), 1)
+
+    def merge(self, stages):
+        """Add the stages of another report (e.g. from a worker process)"""
+        for name, other in stages.items():
+            stage = self.record(name, other['wall_s'], other['cpu_s'], other['calls'], other['items'],
+                                other['bytes_in'], other['bytes_out'])
+            for key in ('process_peak_rss_mb', 'traced_peak_mb'):
+                if other.get(key) is not None:
+                    stage[key] = max(stage.get(key) or 0, other[key])
+            if other.get('process_peak_rss_mb') is not None:
+                self.worker_peak_rss_mb = max(self.worker_peak_rss_mb or 0, other['process_peak_rss_mb'])
+
+    def _children_peak_rss_mb(self):
+        reaped = peak_rss_mb('children')
+        if reaped is None:
+            return self.worker_peak_rss_mb
+        return max(reaped, self.worker_peak_rss_mb or 0)
+
+    def to_dict(self):
+        """The run report as a JSON-serializable dict"""
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            wall_s = stage['wall_s']
+            stage['wall_s'] = round(wall_s, 4)
+            stage['cpu_s'] = round(stage['cpu_s'], 4)
+            if wall_s > 0:
+                if stage['items']:
+                    stage['items_per_s'] = round(stage['items'] / wall_s, 1)
+                if stage['bytes_in']:
+                    stage['mb_in_per_s'] = round(stage['bytes_in'] / (1024 * 1024) / wall_s, 1)
+                if stage['bytes_out']:
+                    stage['mb_out_per_s'] = round(stage['bytes_out'] / (1024 * 1024) / wall_s, 1)
+            stages[name] = stage
+
+        report = {
+            'total_wall_s': round(time.perf_counter() - self._start_wall, 4),
+            'total_cpu_s': round(time.process_time() - self._start_cpu, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_rss_children_mb': self._children_peak_rss_mb(),
+            'info': self.info,
+            'stages': stages
+        }
+        if self.trace_memory:
+            report['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        return report
+
+    def save(self, path):
+        """Write the run report as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    def print_summary(self):
+        report = self.to_dict()
+        print(f"\nStage timings (total {report['total_wall_s']:.2f}s wall, {report['total_cpu_s']:.2f}s CPU):")
+        print(f"  {'stage':<14}{'wall s':>10}{'cpu s':>10}{'calls':>10}{'items/s':>12}{'MB out':>10}{'MB/s':>9}")
+        for name, stage in report['stages'].items():
+            items_per_s = stage.get('items_per_s', '')
+            mb_out = stage['bytes_out'] / (1024 * 1024)
+            print(f"  {name:<14}{stage['wall_s']:>10.2f}{stage['cpu_s']:>10.2f}{stage['calls']:>10}"
+                  f"{items_per_s:>12}{mb_out:>10.2f}{stage.get('mb_out_per_s', ''):>9}")
+        if report['peak_rss_mb'] is not None:
+            print(f"  Peak RSS: {report['peak_rss_mb']:.1f} MB (workers: {report['peak_rss_children_mb']:.1f} MB)")
+        if 'traced_peak_mb' in report:
+            print(f"  Peak traced Python memory: {report['traced_peak_mb']:.1f} MB")
+
+@contextmanager
+def timed(report, name, items=0, bytes_in=0, bytes_out=0):
+    """RunReport.stage() that does nothing when report is None"""
+    if report is None:
+        yield {'items': items, 'bytes_in': bytes_in, 'bytes_out': bytes_out}
+        return
+    with report.stage(name, items, bytes_in, bytes_out) as counters:
+        yield counters
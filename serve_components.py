@@ -0,0 +1,439 @@
+"""
+Local asyncio server for the component files and the lookup API.
+
+Serves the Cloudflare worker's routes from a local components/ directory, so
+the front end can be self-hosted and tested offline:
+
+    /lookup?model_id=org/model          {"component_id": 17} (404 if unknown)
+    /lookup?model_id=a,b,c              {"results": {"a": 17, "b": null, "c": 4}, ...}
+    /search?q=llama&limit=10            completions (if the autocomplete index is built; limit <= 100)
+    /component_17.json.gz               one component, from its file or its shard (with Range support)
+    /                                   component_index.json.gz
+    /compact_index.json.gz, /chunks/... any other file in the directory (with Range support)
+    /stats                              chunk cache hit rate, lookup and per-route latency counters
+
+Parsed lookup chunks are kept in an LRU cache bounded by their decompressed
+size. A batched lookup groups its ids by chunk, so every chunk it needs is
+loaded or touched once. Chunk loads and file reads run in threads, and
+concurrent requests for a chunk that is being loaded wait for the same load.
+If components/model_filter.bin exists, definite misses skip the chunk.
+
+    python serve_components.py --components-dir components --port 8787 --cache-mb 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from http import HTTPStatus
+
+import autocomplete
+import build_indexes
+import component_shards
+import compression
+import model_filter
+
+CACHE_BYTES = 256 * 1024 * 1024
+# Latencies kept per route for the percentiles in /stats
+LATENCY_SAMPLES = 1000
+MAX_BATCH = 1000
+MAX_SEARCH_LIMIT = 100
+
+COMPONENT_ROUTE = re.compile(r'^/component_(\d+)\.json\.(gz|zst|br)$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, HEAD, OPTIONS',
+    'Access-Control-Allow-Headers': '*',
+    'Access-Control-Max-Age': '86400',
+}
+CONTENT_TYPES = {'.gz': 'application/gzip', '.json': 'application/json', '.html': 'text/html; charset=utf-8'}
+
+class ChunkCache:
+    """LRU cache of parsed lookup chunks, bounded by their decompressed JSON size"""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size):
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        # A single chunk larger than the cache is still kept until the next one arrives
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'mb': round(self.bytes / (1024 * 1024), 2),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / requests, 4) if requests else None
+        }
+
+class RouteStats:
+    """Request count, errors and latency of one route"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.recent = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, seconds, error=False):
+        self.count += 1
+        self.errors += error
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+        self.recent.append(seconds)
+
+    def to_dict(self):
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 3) if recent else None
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': round(self.total_s / self.count * 1000, 3) if self.count else None,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(self.max_s * 1000, 3)
+        }
+
+class ComponentServer:
+    """Request handling for serve(); one instance per components directory"""
+
+    def __init__(self, base='components', cache_bytes=CACHE_BYTES):
+        self.base = base
+        self.root = os.path.realpath(base)
+        self.cache = ChunkCache(cache_bytes)
+        self.routes = {}
+        self.lookups = {'models': 0, 'found': 0, 'filtered': 0}
+        self.started = time.time()
+        self._loading = {}
+        self._autocomplete = None
+
+        chunks_index_file = os.path.join(base, build_indexes.CHUNKS_INDEX_FILE)
+        self.chunks_index = compression.read_json(chunks_index_file) if os.path.exists(chunks_index_file) else None
+        self.chunk_dictionary = None
+        if self.chunks_index and (self.chunks_index.get('compression') or {}).get('dictionary'):
+            self.chunk_dictionary = compression.load_dictionary(
+                os.path.join(base, build_indexes.CHUNKS_DIR, build_indexes.CHUNK_DICTIONARY_FILE))
+
+        filter_file = os.path.join(base, model_filter.MODEL_FILTER_FILE)
+        self.filter = model_filter.ModelFilter(filter_file) if os.path.exists(filter_file) else None
+        self.shard_directory = component_shards.load_shard_directory(base)
+
+    # Lookups
+
+    def _read_chunk(self, chunk_file):
+        """(model id -> component id, decompressed size) of a chunk; runs in a thread"""
+        path = os.path.join(self.base, chunk_file)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Prefix chunking has no file for prefixes without models
+            return {}, 0
+        payload = compression.decompress(data, compression.codec_from_path(path), self.chunk_dictionary)
+        return json.loads(payload)['index'], len(payload)
+
+    async def _chunk(self, chunk_file):
+        index = self.cache.get(chunk_file)
+        if index is not None:
+            return index
+        future = self._loading.get(chunk_file)
+        if future is not None:
+            index, _ = await future
+            return index
+
+        future = asyncio.get_running_loop().run_in_executor(None, self._read_chunk, chunk_file)
+        self._loading[chunk_file] = future
+        try:
+            index, size = await future
+        finally:
+            del self._loading[chunk_file]
+        self.cache.put(chunk_file, index, size)
+        return index
+
+    async def lookup(self, model_ids):
+        """{model_id: component_id, or None if unknown}; each chunk needed is loaded once"""
+        if self.chunks_index is None:
+            raise FileNotFoundError(f"{build_indexes.CHUNKS_INDEX_FILE} not found in {self.base} "
+                                    "(run build_indexes.py --outputs chunked)")
+        results = {}
+        by_chunk = {}
+        for model_id in model_ids:
+            self.lookups['models'] += 1
+            if self.filter is not None and not self.filter.might_contain(model_id):
+                self.lookups['filtered'] += 1
+                results[model_id] = None
+                continue
+            chunk_file = build_indexes.find_chunk(self.chunks_index, model_id)
+            if chunk_file is None:
+                results[model_id] = None
+            else:
+                by_chunk.setdefault(chunk_file, []).append(model_id)
+
+        chunks = await asyncio.gather(*(self._chunk(chunk_file) for chunk_file in by_chunk))
+        for ids, index in zip(by_chunk.values(), chunks):
+            for model_id in ids:
+                results[model_id] = index.get(model_id)
+        self.lookups['found'] += sum(component_id is not None for component_id in results.values())
+        return results
+
+    # Files
+
+    def _read_file(self, path, start=None, end=None):
+        with open(path, 'rb') as f:
+            if start is None:
+                return f.read()
+            f.seek(start)
+            return f.read(end - start)
+
+    def _read_component(self, component_id, codec):
+        """Compressed payload of a component from its own file or its shard member, or None"""
+        path = os.path.join(self.base, compression.compressed_path(f'component_{component_id}.json', codec))
+        if os.path.exists(path):
+            return self._read_file(path)
+        directory = self.shard_directory
+        if directory is None or directory.get('compression', 'gzip') != codec:
+            return None
+        entry = directory['components'].get(str(component_id))
+        if entry is None:
+            return None
+        shard, offset, length = entry
+        # Every member is a standalone gzip member / zstd / brotli frame, i.e. a complete file
+        shard_file = os.path.join(self.base, component_shards.SHARDS_DIR, directory['shards'][shard])
+        return self._read_file(shard_file, offset, offset + length)
+
+    def _static_path(self, path):
+        """Local file for a URL path, or None (never outside the components directory)"""
+        relative = path.lstrip('/') or build_indexes.INDEX_FILE
+        full = os.path.realpath(os.path.join(self.root, relative))
+        if not full.startswith(self.root + os.sep) or not os.path.isfile(full):
+            return None
+        return full
+
+    # HTTP
+
+    def _json(self, status, data, cache_seconds=None):
+        headers = dict(CORS_HEADERS, **{'Content-Type': 'application/json'})
+        if cache_seconds:
+            headers['Cache-Control'] = f'public, max-age={cache_seconds}'
+        return status, headers, json.dumps(data).encode('utf-8')
+
+    def _file(self, name, data, headers=None):
+        extension = os.path.splitext(name)[1]
+        return 200, dict(CORS_HEADERS, **{
+            'Content-Type': CONTENT_TYPES.get(extension, 'application/octet-stream'),
+            'Cache-Control': 'public, max-age=3600',
+            'Accept-Ranges': 'bytes'
+        }, **(headers or {})), data
+
+    def _byte_range(self, headers, size):
+        """(start, end) of a single-range Range header, or None without one; start >= end if unsatisfiable"""
+        range_match = RANGE_HEADER.match(headers.get('range', ''))
+        if not range_match or not any(range_match.groups()):
+            return None
+        first, last = range_match.groups()
+        if first:
+            return int(first), min(int(last) + 1, size) if last else size
+        return max(0, size - int(last)), size
+
+    def _partial(self, name, byte_range, size, data):
+        """206 response for data, the byte_range of a size-byte file (416 if the range is unsatisfiable)"""
+        start, end = byte_range
+        if start >= end:
+            return 416, dict(CORS_HEADERS, **{'Content-Range': f'bytes */{size}'}), b''
+        status, headers, body = self._file(name, data, {'Content-Range': f'bytes {start}-{end - 1}/{size}'})
+        return 206, headers, body
+
+    async def _handle_lookup(self, params):
+        model_ids = [model_id for value in params.get('model_id', []) for model_id in value.split(',') if model_id]
+        if not model_ids:
+            return 'lookup', self._json(400, {'error': 'model_id parameter required'})
+        if len(model_ids) > MAX_BATCH:
+            return 'lookup_batch', self._json(400, {'error': f'At most {MAX_BATCH} model ids per request'})
+
+        results = await self.lookup(model_ids)
+        if len(model_ids) == 1:
+            component_id = results[model_ids[0]]
+            if component_id is None:
+                return 'lookup', self._json(404, {'error': 'Model not found', 'component_id': None})
+            return 'lookup', self._json(200, {'component_id': component_id}, 3600)
+        found = sum(component_id is not None for component_id in results.values())
+        return 'lookup_batch', self._json(200, {'results': results, 'found': found,
+                                                'missing': len(results) - found}, 3600)
+
+    async def _handle_search(self, params):
+        query = params.get('q', [''])[0]
+        limit = params.get('limit', ['10'])[0]
+        if not (limit.isascii() and limit.isdigit()) or int(limit) < 1:
+            return self._json(400, {'matches': [], 'error': 'limit must be a positive integer'})
+        limit = min(int(limit), MAX_SEARCH_LIMIT)
+
+        # Reading the root and shards blocks, so it runs in a thread like chunk loads
+        loop = asyncio.get_running_loop()
+        if self._autocomplete is None:
+            if not os.path.isdir(os.path.join(self.base, autocomplete.AUTOCOMPLETE_DIR)):
+                return self._json(404, {'matches': [], 'error': 'Autocomplete index not found '
+                                                                '(run build_indexes.py --outputs autocomplete)'})
+            self._autocomplete = await loop.run_in_executor(None, autocomplete.Autocomplete, self.base)
+        completions = await loop.run_in_executor(None, self._autocomplete.complete, query, limit)
+        return self._json(200, {'matches': [completion['id'] for completion in completions],
+                                'completions': completions}, 300)
+
+    async def _handle_file(self, path, headers):
+        loop = asyncio.get_running_loop()
+        match = COMPONENT_ROUTE.match(path)
+        if match:
+            codec = compression.codec_from_path(path)
+            data = await loop.run_in_executor(None, self._read_component, int(match.group(1)), codec)
+            if data is None:
+                return 'component', (404, dict(CORS_HEADERS), f'File not found: {path}'.encode('utf-8'))
+            byte_range = self._byte_range(headers, len(data))
+            if byte_range is None:
+                return 'component', self._file(path, data)
+            return 'component', self._partial(path, byte_range, len(data), data[slice(*byte_range)])
+
+        full = self._static_path(path)
+        if full is None:
+            return 'file', (404, dict(CORS_HEADERS), f'File not found: {path}'.encode('utf-8'))
+        # Single byte ranges, for range reads of shard members
+        size = os.path.getsize(full)
+        byte_range = self._byte_range(headers, size)
+        if byte_range is not None:
+            data = b''
+            if byte_range[0] < byte_range[1]:
+                data = await loop.run_in_executor(None, self._read_file, full, *byte_range)
+            return 'file', self._partial(full, byte_range, size, data)
+        data = await loop.run_in_executor(None, self._read_file, full)
+        return 'file', self._file(full, data)
+
+    def stats(self):
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'chunk_cache': self.cache.stats(),
+            'lookups': dict(self.lookups),
+            'routes': {name: route.to_dict() for name, route in sorted(self.routes.items())}
+        }
+
+    async def respond(self, method, target, headers):
+        """(status, headers, body) for one request"""
+        start = time.perf_counter()
+        url = urllib.parse.urlsplit(target)
+        path = urllib.parse.unquote(url.path)
+        params = urllib.parse.parse_qs(url.query)
+        route = 'other'
+        try:
+            if method == 'OPTIONS':
+                route, response = 'options', (204, dict(PREFLIGHT_HEADERS), b'')
+            elif method not in ('GET', 'HEAD'):
+                response = (405, dict(CORS_HEADERS, Allow='GET, HEAD, OPTIONS'), b'')
+            elif path == '/lookup':
+                route, response = await self._handle_lookup(params)
+            elif path == '/search':
+                route, response = 'search', await self._handle_search(params)
+            elif path == '/stats':
+                route, response = 'stats', self._json(200, self.stats())
+            else:
+                route, response = await self._handle_file(path, headers)
+        except Exception as e:
+            response = self._json(500, {'error': str(e)})
+        self.routes.setdefault(route, RouteStats()).record(time.perf_counter() - start, response[0] >= 500)
+        return response
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive, no request bodies)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                status, response_headers, body = await self.respond(method, target, headers)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response_headers['Content-Length'] = str(len(body))
+                response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+                head = f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n' + ''.join(
+                    f'{name}: {value}\r\n' for name, value in response_headers.items()) + '\r\n'
+                writer.write(head.encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Dropped connections, truncated or oversized requests
+            pass
+        finally:
+            writer.close()
+
+async def serve(base='components', host='127.0.0.1', port=8787, cache_bytes=CACHE_BYTES):
+    component_server = ComponentServer(base, cache_bytes)
+    server = await asyncio.start_server(component_server.handle, host, port)
+    print(f"Serving {base} on http://{host}:{port} (chunk cache {cache_bytes / (1024 * 1024):.0f} MB)")
+    if component_server.chunks_index is None:
+        print(f"  Warning: no {build_indexes.CHUNKS_INDEX_FILE}, /lookup is unavailable")
+    if component_server.filter is not None:
+        print(f"  Model filter: {component_server.filter.num_items:,} models")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve component files and the lookup API locally')
+    parser.add_argument('--components-dir', default='components', help='Components directory')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8787, help='Port to listen on')
+    parser.add_argument('--cache-mb', type=int, default=CACHE_BYTES // (1024 * 1024),
+                        help='Size limit of the parsed chunk cache (decompressed MB)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.components_dir, args.host, args.port, args.cache_mb * 1024 * 1024))
+    except KeyboardInterrupt:
+        pass
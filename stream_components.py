@@ -0,0 +1,307 @@
+"""
+Out-of-core component export from flat node / edge files.
+
+export_components.py needs the whole pickled networkx graph in memory. This
+path streams the graph from two flat files instead:
+
+    nodes.jsonl   one JSON object per line: {"id": "org/model", "likes": 3, ...}
+    edges.tsv     one edge per line: source<TAB>target<TAB>type
+
+Edges are undirected, as in the networkx graph: repeated and reversed
+duplicates collapse into one edge (with the type of the last one), and edges
+naming an id missing from nodes.jsonl are skipped and counted.
+
+Components are found with the array union-find from graph_arrays.py on int32
+edge arrays, node records are spilled to bucket files on disk (grouped by
+component) and every bucket is exported on its own, so peak memory is the
+id -> index map plus a few integer arrays, not networkx object overhead.
+
+Output matches export_components.py: component_N.json.gz files (same schema,
+numbered in the order components first appear in nodes.jsonl) and
+component_index.json.gz, which is written as a stream.
+
+    # One-off conversion of the pickle (or produce the flat files upstream)
+    python stream_components.py --from-pickle data/ai_ecosystem_graph_nomerges.pkl --flat-dir data/flat
+    python stream_components.py --flat-dir data/flat --output-dir components
+"""
+import argparse
+import gzip
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+
+from graph_arrays import connected_component_labels
+from component_catalog import catalog_row, write_catalog
+from export_components import DEFAULT_ATTRIBUTES, write_component
+
+NODES_FILE = 'nodes.jsonl'
+EDGES_FILE = 'edges.tsv'
+
+# Node records are spilled to this many bucket files (by component label)
+NUM_BUCKETS = 64
+# Edges are read in blocks of this many lines
+EDGE_BLOCK = 1_000_000
+
+def write_flat_graph(G, flat_dir, include_attributes=DEFAULT_ATTRIBUTES):
+    """Write a networkx graph as nodes.jsonl + edges.tsv for the streaming export"""
+    os.makedirs(flat_dir, exist_ok=True)
+    keep = set(include_attributes) | {'downloads', 'likes'}
+
+    with open(os.path.join(flat_dir, NODES_FILE), 'w', encoding='utf-8') as f:
+        for node_id, attrs in G.nodes(data=True):
+            record = {'id': node_id}
+            record.update((key, value) for key, value in attrs.items() if key in keep)
+            f.write(json.dumps(record, default=str) + '\n')
+
+    with open(os.path.join(flat_dir, EDGES_FILE), 'w', encoding='utf-8') as f:
+        for source, target, attrs in G.edges(data=True):
+            if 'edge_type' in attrs:
+                edge_type = attrs['edge_type']
+            elif 'edge_types' in attrs:
+                edge_type = attrs['edge_types'][0] if attrs['edge_types'] else 'unknown'
+            else:
+                edge_type = 'unknown'
+            f.write(f'{source}\t{target}\t{edge_type}\n')
+
+    print(f"✓ Flat graph written to {flat_dir}/ ({len(G.nodes())} nodes, {len(G.edges())} edges)")
+
+def _node_record(record, include_attributes):
+    """Build a component node entry the same way export_components.build_component_json does"""
+    node_id = record['id']
+    node_data = {
+        'id': node_id,
+        'name': node_id.split('/')[-1] if '/' in node_id else node_id
+    }
+    for attr in include_attributes:
+        if attr in record:
+            value = record[attr]
+            if hasattr(value, '__iter__') and not isinstance(value, str):
+                # Skip non-serializable types
+                continue
+            node_data[attr] = None if value is None or value != value else value
+
+    node_data['size'] = 1.0
+    node_data['downloads'] = record.get('downloads', 0)
+    node_data['likes'] = record.get('likes', 0)
+    return node_data
+
+def _read_edges(edges_file, position):
+    """
+    Stream edges.tsv into int32 endpoint arrays and dictionary-coded types.
+
+    Edges with an endpoint missing from nodes.jsonl are skipped; returns
+    (src, dst, types, type_names, skipped).
+    """
+    src_blocks, dst_blocks, type_blocks = [], [], []
+    type_names = []
+    type_lookup = {}
+    src, dst, types = [], [], []
+    skipped = 0
+
+    def flush():
+        src_blocks.append(np.asarray(src, dtype=np.int32))
+        dst_blocks.append(np.asarray(dst, dtype=np.int32))
+        type_blocks.append(np.asarray(types, dtype=np.int32))
+        src.clear()
+        dst.clear()
+        types.clear()
+
+    with open(edges_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            source, target, edge_type = line.rstrip('\n').split('\t')
+            u = position.get(source)
+            v = position.get(target)
+            if u is None or v is None:
+                if not skipped:
+                    missing = source if u is None else target
+                    print(f"  Warning: skipping edges with endpoints not in {NODES_FILE} (first: {missing!r})")
+                skipped += 1
+                continue
+            code = type_lookup.get(edge_type)
+            if code is None:
+                code = type_lookup[edge_type] = len(type_names)
+                type_names.append(edge_type)
+            src.append(u)
+            dst.append(v)
+            types.append(code)
+            if len(src) >= EDGE_BLOCK:
+                flush()
+    flush()
+
+    return np.concatenate(src_blocks), np.concatenate(dst_blocks), np.concatenate(type_blocks), type_names, skipped
+
+def _dedupe_edges(num_nodes, low, high, types):
+    """
+    Collapse repeated undirected edges the way networkx.Graph does.
+
+    An edge keeps the position of its first occurrence and the type of its
+    last one (add_edge() on an existing edge updates its attributes).
+    Returns the deduplicated (low, high, types).
+    """
+    keys = low.astype(np.int64) * num_nodes + high
+    _, first = np.unique(keys, return_index=True)
+    if len(first) == len(keys):
+        return low, high, types
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+    first_order = np.argsort(first, kind='stable')
+    first = first[first_order]
+    last = last[first_order]
+    return low[first], high[first], types[last]
+
+def export_components_streaming(flat_dir, output_dir='components', include_attributes=DEFAULT_ATTRIBUTES,
+                                num_buckets=NUM_BUCKETS, work_dir=None):
+    """
+    Export components from nodes.jsonl / edges.tsv in bounded memory.
+
+    Parameters:
+    - flat_dir: directory with nodes.jsonl and edges.tsv
+    - output_dir: directory to save component files
+    - include_attributes: list of node attributes to include
+    - num_buckets: number of on-disk buckets node records are spilled to
+    - work_dir: directory for temporary bucket files (default: system temp)
+    """
+    nodes_file = os.path.join(flat_dir, NODES_FILE)
+    edges_file = os.path.join(flat_dir, EDGES_FILE)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Pass 1: node ids -> integer index (file order)
+    print("Reading node ids...")
+    position = {}
+    with open(nodes_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            position[json.loads(line)['id']] = len(position)
+    num_nodes = len(position)
+
+    # Pass 2: edges as integer arrays
+    print("Reading edges...")
+    src, dst, types, type_names, skipped = _read_edges(edges_file, position)
+    del position
+    if skipped:
+        print(f"  Skipped {skipped:,} edges with an endpoint missing from {NODES_FILE}")
+
+    # Orient every edge from the endpoint that comes first in nodes.jsonl and
+    # drop repeated / reversed duplicates, as the networkx graph would
+    low = np.minimum(src, dst)
+    high = np.maximum(src, dst)
+    del src, dst
+    read_edges = len(low)
+    low, high, types = _dedupe_edges(num_nodes, low, high, types)
+    num_edges = len(low)
+    if num_edges < read_edges:
+        print(f"  Collapsed {read_edges - num_edges:,} duplicate edges")
+    print(f"Graph: {num_nodes} nodes, {num_edges} edges")
+
+    # Components, numbered by first appearance in nodes.jsonl
+    print("Finding connected components...")
+    _, labels = np.unique(connected_component_labels(num_nodes, low, high), return_inverse=True)
+    labels = labels.astype(np.int64)
+    num_components = int(labels.max()) + 1 if num_nodes else 0
+    component_sizes = np.bincount(labels, minlength=num_components)
+    print(f"Found {num_components} connected components")
+
+    edge_labels = labels[low]
+    edge_buckets = edge_labels % num_buckets
+
+    # Pass 3: spill node records into bucket files by component
+    work_dir = tempfile.mkdtemp(prefix='components_', dir=work_dir)
+    try:
+        print(f"Spilling node records into {num_buckets} buckets...")
+        bucket_files = [open(os.path.join(work_dir, f'bucket_{b}.jsonl'), 'w', encoding='utf-8')
+                        for b in range(num_buckets)]
+        with open(nodes_file, 'r', encoding='utf-8') as f:
+            for index, line in enumerate(f):
+                bucket_files[labels[index] % num_buckets].write(f'{index}\t{line}')
+        for bucket_file in bucket_files:
+            bucket_file.close()
+
+        # Pass 4: export one bucket at a time
+        component_stats = []
+        catalog_rows = []
+        for b in range(num_buckets):
+            nodes_by_component = defaultdict(list)
+            node_data = {}
+            with open(os.path.join(work_dir, f'bucket_{b}.jsonl'), 'r', encoding='utf-8') as f:
+                for line in f:
+                    index, record = line.split('\t', 1)
+                    index = int(index)
+                    nodes_by_component[int(labels[index])].append(index)
+                    node_data[index] = _node_record(json.loads(record), include_attributes)
+            os.remove(os.path.join(work_dir, f'bucket_{b}.jsonl'))
+
+            edges_by_component = defaultdict(list)
+            bucket_edges = np.flatnonzero(edge_buckets == b)
+            # Edges ordered by their first endpoint (as Graph.edges() reports them)
+            bucket_edges = bucket_edges[np.argsort(low[bucket_edges], kind='stable')]
+            for e, u, v, code in zip(bucket_edges.tolist(), low[bucket_edges].tolist(),
+                                     high[bucket_edges].tolist(), types[bucket_edges].tolist()):
+                edges_by_component[int(edge_labels[e])].append(
+                    {'source': node_data[u]['id'], 'target': node_data[v]['id'], 'type': type_names[code]}
+                )
+
+            for comp_id, members in nodes_by_component.items():
+                nodes_data = [node_data[i] for i in members]
+                edges_data = edges_by_component.get(comp_id, [])
+                component_json = {
+                    'nodes': nodes_data,
+                    'edges': edges_data,
+                    'metadata': {
+                        'component_id': comp_id,
+                        'total_nodes': len(nodes_data),
+                        'total_edges': len(edges_data)
+                    }
+                }
+                stat = write_component(component_json, output_dir)
+                stat.pop('content_hash')
+                catalog_rows.append(catalog_row(component_json))
+                stat['sample_models'] = [node['id'] for node in nodes_data[:5]]
+                component_stats.append(stat)
+            print(f"  Bucket {b + 1}/{num_buckets}: {len(nodes_by_component)} components")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    component_stats.sort(key=lambda stat: stat['component_id'])
+    print(f"✓ Component catalog saved: {write_catalog(catalog_rows, output_dir)}")
+
+    # Stream the index so the model_id -> component_id map is never held as a dict
+    index_file = os.path.join(output_dir, 'component_index.json.gz')
+    with gzip.open(index_file, 'wt', encoding='utf-8') as out, open(nodes_file, 'r', encoding='utf-8') as f:
+        out.write('{"component_index": {')
+        for index, line in enumerate(f):
+            if index:
+                out.write(', ')
+            out.write(f'{json.dumps(json.loads(line)["id"])}: {int(labels[index])}')
+        out.write('}, "component_stats": ')
+        json.dump(component_stats, out)
+        out.write(f', "total_components": {num_components}, "total_nodes": {num_nodes}, '
+                  f'"total_edges": {num_edges}}}')
+
+    index_size_mb = os.path.getsize(index_file) / (1024 * 1024)
+    print(f"\n✓ Index saved: {index_file} ({index_size_mb:.2f} MB)")
+    print(f"✓ Total components: {num_components}")
+    print(f"✓ Largest component: {int(component_sizes.max()) if num_components else 0} nodes")
+    return index_file, component_stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Out-of-core component export from flat node/edge files')
+    parser.add_argument('--flat-dir', default='data/flat', help='Directory with nodes.jsonl and edges.tsv')
+    parser.add_argument('--output-dir', default='components', help='Directory for component files')
+    parser.add_argument('--from-pickle', default=None,
+                        help='Convert this pickled networkx graph to flat files first')
+    parser.add_argument('--buckets', type=int, default=NUM_BUCKETS, help='Number of on-disk buckets')
+    parser.add_argument('--work-dir', default=None, help='Directory for temporary bucket files')
+    args = parser.parse_args()
+
+    if args.from_pickle:
+        print(f"Converting {args.from_pickle}...")
+        with open(args.from_pickle, 'rb') as f:
+            G = pickle.load(f)
+        write_flat_graph(G, args.flat_dir)
+        del G
+
+    export_components_streaming(args.flat_dir, args.output_dir, num_buckets=args.buckets, work_dir=args.work_dir)
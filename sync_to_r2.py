@@ -0,0 +1,350 @@
+"""
+Delta upload of the components directory to R2 (or any S3-compatible store).
+
+upload_chunks_to_r2.py PUTs every lookup chunk on every run and never
+uploads component files. This script uploads only what changed:
+
+1. Every local file is hashed (MD5, plus the multipart ETag for files that
+   are uploaded in parts). Hashes are cached in
+   components/upload_manifest.json.gz by size and mtime, so unchanged files
+   are not re-read.
+2. The bucket is listed once, and each file's hash is compared with the
+   remote object's ETag (for a single PUT the ETag is the MD5 of the body;
+   for a multipart upload it is the MD5 of the part MD5s + "-<parts>").
+3. New and changed files are uploaded through upload_engine.UploadEngine
+   (adaptive concurrency, retries with backoff), files of at least
+   MULTIPART_THRESHOLD in parts of PART_SIZE. Directory files
+   (DIRECTORY_FILES, e.g. chunks_index.json.gz) go in a second batch once
+   every other file is uploaded, so the worker never reads a directory
+   whose files are not in the bucket yet.
+4. With --delete, remote keys in the synced prefixes that no longer exist
+   locally are deleted (other keys in the bucket are never touched), once
+   every upload succeeded.
+
+Keys follow the worker: lookup chunks, chunks_index.json.gz, model_filter.bin
+and autocomplete/ live at the bucket root, everything else under components/.
+
+    python sync_to_r2.py --dry-run             # show what would change
+    python sync_to_r2.py --delete              # upload changes, delete stale keys
+
+sync_directory() takes any boto3 S3 client, so it can be run against a local
+S3 stand-in such as moto.
+"""
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import json
+import math
+import os
+import time
+
+import compression
+import upload_engine
+
+R2_ACCOUNT_ID = os.environ.get('R2_ACCOUNT_ID')
+R2_ACCESS_KEY_ID = os.environ.get('R2_ACCESS_KEY_ID')
+R2_SECRET_ACCESS_KEY = os.environ.get('R2_SECRET_ACCESS_KEY')
+R2_BUCKET_NAME = 'ai-ecosystem-graph'
+
+UPLOAD_MANIFEST_FILE = 'upload_manifest.json.gz'
+UPLOAD_MANIFEST_VERSION = 1
+
+# Files of at least this size are uploaded in parts of PART_SIZE
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+PART_SIZE = 16 * 1024 * 1024
+# Parts of one multipart upload sent in parallel
+PART_CONCURRENCY = 4
+# S3 limits; boto3 adjusts the part size to them the same way multipart_part_size() does
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+# Keys the worker reads from the bucket root (see cloudflare-worker/src/index.js);
+# every other file is uploaded under COMPONENTS_PREFIX
+ROOT_PREFIXES = ('chunks/', 'autocomplete/')
+ROOT_FILES = ('chunks_index.json.gz', 'model_filter.bin')
+COMPONENTS_PREFIX = 'components/'
+
+# Files that name other files; uploaded after everything else
+DIRECTORY_FILES = ('chunks_index.json.gz', 'model_filter.bin', 'autocomplete/root.json.gz',
+                   'shards/shard_directory.json.gz', 'layouts/layout_index.json.gz', 'component_index.json.gz')
+
+# Local bookkeeping that is never uploaded
+EXCLUDE = ('manifest.json.gz', UPLOAD_MANIFEST_FILE, f'{upload_engine.STATE_FILE}*', '*.prof', '*_report.json')
+
+def r2_key(relative_path):
+    """Bucket key of a file, from its path relative to the components directory"""
+    if relative_path.startswith(ROOT_PREFIXES) or relative_path in ROOT_FILES:
+        return relative_path
+    return COMPONENTS_PREFIX + relative_path
+
+def is_synced_key(key):
+    """Whether a bucket key is in the synced prefixes (and may be deleted by --delete)"""
+    return key.startswith(ROOT_PREFIXES + (COMPONENTS_PREFIX,)) or key in ROOT_FILES
+
+def content_headers(path):
+    """put_object arguments for a file's type"""
+    if path.endswith('.gz'):
+        return {'ContentType': 'application/gzip', 'ContentEncoding': 'gzip'}
+    if path.endswith('.json'):
+        return {'ContentType': 'application/json'}
+    return {'ContentType': 'application/octet-stream'}
+
+def list_local_files(base='components', exclude=EXCLUDE):
+    """Paths (relative, '/'-separated) of all files to sync under base"""
+    files = []
+    for root, _, names in os.walk(base):
+        for name in names:
+            relative = os.path.relpath(os.path.join(root, name), base).replace(os.sep, '/')
+            if not any(fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern) for pattern in exclude):
+                files.append(relative)
+    return sorted(files)
+
+def multipart_part_size(size, part_size=PART_SIZE):
+    """Part size boto3 actually uses for a file of size bytes"""
+    part_size = max(part_size, MIN_PART_SIZE)
+    while math.ceil(size / part_size) > MAX_PARTS:
+        part_size *= 2
+    return part_size
+
+def file_hashes(path, part_size=PART_SIZE, multipart_threshold=MULTIPART_THRESHOLD):
+    """
+    MD5 of a file and the ETag S3 gives it after an upload (equal to the MD5,
+    or the multipart ETag for files of at least multipart_threshold).
+    """
+    part_size = multipart_part_size(os.path.getsize(path), part_size)
+    whole = hashlib.md5()
+    part_digests = []
+    with open(path, 'rb') as f:
+        while True:
+            part = f.read(part_size)
+            if not part:
+                break
+            whole.update(part)
+            part_digests.append(hashlib.md5(part).digest())
+    md5 = whole.hexdigest()
+    if os.path.getsize(path) < multipart_threshold:
+        return md5, md5
+    return md5, f'{hashlib.md5(b"".join(part_digests)).hexdigest()}-{len(part_digests)}'
+
+def load_upload_manifest(base='components'):
+    """Hashes from the previous run, or an empty manifest"""
+    manifest_file = os.path.join(base, UPLOAD_MANIFEST_FILE)
+    if os.path.exists(manifest_file):
+        with gzip.open(manifest_file, 'rt', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == UPLOAD_MANIFEST_VERSION:
+            return manifest
+    return {'version': UPLOAD_MANIFEST_VERSION, 'files': {}}
+
+def save_upload_manifest(manifest, base='components'):
+    manifest_file = os.path.join(base, UPLOAD_MANIFEST_FILE)
+    with gzip.open(manifest_file, 'wt', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest_file
+
+def hash_local_files(base, files, manifest, part_size=PART_SIZE, multipart_threshold=MULTIPART_THRESHOLD):
+    """
+    {relative path: {'size', 'mtime_ns', 'md5', 'etag'}} for files, reusing
+    manifest entries whose size and mtime are unchanged.
+    """
+    previous = manifest.get('files', {})
+    reuse = manifest.get('part_size') == part_size and manifest.get('multipart_threshold') == multipart_threshold
+    entries = {}
+    hashed = 0
+    for relative in files:
+        stat = os.stat(os.path.join(base, relative))
+        entry = previous.get(relative)
+        if not (reuse and entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns):
+            md5, etag = file_hashes(os.path.join(base, relative), part_size, multipart_threshold)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'md5': md5, 'etag': etag}
+            hashed += 1
+        entries[relative] = entry
+    print(f"  Hashed {hashed:,} new or modified files ({len(files) - hashed:,} unchanged since the last run)")
+    return entries
+
+def list_remote_objects(s3_client, bucket):
+    """{key: etag} of every object in the bucket"""
+    remote = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket):
+        for obj in page.get('Contents', []):
+            remote[obj['Key']] = obj['ETag'].strip('"')
+    return remote
+
+def plan_sync(entries, remote, delete=False):
+    """
+    Compare local hashes with remote ETags.
+
+    Returns {'new': [paths], 'changed': [paths], 'unchanged': n, 'stale': [keys]}.
+    """
+    plan = {'new': [], 'changed': [], 'unchanged': 0, 'stale': []}
+    local_keys = set()
+    for relative, entry in entries.items():
+        key = r2_key(relative)
+        local_keys.add(key)
+        etag = remote.get(key)
+        if etag is None:
+            plan['new'].append(relative)
+        elif etag in (entry['md5'], entry['etag']):
+            # Either a single PUT (MD5) or a multipart upload with our part size
+            plan['unchanged'] += 1
+        else:
+            plan['changed'].append(relative)
+    if delete:
+        plan['stale'] = sorted(key for key in remote if is_synced_key(key) and key not in local_keys)
+    return plan
+
+def upload_one(s3_client, bucket, key, path, part_size=PART_SIZE, multipart_threshold=MULTIPART_THRESHOLD):
+    """Upload one file (multipart if large); returns its size in bytes"""
+    from boto3.s3.transfer import TransferConfig
+
+    size = os.path.getsize(path)
+    if size < multipart_threshold:
+        with open(path, 'rb') as f:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=f, **content_headers(path))
+    else:
+        config = TransferConfig(multipart_threshold=multipart_threshold, multipart_chunksize=part_size,
+                                max_concurrency=PART_CONCURRENCY)
+        s3_client.upload_file(path, bucket, key, ExtraArgs=content_headers(path), Config=config)
+    return size
+
+def delete_keys(s3_client, bucket, keys):
+    """Delete keys in batches of 1000 (the DeleteObjects limit); returns the number of errors"""
+    errors = 0
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        response = s3_client.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': key} for key in batch],
+                                                                   'Quiet': True})
+        for error in response.get('Errors', []):
+            errors += 1
+            print(f"  Failed to delete {error['Key']}: {error.get('Message', error.get('Code'))}")
+    return errors
+
+def upload_files(s3_client, bucket, base, files, summary, max_concurrency=upload_engine.MAX_CONCURRENCY,
+                 part_size=PART_SIZE, multipart_threshold=MULTIPART_THRESHOLD):
+    """Upload files (paths relative to base) in parallel, adding the counts and failures to summary"""
+    # No state file: after an interruption the bucket listing already shows what was uploaded
+    engine = upload_engine.UploadEngine(max_concurrency=max_concurrency)
+    relative_of = {r2_key(relative): relative for relative in files}
+    stats = engine.run([(r2_key(relative), os.path.join(base, relative)) for relative in files],
+                       lambda key, path: upload_one(s3_client, bucket, key, path, part_size, multipart_threshold))
+    for key, error in stats['failed'].items():
+        summary['failed'].append(relative_of[key])
+        print(f"  Failed: {relative_of[key]} - {error}")
+    summary['uploaded'] += stats['uploaded']
+    summary['uploaded_bytes'] += stats['bytes']
+    summary['retries'] += stats['retries']
+
+def sync_directory(s3_client, bucket=R2_BUCKET_NAME, base='components', delete=False, dry_run=False,
+                   max_concurrency=upload_engine.MAX_CONCURRENCY, exclude=EXCLUDE, part_size=PART_SIZE,
+                   multipart_threshold=MULTIPART_THRESHOLD):
+    """
+    Upload new and changed files under base to the bucket, and delete stale keys if requested.
+
+    Returns a summary dict (counts, bytes, failed paths).
+    """
+    start_time = time.time()
+    print(f"Scanning {base}...")
+    manifest = load_upload_manifest(base)
+    files = list_local_files(base, exclude)
+    undeployable = compression.undeployable_files(files)
+    if undeployable:
+        raise ValueError(f"{len(undeployable):,} files use a codec the worker cannot read (e.g. {undeployable[0]}); "
+                         f"zstd / brotli exports are for local use, re-export with --compression gzip to deploy")
+    entries = hash_local_files(base, files, manifest, part_size, multipart_threshold)
+
+    print(f"Listing bucket {bucket}...")
+    remote = list_remote_objects(s3_client, bucket)
+    plan = plan_sync(entries, remote, delete)
+    to_upload = plan['new'] + plan['changed']
+    upload_bytes = sum(entries[relative]['size'] for relative in to_upload)
+    print(f"  Local files: {len(entries):,}, remote objects: {len(remote):,}")
+    stale_note = f", stale: {len(plan['stale']):,}" if delete else ''
+    print(f"  New: {len(plan['new']):,}, changed: {len(plan['changed']):,}, unchanged: {plan['unchanged']:,}"
+          f"{stale_note}")
+    print(f"  To upload: {upload_bytes / (1024 * 1024):.2f} MB")
+
+    summary = {'new': len(plan['new']), 'changed': len(plan['changed']), 'unchanged': plan['unchanged'],
+               'stale': len(plan['stale']), 'uploaded': 0, 'uploaded_bytes': 0, 'retries': 0, 'deleted': 0,
+               'failed': []}
+    if dry_run:
+        for relative in to_upload[:20]:
+            print(f"    upload {r2_key(relative)}")
+        for key in plan['stale'][:20]:
+            print(f"    delete {key}")
+        print("Dry run: nothing uploaded or deleted")
+        return summary
+
+    directories = [relative for relative in to_upload if relative in DIRECTORY_FILES]
+    data_files = [relative for relative in to_upload if relative not in DIRECTORY_FILES]
+    upload_start = time.time()
+    if data_files:
+        print(f"Uploading {len(data_files):,} files (up to {max_concurrency} in parallel)...")
+        upload_files(s3_client, bucket, base, data_files, summary, max_concurrency, part_size, multipart_threshold)
+    if directories and summary['failed']:
+        print(f"  Not uploading {', '.join(directories)} until every file they name is uploaded")
+        summary['failed'].extend(directories)
+    elif directories:
+        print(f"Uploading {len(directories):,} directory files...")
+        upload_files(s3_client, bucket, base, directories, summary, max_concurrency, part_size, multipart_threshold)
+    if summary['uploaded']:
+        elapsed = max(time.time() - upload_start, 1e-9)
+        summary['mb_per_s'] = round(summary['uploaded_bytes'] / (1024 * 1024) / elapsed, 2)
+        summary['objects_per_s'] = round(summary['uploaded'] / elapsed, 1)
+
+    if plan['stale'] and summary['failed']:
+        print(f"  Not deleting {len(plan['stale']):,} stale keys until every upload succeeded")
+    elif plan['stale']:
+        print(f"Deleting {len(plan['stale']):,} stale keys...")
+        summary['deleted'] = len(plan['stale']) - delete_keys(s3_client, bucket, plan['stale'])
+
+    # Failed files keep no entry, so the next run hashes and compares them again
+    for relative in summary['failed']:
+        entries.pop(relative)
+    manifest.update({'bucket': bucket, 'part_size': part_size, 'multipart_threshold': multipart_threshold,
+                     'files': entries, 'synced_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())})
+    save_upload_manifest(manifest, base)
+
+    elapsed = time.time() - start_time
+    print(f"\n✓ Sync complete in {elapsed:.1f}s:")
+    print(f"  Uploaded: {summary['uploaded']:,} files ({summary['uploaded_bytes'] / (1024 * 1024):.2f} MB)")
+    if summary['uploaded']:
+        print(f"  Throughput: {summary['mb_per_s']} MB/s, {summary['objects_per_s']} objects/s "
+              f"({summary['retries']} retries)")
+    print(f"  Unchanged: {summary['unchanged']:,} files")
+    print(f"  Deleted: {summary['deleted']:,} keys")
+    print(f"  Failed: {len(summary['failed']):,} files")
+    return summary
+
+def r2_client(pool_size=upload_engine.MAX_CONCURRENCY):
+    """boto3 S3 client for R2 from the R2_* environment variables"""
+    if not all([R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY]):
+        raise RuntimeError("R2 credentials not found; set R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY")
+    return upload_engine.make_client(f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com', R2_ACCESS_KEY_ID,
+                                     R2_SECRET_ACCESS_KEY, pool_size)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Upload new and changed component files to R2')
+    parser.add_argument('--components-dir', default='components', help='Directory to sync')
+    parser.add_argument('--bucket', default=R2_BUCKET_NAME, help='Bucket name')
+    parser.add_argument('--delete', action='store_true', help='Delete remote keys that no longer exist locally')
+    parser.add_argument('--dry-run', action='store_true', help='Only show what would be uploaded or deleted')
+    parser.add_argument('--max-concurrency', type=int, default=upload_engine.MAX_CONCURRENCY,
+                        help='Upper bound of parallel uploads (and the connection pool size)')
+    parser.add_argument('--exclude', nargs='*', default=[], help='Extra glob patterns of files not to upload')
+    args = parser.parse_args()
+
+    try:
+        client = r2_client(args.max_concurrency + PART_CONCURRENCY)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    try:
+        summary = sync_directory(client, args.bucket, args.components_dir, args.delete, args.dry_run,
+                                 args.max_concurrency, EXCLUDE + tuple(args.exclude))
+    except ValueError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    if summary['failed']:
+        raise SystemExit(1)
@@ -0,0 +1,269 @@
+"""
+Synthetic ecosystem graphs for scale and load testing.
+
+The real graph needs the private data/ai_ecosystem_graph_nomerges.pkl. This
+generator produces graphs with the same node attributes and a similar shape,
+at any size and reproducibly from a seed:
+
+- component sizes follow a discrete power law (P(size = s) ~ s^-2.1, so most
+  components are a lone model or a pair and a few hold many thousands)
+- every component is a tree under one base model; each derived model hangs
+  off an earlier model of its component, skewed towards the base, so base
+  models become hubs with long finetune / adapter / quantized chains below
+- downloads and likes are Zipf-distributed (base models get a boost), and a
+  derived model is created after the model it derives from
+
+Generation runs in blocks of whole components with NumPy, so memory is
+bounded by the block (or the largest component), not the graph. Three
+outputs:
+
+    # networkx graph, pickled like data/ai_ecosystem_graph_nomerges.pkl
+    python synthetic_graph.py --nodes 200000 --output data/synthetic_graph.pkl
+    # nodes.jsonl + edges.tsv for stream_components.py (tens of millions of nodes)
+    python synthetic_graph.py --scale 20 --format flat --output data/flat_20x
+    # a components directory, exported through stream_components.py
+    python synthetic_graph.py --scale 5 --format components --output components_5x
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from stream_components import EDGES_FILE, NODES_FILE, export_components_streaming
+
+# Nodes in the real graph (--scale 1)
+REAL_GRAPH_NODES = 1_860_411
+
+FORMATS = ('networkx', 'flat', 'components')
+
+# P(component size = s) ~ s^-COMPONENT_SIZE_EXPONENT
+COMPONENT_SIZE_EXPONENT = 2.1
+# Default cap on a component's size, as a fraction of the graph
+MAX_COMPONENT_FRACTION = 0.05
+# Derived model i of a component hangs off model floor(i * U ** PARENT_SKEW)
+PARENT_SKEW = 3.0
+DOWNLOADS_EXPONENT = 1.6
+LIKES_EXPONENT = 2.0
+BASE_MODEL_BOOST = 20
+MAX_DOWNLOADS = 10 ** 9
+# Components are generated this many nodes at a time
+BLOCK_NODES = 1_000_000
+
+EDGE_TYPES = ('finetune', 'adapter', 'quantized')
+EDGE_TYPE_WEIGHTS = (0.45, 0.30, 0.25)
+NAME_SUFFIXES = {
+    'finetune': ('Instruct', 'chat', 'sft', 'dpo', 'ft'),
+    'adapter': ('lora', 'qlora', 'adapter'),
+    'quantized': ('GGUF', 'AWQ', 'GPTQ', '4bit', '8bit')
+}
+LIBRARIES = {
+    None: (('transformers', 0.8), ('diffusers', 0.1), ('sentence-transformers', 0.1)),
+    'finetune': (('transformers', 0.9), ('mlx', 0.05), (None, 0.05)),
+    'adapter': (('peft', 0.95), ('transformers', 0.05)),
+    'quantized': (('transformers', 0.4), ('gguf', 0.4), ('mlx', 0.1), ('mlc-llm', 0.1))
+}
+# Most models have no pipeline tag; a component's models share its base model's tag
+PIPELINE_TAGS = ((None, 0.6), ('text-generation', 0.25), ('image-text-to-text', 0.04), ('image-to-text', 0.03),
+                 ('text-classification', 0.03), ('translation', 0.02), ('text-to-image', 0.02),
+                 ('automatic-speech-recognition', 0.01))
+FAMILIES = ('llama', 'mistral', 'qwen', 'gemma', 'phi', 'falcon', 'bert', 't5', 'whisper', 'stable-diffusion',
+            'SmolVLM', 'gpt2', 'deepseek', 'olmo', 'pythia')
+PARAMETER_COUNTS = ('0.5B', '1B', '3B', '7B', '8B', '13B', '34B', '70B')
+
+FIRST_DAY = np.datetime64('2021-01-01')
+LAST_DAY = np.datetime64('2025-10-01')
+# Mean days between a model and one derived from it
+DERIVE_DELAY_DAYS = 45
+
+def _choice(rng, weighted, size):
+    values = [value for value, _ in weighted]
+    weights = np.array([weight for _, weight in weighted], dtype=np.float64)
+    codes = rng.choice(len(values), size=size, p=weights / weights.sum())
+    return [values[code] for code in codes.tolist()]
+
+def component_sizes(num_nodes, rng, exponent=COMPONENT_SIZE_EXPONENT, max_component_size=None):
+    """Heavy-tailed component sizes summing to num_nodes"""
+    if max_component_size is None:
+        max_component_size = max(1, int(num_nodes * MAX_COMPONENT_FRACTION))
+    blocks = []
+    total = 0
+    while total < num_nodes:
+        sizes = np.minimum(rng.zipf(exponent, size=max(1024, (num_nodes - total) // 4)), max_component_size)
+        blocks.append(sizes)
+        total += int(sizes.sum())
+    sizes = np.concatenate(blocks).astype(np.int64)
+    cut = int(np.searchsorted(np.cumsum(sizes), num_nodes))
+    sizes = sizes[:cut + 1]
+    sizes[-1] -= int(sizes.sum()) - num_nodes
+    return sizes
+
+def _creation_days(rng, parent, is_base, component, num_components):
+    """Days since FIRST_DAY: base models uniform, derived models a random delay after their parent"""
+    span = int((LAST_DAY - FIRST_DAY).astype(int))
+    base_day = rng.integers(0, span, size=num_components)
+    delay = np.where(is_base, 0, rng.exponential(DERIVE_DELAY_DAYS, size=len(parent)).astype(np.int64))
+    # offset[i] = sum of the delays from the base model down to i (pointer jumping)
+    offset = delay
+    hop = parent
+    while not np.array_equal(hop[hop], hop):
+        offset = offset + offset[hop]
+        hop = hop[hop]
+    return np.minimum(base_day[component] + offset, span)
+
+def generate_blocks(num_nodes, seed=0, exponent=COMPONENT_SIZE_EXPONENT, max_component_size=None,
+                    block_nodes=BLOCK_NODES):
+    """
+    Yield the synthetic graph as blocks of whole components.
+
+    Every block is a dict of columns: 'ids', 'downloads', 'likes',
+    'createdAt', 'pipeline_tag', 'library_name' (one entry per node) and
+    'edges', a list of (source id, target id, edge type). Components appear
+    in order, each base model first.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = component_sizes(num_nodes, rng, exponent, max_component_size)
+    num_orgs = max(100, num_nodes // 2000)
+    num_users = max(1000, num_nodes // 20)
+
+    bounds = np.cumsum(sizes)
+    start = 0
+    first_component = 0
+    while start < len(sizes):
+        done = int(bounds[start - 1]) if start else 0
+        end = max(int(np.searchsorted(bounds, done + block_nodes, side='right')), start + 1)
+        block_sizes = sizes[start:end]
+        num_components = len(block_sizes)
+        n = int(block_sizes.sum())
+
+        component = np.repeat(np.arange(num_components), block_sizes)
+        first = np.repeat(np.cumsum(block_sizes) - block_sizes, block_sizes)
+        local = np.arange(n) - first
+        is_base = local == 0
+        parent = first + np.floor(local * rng.random(n) ** PARENT_SKEW).astype(np.int64)
+        parent[is_base] = np.flatnonzero(is_base)
+        edge_codes = rng.choice(len(EDGE_TYPES), size=n, p=EDGE_TYPE_WEIGHTS)
+
+        # Names: <org>/<family>-<params>-<component> for base models,
+        # <user>/<base name>-<suffix>-<index> for derived ones
+        families = rng.integers(0, len(FAMILIES), size=num_components)
+        params = rng.integers(0, len(PARAMETER_COUNTS), size=num_components)
+        base_names = [f'{FAMILIES[f]}-{PARAMETER_COUNTS[p]}-{first_component + c}'
+                      for c, (f, p) in enumerate(zip(families.tolist(), params.tolist()))]
+        orgs = (rng.zipf(1.5, size=num_components) - 1) % num_orgs
+        users = (rng.zipf(1.3, size=n) - 1) % num_users
+        suffix_picks = rng.integers(0, 1 << 30, size=n)
+        ids = []
+        for c, l, code, user, pick in zip(component.tolist(), local.tolist(), edge_codes.tolist(), users.tolist(),
+                                          suffix_picks.tolist()):
+            if l == 0:
+                ids.append(f'org{int(orgs[c])}/{base_names[c]}')
+            else:
+                suffixes = NAME_SUFFIXES[EDGE_TYPES[code]]
+                ids.append(f'user{user}/{base_names[c]}-{suffixes[pick % len(suffixes)]}-{l}')
+
+        downloads = np.minimum(rng.zipf(DOWNLOADS_EXPONENT, size=n) - 1, MAX_DOWNLOADS // BASE_MODEL_BOOST)
+        downloads[is_base] = (downloads[is_base] + 1) * BASE_MODEL_BOOST
+        likes = np.minimum(rng.zipf(LIKES_EXPONENT, size=n) - 1, downloads)
+        days = _creation_days(rng, parent, is_base, component, num_components)
+        created = np.datetime_as_string(FIRST_DAY + days.astype('timedelta64[D]'), unit='D')
+
+        component_tags = _choice(rng, PIPELINE_TAGS, num_components)
+        libraries = {}
+        for key, weighted in LIBRARIES.items():
+            libraries[key] = _choice(rng, weighted, n)
+        library_name = [libraries[None if base else EDGE_TYPES[code]][i]
+                        for i, (base, code) in enumerate(zip(is_base.tolist(), edge_codes.tolist()))]
+
+        derived = np.flatnonzero(~is_base).tolist()
+        parent_list = parent.tolist()
+        yield {
+            'ids': ids,
+            'downloads': downloads.tolist(),
+            'likes': likes.tolist(),
+            'createdAt': [f'{day}T00:00:00.000Z' for day in created.tolist()],
+            'pipeline_tag': [component_tags[c] for c in component.tolist()],
+            'library_name': library_name,
+            'edges': [(ids[parent_list[i]], ids[i], EDGE_TYPES[edge_codes[i]]) for i in derived]
+        }
+        first_component += num_components
+        start = end
+
+def synthetic_graph(num_nodes, seed=0, **options):
+    """The synthetic graph as a networkx Graph with the real graph's attributes (edge_type on edges)"""
+    import networkx as nx
+
+    G = nx.Graph()
+    for block in generate_blocks(num_nodes, seed, **options):
+        G.add_nodes_from(
+            (node_id, {'likes': likes, 'downloads': downloads, 'createdAt': created, 'pipeline_tag': tag,
+                       'library_name': library})
+            for node_id, likes, downloads, created, tag, library in zip(
+                block['ids'], block['likes'], block['downloads'], block['createdAt'], block['pipeline_tag'],
+                block['library_name']))
+        G.add_edges_from((source, target, {'edge_type': edge_type}) for source, target, edge_type in block['edges'])
+    return G
+
+def write_synthetic_flat(flat_dir, num_nodes, seed=0, **options):
+    """Write the synthetic graph as nodes.jsonl + edges.tsv; returns (nodes, edges)"""
+    os.makedirs(flat_dir, exist_ok=True)
+    num_edges = 0
+    with open(os.path.join(flat_dir, NODES_FILE), 'w', encoding='utf-8') as nodes_file, \
+            open(os.path.join(flat_dir, EDGES_FILE), 'w', encoding='utf-8') as edges_file:
+        for block in generate_blocks(num_nodes, seed, **options):
+            nodes_file.writelines(
+                json.dumps({'id': node_id, 'likes': likes, 'downloads': downloads, 'createdAt': created,
+                            'pipeline_tag': tag, 'library_name': library}) + '\n'
+                for node_id, likes, downloads, created, tag, library in zip(
+                    block['ids'], block['likes'], block['downloads'], block['createdAt'], block['pipeline_tag'],
+                    block['library_name']))
+            edges_file.writelines(f'{source}\t{target}\t{edge_type}\n' for source, target, edge_type in block['edges'])
+            num_edges += len(block['edges'])
+            print(f"  {len(block['ids']):,} nodes written")
+    print(f"✓ Synthetic flat graph written to {flat_dir}/ ({num_nodes:,} nodes, {num_edges:,} edges)")
+    return num_nodes, num_edges
+
+def write_synthetic_components(output_dir, num_nodes, seed=0, work_dir=None, **options):
+    """Generate flat files in a temporary directory and export them as a components directory"""
+    flat_dir = tempfile.mkdtemp(prefix='synthetic_flat_', dir=work_dir)
+    try:
+        write_synthetic_flat(flat_dir, num_nodes, seed, **options)
+        return export_components_streaming(flat_dir, output_dir, work_dir=work_dir)
+    finally:
+        shutil.rmtree(flat_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic ecosystem graph for scale and load testing')
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--nodes', type=int, help='Number of nodes')
+    size.add_argument('--scale', type=float, default=1.0,
+                      help=f'Size relative to the real graph ({REAL_GRAPH_NODES:,} nodes); default 1')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--format', choices=FORMATS, default='networkx',
+                        help='networkx (pickle), flat (nodes.jsonl + edges.tsv) or components (directory)')
+    parser.add_argument('--output', default=None,
+                        help='Output pickle / directory (default data/synthetic_graph.pkl, data/flat_synthetic '
+                             'or components_synthetic)')
+    parser.add_argument('--max-component-size', type=int, default=None,
+                        help=f'Largest component (default {MAX_COMPONENT_FRACTION:.0%} of the nodes)')
+    parser.add_argument('--work-dir', default=None, help='Directory for temporary files (components format)')
+    args = parser.parse_args()
+
+    num_nodes = args.nodes or int(REAL_GRAPH_NODES * args.scale)
+    options = {'max_component_size': args.max_component_size}
+    print(f"Generating a synthetic graph with {num_nodes:,} nodes (seed {args.seed})...")
+    if args.format == 'networkx':
+        output = args.output or 'data/synthetic_graph.pkl'
+        G = synthetic_graph(num_nodes, args.seed, **options)
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'wb') as f:
+            pickle.dump(G, f)
+        print(f"✓ Saved {output} ({G.number_of_nodes():,} nodes, {G.number_of_edges():,} edges)")
+    elif args.format == 'flat':
+        write_synthetic_flat(args.output or 'data/flat_synthetic', num_nodes, args.seed, **options)
+    else:
+        write_synthetic_components(args.output or 'components_synthetic', num_nodes, args.seed, args.work_dir,
+                                   **options)
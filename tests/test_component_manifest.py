@@ -0,0 +1,84 @@
+"""Stable component ids across incremental re-exports (component_manifest.assign_stable_ids)."""
+import os
+import sys
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import component_manifest
+from export_components import export_components
+
+def graph(edges, nodes=()):
+    G = nx.Graph()
+    G.add_nodes_from(nodes)
+    for source, target in edges:
+        G.add_edge(source, target, edge_type='finetune')
+    return G
+
+def export(G, output_dir):
+    """Incremental export; returns {canonical member: component id} and {component id: has its own file}"""
+    export_components(G, str(output_dir), engine='arrays', incremental=True)
+    manifest = component_manifest.load_manifest(str(output_dir))
+    ids = {entry['canonical']: int(comp_id) for comp_id, entry in manifest['components'].items()}
+    files = {int(comp_id): os.path.exists(os.path.join(str(output_dir), f'component_{comp_id}.json.gz'))
+             for comp_id in manifest['components']}
+    return ids, files
+
+BASE = [('b/base', 'b/ft'), ('d/base', 'd/ft'), ('f/base', 'f/ft')]
+
+def test_unchanged_graph_keeps_ids(tmp_path):
+    first, _ = export(graph(BASE), tmp_path)
+    second, _ = export(graph(BASE), tmp_path)
+    assert first == second
+
+def test_smaller_id_joining_keeps_id(tmp_path):
+    first, _ = export(graph(BASE), tmp_path)
+    # 'a/new' sorts below 'd/base', the component's canonical member
+    second, files = export(graph(BASE + [('a/new', 'd/base')]), tmp_path)
+    assert second['d/base'] == first['d/base']
+    assert 'a/new' not in second
+    assert files[first['d/base']]
+    assert set(second.values()) == set(first.values())
+
+def test_merge_keeps_smallest_id(tmp_path):
+    first, _ = export(graph(BASE), tmp_path)
+    second, files = export(graph(BASE + [('d/ft', 'f/ft')]), tmp_path)
+    merged_id = min(first['d/base'], first['f/base'])
+    retired_id = max(first['d/base'], first['f/base'])
+    assert merged_id in second.values()
+    assert retired_id not in second.values()
+    assert second['b/base'] == first['b/base']
+    assert files[merged_id]
+    assert not os.path.exists(os.path.join(str(tmp_path), f'component_{retired_id}.json.gz'))
+
+def test_split_keeps_id_for_part_with_canonical(tmp_path):
+    edges = BASE + [('d/ft', 'e/ft')]
+    first, _ = export(graph(edges), tmp_path)
+    # Removing the edge splits 'e/ft' off the 'd/base' component
+    second, _ = export(graph(BASE, nodes=['e/ft']), tmp_path)
+    assert second['d/base'] == first['d/base']
+    assert second['e/ft'] not in first.values()
+    assert second['b/base'] == first['b/base']
+    assert second['f/base'] == first['f/base']
+
+def test_split_then_rejoin_with_smaller_member(tmp_path):
+    first, _ = export(graph(BASE), tmp_path)
+    # 'd/ft' splits off its component and gets a fresh id
+    second, _ = export(graph([('b/base', 'b/ft'), ('f/base', 'f/ft')], nodes=['d/base', 'd/ft']), tmp_path)
+    assert second['d/base'] == first['d/base']
+    assert second['d/ft'] not in first.values()
+    # It rejoins through 'a/new', which sorts below every member
+    third, files = export(graph(BASE + [('a/new', 'd/ft')]), tmp_path)
+    assert third['d/base'] == first['d/base']
+    assert 'd/ft' not in third and 'a/new' not in third
+    assert second['d/ft'] not in third.values()
+    assert files[first['d/base']]
+    assert not os.path.exists(os.path.join(str(tmp_path), f"component_{second['d/ft']}.json.gz"))
+
+def test_canonical_member_leaving_gets_fresh_id(tmp_path):
+    first, _ = export(graph(BASE), tmp_path)
+    # The canonical member leaves, so the rest of its component gets a fresh id
+    second, _ = export(graph([('b/base', 'b/ft'), ('f/base', 'f/ft')], nodes=['d/ft']), tmp_path)
+    assert first['d/base'] not in second.values()
+    assert second['d/ft'] not in first.values()
@@ -0,0 +1,346 @@
+"""
+Trigram inverted index for substring and fuzzy model search.
+
+search_index.json.gz only supports exact or prefix matches, and only after
+the whole file is downloaded. Users often know just part of a name
+("SmolVLM", "llama-3-8b") and not the org. This index maps every trigram
+(three consecutive characters of a lowercased model id) to the sorted list
+of models that contain it:
+
+    components/trigrams/models.json.gz
+    {
+      "num_shards": 64, "total_models": 1834567, "total_trigrams": 181234,
+      "total_postings": 45123456,
+      "model_ids": [...],           # sorted; postings are positions in this list
+      "downloads": [...], "likes": [...]
+    }
+
+    components/trigrams/shard_NNNN.bin.gz   # trigrams with crc32(trigram) % num_shards == NNNN
+
+Shards are binary (all integers little-endian):
+
+    magic      b'AIETRIG1'
+    header     u32 trigrams, u64 postings
+    trigrams   one UTF-8 string of 3 characters per trigram, in sorted order
+               (u32 byte length + bytes)
+    offsets    u32 * (trigrams + 1), start of each posting list
+    postings   u32 model positions, delta-encoded within each list
+
+A query of three or more characters is split into trigrams. Only the shards
+holding them are read. Models containing the query are found by
+intersecting its posting lists, rarest first, and are ranked by downloads,
+then likes. If fewer than k models contain it, models that share enough
+trigrams are scored by edit distance to their closest substring (Myers'
+bit-parallel algorithm), so "smolvml" still finds SmolVLM. Those results
+are ranked by distance, then popularity.
+
+    python trigram_index.py smolvlm --base components
+    python trigram_index.py llama-3-8b --benchmark 1000
+"""
+import argparse
+import os
+import random
+import struct
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+import compression
+
+TRIGRAMS_DIR = 'trigrams'
+MODELS_FILE = 'models.json'
+
+MAGIC = b'AIETRIG1'
+HEADER = struct.Struct('<8sIQ')
+
+NUM_SHARDS = 64
+TOP_K = 10
+# Fuzzy matching scores at most this many candidates (the ones sharing most trigrams)
+MAX_CANDIDATES = 1000
+
+def normalize(text):
+    return text.lower()
+
+def trigrams(text):
+    """Distinct trigrams of a normalized string, in order of first occurrence"""
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+def shard_of(trigram, num_shards):
+    return zlib.crc32(trigram.encode('utf-8')) % num_shards
+
+def max_edits(query):
+    """Edits allowed for a fuzzy match: 1 for queries of up to 5 characters, else 2"""
+    return 1 if len(query) <= 5 else 2
+
+def substring_distance(pattern, text):
+    """
+    Smallest edit distance between pattern and any substring of text.
+
+    Myers' bit-parallel algorithm: one pass over text with the columns of the
+    dynamic-programming matrix packed into Python ints.
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = best = m
+    for char in text:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # Shifting in 0 (not 1) lets a match start anywhere in text
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+    return best
+
+def _encode_shard(names, postings):
+    """Shard file bytes for sorted trigram names and their posting lists (uint32 arrays)"""
+    offsets = np.zeros(len(names) + 1, dtype='<u4')
+    if postings:
+        offsets[1:] = np.cumsum([len(posting) for posting in postings])
+        values = np.concatenate(postings).astype('<u4')
+        # Delta-encode each list; the first value of a list stays absolute
+        deltas = np.diff(values, prepend=np.uint32(0)).astype('<u4')
+        deltas[offsets[:-1]] = values[offsets[:-1]]
+    else:
+        deltas = np.zeros(0, dtype='<u4')
+    text = ''.join(names).encode('utf-8')
+    return b''.join([HEADER.pack(MAGIC, len(names), len(deltas)), struct.pack('<I', len(text)), text,
+                     offsets.tobytes(), deltas.tobytes()])
+
+def _decode_shard(data):
+    """{trigram: (start, end)} and the delta-encoded postings of a shard"""
+    magic, count, total = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a trigram index shard")
+    pos = HEADER.size
+    (length,) = struct.unpack_from('<I', data, pos)
+    pos += 4
+    text = data[pos:pos + length].decode('utf-8')
+    pos += length
+    offsets = np.frombuffer(data, dtype='<u4', count=count + 1, offset=pos)
+    pos += 4 * (count + 1)
+    deltas = np.frombuffer(data, dtype='<u4', count=total, offset=pos)
+    bounds = offsets.tolist()
+    lists = {text[3 * i:3 * i + 3]: (bounds[i], bounds[i + 1]) for i in range(count)}
+    return lists, deltas
+
+def write_trigram_index(model_ids, downloads, likes, output_dir, codec='gzip', num_shards=NUM_SHARDS):
+    """
+    Write the trigram index for sorted model ids.
+
+    downloads and likes are aligned with model_ids. Returns the models file path.
+    """
+    trigrams_dir = os.path.join(output_dir, TRIGRAMS_DIR)
+    os.makedirs(trigrams_dir, exist_ok=True)
+
+    # (trigram number, model position) pairs; positions are appended in increasing order
+    numbers = {}
+    gram_column = array('I')
+    position_column = array('I')
+    for position, model_id in enumerate(model_ids):
+        for gram in trigrams(normalize(model_id)):
+            gram_column.append(numbers.setdefault(gram, len(numbers)))
+            position_column.append(position)
+    grams = np.frombuffer(gram_column, dtype=np.uint32) if gram_column else np.zeros(0, dtype=np.uint32)
+    positions = np.frombuffer(position_column, dtype=np.uint32) if position_column else np.zeros(0, dtype=np.uint32)
+
+    # A stable sort groups the pairs by trigram and keeps each posting list sorted
+    order = np.argsort(grams, kind='stable')
+    positions = positions[order]
+    ends = np.cumsum(np.bincount(grams, minlength=len(numbers)))
+    del gram_column, grams, order
+
+    by_shard = [[] for _ in range(num_shards)]
+    for gram, number in numbers.items():
+        by_shard[shard_of(gram, num_shards)].append((gram, number))
+
+    written = set()
+    for shard, grams_in_shard in enumerate(by_shard):
+        grams_in_shard.sort()
+        names = [gram for gram, _ in grams_in_shard]
+        postings = [positions[(ends[number - 1] if number else 0):ends[number]] for _, number in grams_in_shard]
+        path = compression.compressed_path(os.path.join(trigrams_dir, f'shard_{shard:04d}.bin'), codec)
+        with open(path, 'wb') as f:
+            f.write(compression.compress(_encode_shard(names, postings), codec))
+        written.add(os.path.basename(path))
+
+    models_file = compression.write_json(os.path.join(trigrams_dir, MODELS_FILE), {
+        'num_shards': num_shards,
+        'total_models': len(model_ids),
+        'total_trigrams': len(numbers),
+        'total_postings': len(positions),
+        'model_ids': list(model_ids),
+        'downloads': list(downloads),
+        'likes': list(likes)
+    }, codec)
+    written.add(os.path.basename(models_file))
+
+    # Files from a previous build (other shard count or codec)
+    for name in os.listdir(trigrams_dir):
+        if name not in written:
+            os.remove(os.path.join(trigrams_dir, name))
+    return models_file
+
+class TrigramSearch:
+    """
+    Query the trigram index; the model table and recently used shards are kept in memory.
+
+        results = TrigramSearch('components').search('smolvlm', 10)
+    """
+
+    def __init__(self, base='components', cache_shards=NUM_SHARDS):
+        self.dir = os.path.join(base, TRIGRAMS_DIR)
+        models_file = None
+        for codec in compression.CODECS:
+            models_file = compression.compressed_path(os.path.join(self.dir, MODELS_FILE), codec)
+            if os.path.exists(models_file):
+                self.codec = codec
+                break
+        models = compression.read_json(models_file)
+        self.num_shards = models['num_shards']
+        self.model_ids = models['model_ids']
+        self.downloads = np.asarray(models['downloads'], dtype=np.int64)
+        self.likes = np.asarray(models['likes'], dtype=np.int64)
+        self.cache_shards = cache_shards
+        self._shards = OrderedDict()
+
+    def _shard(self, shard):
+        cached = self._shards.get(shard)
+        if cached is None:
+            path = compression.compressed_path(os.path.join(self.dir, f'shard_{shard:04d}.bin'), self.codec)
+            with open(path, 'rb') as f:
+                cached = _decode_shard(compression.decompress(f.read(), self.codec))
+            self._shards[shard] = cached
+            if len(self._shards) > self.cache_shards:
+                self._shards.popitem(last=False)
+        else:
+            self._shards.move_to_end(shard)
+        return cached
+
+    def postings(self, trigram):
+        """Sorted positions (in model_ids) of the models containing a trigram"""
+        lists, deltas = self._shard(shard_of(trigram, self.num_shards))
+        start, end = lists.get(trigram, (0, 0))
+        return np.cumsum(deltas[start:end], dtype=np.uint32)
+
+    def _by_popularity(self, candidates):
+        # Downloads, then likes, then id (positions follow the sorted ids)
+        return candidates[np.lexsort((candidates, -self.likes[candidates], -self.downloads[candidates]))]
+
+    def _result(self, position, distance):
+        return {'id': self.model_ids[position], 'downloads': int(self.downloads[position]),
+                'likes': int(self.likes[position]), 'distance': distance}
+
+    def search(self, query, k=TOP_K, fuzzy=True):
+        """
+        Top k models matching query: [{'id', 'downloads', 'likes', 'distance'}, ...].
+
+        Models containing the query (distance 0) come first, by popularity;
+        with fuzzy=True the rest are filled with models within max_edits()
+        edits, by distance and then popularity. Queries shorter than three
+        characters have no trigrams and return nothing (autocomplete.py
+        covers short prefixes).
+        """
+        query = normalize(query)
+        grams = trigrams(query)
+        if not grams or k <= 0:
+            return []
+        lists = sorted((self.postings(gram) for gram in grams), key=len)
+
+        # Substring matches: intersect rarest first, then verify (trigrams can match out of order)
+        candidates = lists[0]
+        for posting in lists[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        results = []
+        exact = set()
+        for position in self._by_popularity(candidates).tolist():
+            if query in normalize(self.model_ids[position]):
+                results.append(self._result(position, 0))
+                exact.add(position)
+                if len(results) == k:
+                    return results
+        if not fuzzy:
+            return results
+
+        # Fuzzy matches: each edit destroys at most three of the query's trigrams
+        edits = max_edits(query)
+        shared = np.concatenate(lists)
+        if len(shared) == 0:
+            return results
+        positions, counts = np.unique(shared, return_counts=True)
+        keep = counts >= max(1, len(grams) - 3 * edits)
+        positions, counts = positions[keep], counts[keep]
+        if len(positions) > MAX_CANDIDATES:
+            order = np.lexsort((positions, -self.downloads[positions], -counts))[:MAX_CANDIDATES]
+            positions = positions[order]
+
+        scored = []
+        for position in positions.tolist():
+            if position in exact:
+                continue
+            distance = substring_distance(query, normalize(self.model_ids[position]))
+            if distance <= edits:
+                scored.append((distance, -int(self.downloads[position]), -int(self.likes[position]), position))
+        scored.sort()
+        results.extend(self._result(position, distance) for distance, _, _, position in scored[:k - len(results)])
+        return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search model ids with the trigram index')
+    parser.add_argument('query', help='Part of a model id (3+ characters)')
+    parser.add_argument('--base', default='components', help='Components directory')
+    parser.add_argument('-k', type=int, default=TOP_K, help='Number of results')
+    parser.add_argument('--exact', action='store_true', help='Only models containing the query')
+    parser.add_argument('--benchmark', type=int, default=0,
+                        help='Also time this many searches for random substrings of model ids')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    search = TrigramSearch(args.base)
+    print(f"Loaded {len(search.model_ids):,} models in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    results = search.search(args.query, args.k, fuzzy=not args.exact)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(f"{result['id']:<60} {result['downloads']:>12,} downloads {result['likes']:>8,} likes"
+              f"  (distance {result['distance']})")
+    print(f"{len(results)} results in {elapsed * 1000:.1f} ms")
+
+    if args.benchmark:
+        # Warm the shard cache first so the timings are per query, not per shard read
+        queries = []
+        for model_id in random.sample(search.model_ids, min(args.benchmark, len(search.model_ids))):
+            name = model_id.split('/', 1)[-1]
+            length = min(len(name), random.randint(3, 12))
+            offset = random.randint(0, len(name) - length)
+            queries.append(name[offset:offset + length])
+        for shard in range(search.num_shards):
+            search._shard(shard)
+        start = time.perf_counter()
+        for query in queries:
+            search.search(query, args.k)
+        elapsed = time.perf_counter() - start
+        print(f"{len(queries):,} searches: {elapsed / len(queries) * 1000:.2f} ms per search")
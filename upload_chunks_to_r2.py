@@ -1,11 +1,25 @@
 """
 Upload chunked lookup files to R2 in parallel.
+
+Uploads the chunks chunks_index.json.gz names (range chunking) or all
+lookup_XX chunks (prefix chunking) and the autocomplete shards
+autocomplete/root.json.gz names, then chunks_index.json.gz, model_filter.bin
+and the autocomplete root once every chunk and shard is in the bucket.
+
+Uploads go through upload_engine.UploadEngine: the concurrency adapts to
+throttling, failed PUTs are retried with backoff, and an interrupted run
+resumes where it stopped (progress is kept in components/upload_state.json
+until the upload completes). For uploading only what changed, including
+component files, use sync_to_r2.py.
 """
+import argparse
+import gzip
+import json
 import os
-import boto3
-from botocore.config import Config
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
+
+import autocomplete
+import compression
+import upload_engine
 
 # R2 credentials from environment
 R2_ACCOUNT_ID = os.environ.get('R2_ACCOUNT_ID')
@@ -14,78 +28,130 @@ R2_SECRET_ACCESS_KEY = os.environ.get('R2_SECRET_ACCESS_KEY')
 R2_BUCKET_NAME = 'ai-ecosystem-graph'
 
 def upload_file(file_path, s3_client):
-    """Upload a single file to R2"""
-    try:
-        # Get relative path from components/
-        r2_key = file_path.replace('components/', '')
-        
-        with open(file_path, 'rb') as f:
-            s3_client.put_object(
-                Bucket=R2_BUCKET_NAME,
-                Key=r2_key,
-                Body=f,
-                ContentType='application/gzip',
-                ContentEncoding='gzip'
-            )
-        
-        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-        return (r2_key, file_size_mb, True)
-    except Exception as e:
-        return (file_path, 0, False, str(e))
+    """Upload a single file to R2; returns its size in bytes"""
+    # Get relative path from components/
+    r2_key = file_path.replace('components/', '')
+    
+    if file_path.endswith('.gz'):
+        headers = {'ContentType': 'application/gzip', 'ContentEncoding': 'gzip'}
+    else:
+        # Uncompressed binary files (model_filter.bin)
+        headers = {'ContentType': 'application/octet-stream'}
+    
+    with open(file_path, 'rb') as f:
+        s3_client.put_object(
+            Bucket=R2_BUCKET_NAME,
+            Key=r2_key,
+            Body=f,
+            **headers
+        )
+    
+    return os.path.getsize(file_path)
 
-def upload_chunks():
+def upload_chunks(initial_concurrency=upload_engine.INITIAL_CONCURRENCY,
+                  max_concurrency=upload_engine.MAX_CONCURRENCY, restart=False):
     """Upload all chunk files to R2 in parallel"""
     if not all([R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY]):
         print("Error: R2 credentials not found in environment variables")
         print("Please set: R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY")
         return
     
-    # Initialize S3 client for R2
-    s3_client = boto3.client(
-        's3',
-        endpoint_url=f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com',
-        aws_access_key_id=R2_ACCESS_KEY_ID,
-        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-        config=Config(signature_version='s3v4')
+    # Initialize S3 client for R2 (one pooled connection per concurrent upload)
+    s3_client = upload_engine.make_client(
+        f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com',
+        R2_ACCESS_KEY_ID,
+        R2_SECRET_ACCESS_KEY,
+        pool_size=max_concurrency
     )
     
     # Find all chunk files
     chunks_dir = 'components/chunks'
-    chunk_files = [os.path.join(chunks_dir, f) for f in os.listdir(chunks_dir) 
-                   if f.startswith('lookup_') and f.endswith('.json.gz')]
+    undeployable = compression.undeployable_files(os.listdir(chunks_dir))
+    if undeployable:
+        print(f"Error: {len(undeployable)} chunk files use a codec the worker cannot read (e.g. {undeployable[0]})")
+        print("zstd / brotli chunks are for local use; rebuild them with --compression gzip to deploy")
+        return
     
-    # Also upload chunks_index.json.gz
-    chunks_index = 'components/chunks_index.json.gz'
-    if os.path.exists(chunks_index):
-        chunk_files.append(chunks_index)
+    # Range chunks: exactly the files the directory names (older builds' files are not uploaded)
+    chunks_index_file = 'components/chunks_index.json.gz'
+    if not os.path.exists(chunks_index_file):
+        print(f"Error: {chunks_index_file} not found; run python build_indexes.py --outputs chunked first")
+        return
+    with gzip.open(chunks_index_file, 'rt', encoding='utf-8') as f:
+        chunks_index = json.load(f)
+    if chunks_index.get('chunking') == 'range':
+        chunk_files = [os.path.join('components', entry['file']) for entry in chunks_index['ranges']]
+    else:
+        chunk_files = [os.path.join(chunks_dir, f) for f in os.listdir(chunks_dir)
+                       if f.startswith('lookup_') and f.endswith('.json.gz')]
+    missing = [f for f in chunk_files if not os.path.exists(f)]
+    if missing:
+        print(f"Error: {len(missing)} chunks named in {chunks_index_file} are missing (e.g. {missing[0]})")
+        return
+    
+    # chunks_index.json.gz and the Bloom filter the worker checks before reading a chunk go last,
+    # so the worker never reads a directory whose chunks are not uploaded yet
+    directory_files = [f for f in [chunks_index_file, 'components/model_filter.bin'] if os.path.exists(f)]
     
-    print(f"Found {len(chunk_files)} files to upload")
-    print("Uploading in parallel (20 workers)...")
+    # Autocomplete index for /search (optional): its shards with the chunks, its root last
+    autocomplete_dir = os.path.join('components', autocomplete.AUTOCOMPLETE_DIR)
+    root_file = compression.compressed_path(os.path.join(autocomplete_dir, autocomplete.ROOT_FILE), 'gzip')
+    if os.path.isdir(autocomplete_dir):
+        undeployable = compression.undeployable_files(os.listdir(autocomplete_dir))
+        if undeployable:
+            print(f"Error: the autocomplete index uses a codec the worker cannot read (e.g. {undeployable[0]})")
+            print("Rebuild it with python build_indexes.py --outputs autocomplete --compression gzip to deploy")
+            return
+    if os.path.exists(root_file):
+        with gzip.open(root_file, 'rt', encoding='utf-8') as f:
+            shard_files = [os.path.join(autocomplete_dir, name) for name in json.load(f)['shards'].values()]
+        missing = [f for f in shard_files if not os.path.exists(f)]
+        if missing:
+            print(f"Error: {len(missing)} autocomplete shards named in {root_file} are missing (e.g. {missing[0]})")
+            return
+        chunk_files += shard_files
+        directory_files.append(root_file)
     
-    uploaded = 0
-    failed = 0
-    total_size = 0
+    state_file = os.path.join('components', upload_engine.STATE_FILE)
+    if restart and os.path.exists(state_file):
+        os.remove(state_file)
     
-    # Upload in parallel with 20 workers
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        futures = {executor.submit(upload_file, f, s3_client): f for f in chunk_files}
-        
-        for future in as_completed(futures):
-            result = future.result()
-            if result[2]:  # Success
-                uploaded += 1
-                total_size += result[1]
-                if uploaded % 100 == 0:
-                    print(f"  Uploaded {uploaded}/{len(chunk_files)} files ({total_size:.2f} MB)...")
-            else:
-                failed += 1
-                print(f"  Failed: {result[0]} - {result[3] if len(result) > 3 else 'Unknown error'}")
+    print(f"Found {len(chunk_files) + len(directory_files)} files to upload")
+    print(f"Uploading in parallel ({initial_concurrency} to {max_concurrency} concurrent uploads)...")
+    
+    engine = upload_engine.UploadEngine(initial_concurrency, max_concurrency, state_file=state_file)
+    stats = engine.run([(f.replace('components/', ''), f) for f in chunk_files],
+                       lambda key, path: upload_file(path, s3_client))
+    if not stats['failed']:
+        directory_stats = upload_engine.UploadEngine(initial_concurrency, max_concurrency).run(
+            [(f.replace('components/', ''), f) for f in directory_files], lambda key, path: upload_file(path, s3_client))
+        for key in ('uploaded', 'bytes', 'retries', 'throttled'):
+            stats[key] += directory_stats[key]
+        stats['failed'].update(directory_stats['failed'])
+    else:
+        print(f"  Not uploading {', '.join(directory_files)} until every chunk and shard is uploaded")
+    
+    for key, error in stats['failed'].items():
+        print(f"  Failed: {key} - {error}")
     
     print(f"\n✓ Upload complete:")
-    print(f"  Uploaded: {uploaded} files")
-    print(f"  Failed: {failed} files")
-    print(f"  Total size: {total_size:.2f} MB")
+    print(f"  Uploaded: {stats['uploaded']} files")
+    if stats['skipped']:
+        print(f"  Skipped: {stats['skipped']} files (uploaded by the interrupted run)")
+    print(f"  Failed: {len(stats['failed'])} files")
+    print(f"  Total size: {stats['bytes'] / (1024 * 1024):.2f} MB")
+    print(f"  Throughput: {stats['mb_per_s']} MB/s, {stats['objects_per_s']} objects/s")
+    print(f"  Retries: {stats['retries']} ({stats['throttled']} throttled), "
+          f"concurrency {stats['concurrency']} (peak {stats['peak_concurrency']})")
+    if stats['failed']:
+        print(f"  Rerun to retry the failed files; progress is kept in {state_file}")
 
 if __name__ == '__main__':
-    upload_chunks()
-
+    parser = argparse.ArgumentParser(description='Upload chunked lookup files and the autocomplete index to R2')
+    parser.add_argument('--concurrency', type=int, default=upload_engine.INITIAL_CONCURRENCY,
+                        help='Concurrent uploads to start with')
+    parser.add_argument('--max-concurrency', type=int, default=upload_engine.MAX_CONCURRENCY,
+                        help='Upper bound of concurrent uploads (and the connection pool size)')
+    parser.add_argument('--restart', action='store_true', help='Ignore the progress of an interrupted run')
+    args = parser.parse_args()
+    upload_chunks(args.concurrency, args.max_concurrency, args.restart)
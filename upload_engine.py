@@ -0,0 +1,249 @@
+"""
+Adaptive-concurrency upload engine for R2 / S3.
+
+A fixed pool of 20 threads either leaves bandwidth unused or runs into
+throttling, and one failed PUT used to mean a manual rerun. UploadEngine
+runs uploads with:
+
+- AIMD concurrency: the number of uploads in flight grows by one after
+  every window of `limit` successes and is halved when the store throttles
+  (SlowDown / 429 / 503), at most once per window: throttles of requests
+  that started before the last decrease are part of the same burst
+- an explicit connection pool (make_client's pool_size) that bounds the
+  concurrency
+- retries with exponential backoff and full jitter on throttling, 5xx and
+  connection errors; other errors fail the object at once
+- resumable progress: completed keys are saved to a state file every few
+  seconds, and a rerun skips them as long as the file's size and mtime are
+  unchanged (the state file is removed once a job completes)
+- live MB/s and objects/s reporting
+
+    engine = UploadEngine(max_concurrency=64, state_file='components/upload_state.json')
+    stats = engine.run([(key, path), ...], upload)    # upload(key, path) -> bytes sent
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+INITIAL_CONCURRENCY = 8
+MAX_CONCURRENCY = 64
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 30.0
+REPORT_INTERVAL_S = 5.0
+STATE_VERSION = 1
+# Default state file name (in the directory being uploaded)
+STATE_FILE = 'upload_state.json'
+
+THROTTLE_CODES = {'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequests',
+                  'RequestThrottled', 'ServiceUnavailable'}
+
+# Outcomes of one attempt
+SUCCESS, THROTTLED, RETRYABLE, FATAL = 'success', 'throttled', 'retryable', 'fatal'
+
+def classify_error(error):
+    """THROTTLED, RETRYABLE or FATAL for an exception raised by an upload"""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        code = response.get('Error', {}).get('Code')
+        status = response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        if code in THROTTLE_CODES or status in (429, 503):
+            return THROTTLED
+        if status >= 500:
+            return RETRYABLE
+        return FATAL
+    try:
+        from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError
+    except ImportError:
+        BotoConnectionError = HTTPClientError = ()
+    if isinstance(error, (ConnectionError, TimeoutError, BotoConnectionError, HTTPClientError)):
+        return RETRYABLE
+    return FATAL
+
+def backoff_delay(attempt, base=BACKOFF_BASE_S, maximum=BACKOFF_MAX_S):
+    """Full-jitter exponential backoff before retry number attempt (1, 2, ...)"""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+class AdaptiveConcurrency:
+    """AIMD limit on the number of uploads in flight"""
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=1, maximum=MAX_CONCURRENCY, decrease_factor=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.peak = self.limit
+        self.in_flight = 0
+        self.decrease_factor = decrease_factor
+        self._successes = 0
+        self._started = 0
+        self._decreased_at = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a slot; returns a ticket to pass to release()"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            self._started += 1
+            return self._started
+
+    def release(self, ticket, outcome):
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == SUCCESS:
+                # Additive increase: +1 per window of `limit` successes
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._successes = 0
+            elif outcome == THROTTLED and ticket > self._decreased_at:
+                # Multiplicative decrease, once per window of requests
+                self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+                self._decreased_at = self._started
+                self._successes = 0
+            self._condition.notify_all()
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+class UploadEngine:
+    """Run uploads with adaptive concurrency, retries, resumable state and progress reporting"""
+
+    def __init__(self, initial_concurrency=INITIAL_CONCURRENCY, max_concurrency=MAX_CONCURRENCY,
+                 max_attempts=MAX_ATTEMPTS, state_file=None, report_interval_s=REPORT_INTERVAL_S):
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.state_file = state_file
+        self.report_interval_s = report_interval_s
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state['done']
+        return {}
+
+    def _save_state(self, done):
+        if not self.state_file:
+            return
+        with self._lock:
+            state = {'version': STATE_VERSION, 'done': dict(done)}
+        # Write then rename, so an interrupted save never leaves a truncated state file
+        temp_file = f'{self.state_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.state_file)
+
+    def _print_progress(self, stats, total, limiter):
+        elapsed = max(time.time() - stats['start'], 1e-9)
+        mb = stats['bytes'] / (1024 * 1024)
+        print(f"  {stats['uploaded']:,}/{total:,} objects, {mb:.2f} MB, {mb / elapsed:.2f} MB/s, "
+              f"{stats['uploaded'] / elapsed:.1f} objects/s, concurrency {limiter.limit}, "
+              f"retries {stats['retries']}, failed {len(stats['failed'])}")
+
+    def _upload_with_retries(self, key, path, upload, limiter, stats, done):
+        for attempt in range(1, self.max_attempts + 1):
+            ticket = limiter.acquire()
+            try:
+                sent = upload(key, path)
+            except Exception as e:
+                outcome = classify_error(e)
+                limiter.release(ticket, outcome)
+                with self._lock:
+                    stats['throttled'] += outcome == THROTTLED
+                    if outcome == FATAL or attempt == self.max_attempts:
+                        stats['failed'][key] = str(e)
+                        return
+                    stats['retries'] += 1
+                time.sleep(backoff_delay(attempt))
+                continue
+            limiter.release(ticket, SUCCESS)
+            with self._lock:
+                stats['uploaded'] += 1
+                stats['bytes'] += sent
+                done[key] = _fingerprint(path)
+            return
+
+    def run(self, tasks, upload):
+        """
+        Upload (key, path) tasks with upload(key, path), which returns the bytes sent.
+
+        Returns stats: uploaded, skipped (already done in a previous run),
+        bytes, failed {key: error}, retries, throttled, elapsed_s, mb_per_s,
+        objects_per_s, final and peak concurrency.
+        """
+        done = self._load_state()
+        pending = [(key, path) for key, path in tasks if done.get(key) != _fingerprint(path)]
+        skipped = len(tasks) - len(pending)
+        if skipped:
+            print(f"  Resuming: {skipped:,} objects already uploaded by an interrupted run")
+
+        limiter = AdaptiveConcurrency(self.initial_concurrency, maximum=self.max_concurrency)
+        stats = {'uploaded': 0, 'skipped': skipped, 'bytes': 0, 'failed': {}, 'retries': 0, 'throttled': 0,
+                 'start': time.time()}
+        finished = threading.Event()
+
+        def report():
+            # Progress lines and periodic state saves until the run finishes
+            while not finished.wait(self.report_interval_s):
+                self._print_progress(stats, len(pending), limiter)
+                self._save_state(done)
+
+        reporter = threading.Thread(target=report, daemon=True)
+        reporter.start()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            futures = [executor.submit(self._upload_with_retries, key, path, upload, limiter, stats, done)
+                       for key, path in pending]
+            for future in futures:
+                future.result()
+        finally:
+            # On Ctrl-C, uploads in flight finish and queued ones are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
+            finished.set()
+            reporter.join()
+            if self.state_file:
+                if stats['uploaded'] == len(pending):
+                    # Job complete: the next run starts from scratch
+                    if os.path.exists(self.state_file):
+                        os.remove(self.state_file)
+                else:
+                    self._save_state(done)
+
+        if pending:
+            self._print_progress(stats, len(pending), limiter)
+        elapsed = time.time() - stats.pop('start')
+        stats.update({
+            'elapsed_s': round(elapsed, 2),
+            'mb_per_s': round(stats['bytes'] / (1024 * 1024) / elapsed, 2) if elapsed else None,
+            'objects_per_s': round(stats['uploaded'] / elapsed, 1) if elapsed else None,
+            'concurrency': limiter.limit,
+            'peak_concurrency': limiter.peak
+        })
+        return stats
+
+def make_client(endpoint_url, access_key_id, secret_access_key, pool_size=MAX_CONCURRENCY):
+    """
+    boto3 S3 client with an explicit connection pool and botocore's own
+    retries turned off (UploadEngine retries with backoff itself).
+    """
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+        config=Config(signature_version='s3v4', max_pool_connections=pool_size,
+                      retries={'total_max_attempts': 1, 'mode': 'standard'})
+    )